@@ -0,0 +1,367 @@
+"""
+Inference backends for serving exported Cats vs Dogs models.
+Each backend maps a uint8 image batch to dog probabilities. Runtimes are
+imported when a backend is created, so a process serving a TFLite or ONNX
+model never imports TensorFlow unless it needs it.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import numpy as np
+
+
+def _model_helpers():
+    """Import the Keras model helpers (package-relative when served from src)."""
+    try:
+        from .model import make_inference_fn, get_image_shape, model_includes_preprocessing
+    except ImportError:
+        from model import make_inference_fn, get_image_shape, model_includes_preprocessing
+    return make_inference_fn, get_image_shape, model_includes_preprocessing
+
+
+class KerasBackend:
+    """Run a Keras .h5/.keras model through a traced tf.function."""
+
+    name = 'keras'
+
+    def __init__(self, model_path, num_threads=None):
+        """
+        Load a Keras model.
+
+        Args:
+            model_path: Path to a .h5 or .keras model
+            num_threads: Unused; TensorFlow thread pools are process-wide
+        """
+        import tensorflow as tf
+        make_inference_fn, get_image_shape, model_includes_preprocessing = _model_helpers()
+
+        self.model_path = model_path
+        self.model = tf.keras.models.load_model(model_path)
+        # Requests carry raw uint8 pixels; the 1/255 rescale runs in-graph,
+        # in the model itself when it has preprocessing layers
+        self.infer_fn = make_inference_fn(self.model, input_dtype=tf.uint8)
+        self.image_shape = get_image_shape(self.model)
+        self.includes_preprocessing = model_includes_preprocessing(self.model)
+        self.input_dtype = np.uint8
+
+    def __call__(self, images):
+        """
+        Predict dog probabilities for a batch.
+
+        Args:
+            images: uint8 array of shape (N, H, W, 3)
+
+        Returns:
+            float32 array of shape (N, 1)
+        """
+        return self.infer_fn(images).numpy()
+
+
+class SavedModelBackend:
+    """Run a SavedModel exported with a uint8 serving signature (export_model.py --format savedmodel)."""
+
+    name = 'savedmodel'
+
+    def __init__(self, model_path, num_threads=None):
+        """
+        Load a SavedModel without rebuilding Keras layers.
+
+        Args:
+            model_path: SavedModel directory
+            num_threads: Unused; TensorFlow thread pools are process-wide
+        """
+        import tensorflow as tf
+
+        self.model_path = model_path
+        self.loaded = tf.saved_model.load(model_path)
+        self.infer_fn = self.loaded.signatures['serving_default']
+        _, inputs = self.infer_fn.structured_input_signature
+        self._input_name, spec = next(iter(inputs.items()))
+        self.image_shape = tuple(int(dim) for dim in spec.shape[1:])
+        self.input_dtype = spec.dtype.as_numpy_dtype
+
+    def __call__(self, images):
+        """
+        Predict dog probabilities for a batch.
+
+        Args:
+            images: uint8 array of shape (N, H, W, 3)
+
+        Returns:
+            float32 array of shape (N, 1)
+        """
+        outputs = self.infer_fn(**{self._input_name: images.astype(self.input_dtype, copy=False)})
+        return next(iter(outputs.values())).numpy()
+
+
+class TFLiteBackend:
+    """Run a .tflite model (float, dynamic-range or full-int8) with the TFLite interpreter."""
+
+    name = 'tflite'
+
+    def __init__(self, model_path, num_threads=None):
+        """
+        Load a TFLite model.
+
+        Uses the standalone tflite_runtime interpreter when it is installed,
+        and TensorFlow's otherwise.
+
+        Args:
+            model_path: Path to a .tflite file exported by export_model.py; its
+                input is raw [0, 255] pixels
+            num_threads: Interpreter threads for each forward pass (None = TFLite default)
+        """
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+
+        self.model_path = model_path
+        self.num_threads = num_threads
+        self.interpreter = Interpreter(model_path=model_path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self._refresh_details()
+        self.image_shape = tuple(int(dim) for dim in self._input['shape'][1:])
+        # The interpreter is stateful: one forward pass at a time
+        self._lock = threading.Lock()
+
+    def _refresh_details(self):
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+
+    @property
+    def input_dtype(self):
+        """Numpy dtype of the model input (float32, or uint8/int8 for full-int8 models)."""
+        return self._input['dtype']
+
+    def _quantize(self, images):
+        """Convert uint8 pixels to the interpreter's input type."""
+        dtype = self._input['dtype']
+        if dtype == np.float32:
+            return images.astype(np.float32)
+        scale, zero_point = self._input['quantization']
+        if dtype == np.uint8 and scale == 1.0 and zero_point == 0:
+            return images
+        info = np.iinfo(dtype)
+        quantized = np.round(images / scale + zero_point)
+        return np.clip(quantized, info.min, info.max).astype(dtype)
+
+    def _dequantize(self, outputs):
+        """Convert interpreter outputs to float32 probabilities."""
+        if outputs.dtype == np.float32:
+            return outputs.copy()
+        scale, zero_point = self._output['quantization']
+        return ((outputs.astype(np.float32) - zero_point) * scale).astype(np.float32)
+
+    def __call__(self, images):
+        """
+        Predict dog probabilities for a batch.
+
+        Args:
+            images: uint8 array of shape (N, H, W, 3)
+
+        Returns:
+            float32 array of shape (N, 1)
+        """
+        with self._lock:
+            if self._input['shape'][0] != len(images):
+                self.interpreter.resize_tensor_input(
+                    self._input['index'], (len(images),) + self.image_shape
+                )
+                self.interpreter.allocate_tensors()
+                self._refresh_details()
+            self.interpreter.set_tensor(self._input['index'], self._quantize(images))
+            self.interpreter.invoke()
+            return self._dequantize(self.interpreter.get_tensor(self._output['index']))
+
+
+class ONNXBackend:
+    """Run an .onnx model (export_model.py --format onnx) with ONNX Runtime."""
+
+    name = 'onnx'
+
+    def __init__(self, model_path, num_threads=None):
+        """
+        Create an ONNX Runtime CPU session.
+
+        Args:
+            model_path: Path to an .onnx file taking raw pixels
+            num_threads: Intra-op threads for each forward pass (None = ONNX Runtime default)
+        """
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("The onnx backend needs onnxruntime (pip install onnxruntime)") from e
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.model_path = model_path
+        self.session = ort.InferenceSession(
+            model_path, options, providers=['CPUExecutionProvider']
+        )
+        model_input = self.session.get_inputs()[0]
+        self._input_name = model_input.name
+        self.image_shape = tuple(int(dim) for dim in model_input.shape[1:])
+        self.input_dtype = np.uint8 if model_input.type == 'tensor(uint8)' else np.float32
+
+    def __call__(self, images):
+        """
+        Predict dog probabilities for a batch.
+
+        Args:
+            images: uint8 array of shape (N, H, W, 3)
+
+        Returns:
+            float32 array of shape (N, 1)
+        """
+        feed = {self._input_name: images.astype(self.input_dtype, copy=False)}
+        outputs = self.session.run(None, feed)[0]
+        return outputs.astype(np.float32).reshape(len(images), 1)
+
+
+BACKENDS = {
+    'keras': KerasBackend,
+    'savedmodel': SavedModelBackend,
+    'tflite': TFLiteBackend,
+    'onnx': ONNXBackend
+}
+
+
+def backend_for_path(model_path):
+    """
+    Pick the backend for a model file from its extension.
+
+    Args:
+        model_path: .h5/.keras file, SavedModel directory, .tflite or .onnx file
+
+    Returns:
+        Backend name (a BACKENDS key)
+    """
+    if os.path.isdir(model_path):
+        return 'savedmodel'
+    extension = os.path.splitext(model_path)[1].lower()
+    if extension == '.tflite':
+        return 'tflite'
+    if extension == '.onnx':
+        return 'onnx'
+    return 'keras'
+
+
+def create_backend(model_path, name=None, num_threads=None):
+    """
+    Load a model with the requested inference backend.
+
+    Args:
+        model_path: Path to the exported model
+        name: Backend name (a BACKENDS key); inferred from model_path if None
+        num_threads: Threads per forward pass for the tflite and onnx backends
+
+    Returns:
+        Backend instance: a callable mapping uint8 (N, H, W, 3) images to
+        float32 (N, 1) probabilities, with image_shape and input_dtype attributes
+    """
+    name = name or backend_for_path(model_path)
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{name}', expected one of {tuple(BACKENDS)}")
+    return BACKENDS[name](model_path, num_threads=num_threads)
+
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process.
+
+    Returns:
+        Megabytes
+    """
+    import resource
+
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2 ** 20
+
+
+def measure_backend(model_path, name=None, num_threads=None, batch_sizes=(1, 8, 32), iterations=20):
+    """
+    Measure loading and serving cost of one backend in the current process.
+
+    Run it in a fresh interpreter (see benchmark.py backends), so load time
+    includes importing the backend's runtime and RSS is the backend's own.
+
+    Args:
+        model_path: Path to the exported model
+        name: Backend name (inferred from model_path if None)
+        num_threads: Threads per forward pass
+        batch_sizes: Batch sizes to time
+        iterations: Timed calls per batch size
+
+    Returns:
+        Dictionary with load time, first prediction time, peak RSS, a
+        wall-clock 'ready_at' timestamp and per-batch-size latencies
+    """
+    start = time.perf_counter()
+    backend = create_backend(model_path, name, num_threads)
+    load_s = time.perf_counter() - start
+
+    rng = np.random.default_rng(0)
+    images = rng.integers(0, 256, size=(max(batch_sizes),) + backend.image_shape, dtype=np.uint8)
+    start = time.perf_counter()
+    backend(images[:1])
+    first_prediction_ms = (time.perf_counter() - start) * 1000
+    ready_at = time.time()
+
+    latencies = {}
+    for batch_size in batch_sizes:
+        batch = images[:batch_size]
+        backend(batch)
+        timings = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            backend(batch)
+            timings.append((time.perf_counter() - start) * 1000)
+        latencies[str(batch_size)] = {
+            'mean_ms': float(np.mean(timings)),
+            'p99_ms': float(np.percentile(timings, 99))
+        }
+
+    return {
+        'backend': backend.name,
+        'load_s': load_s,
+        'first_prediction_ms': first_prediction_ms,
+        'ready_at': ready_at,
+        'peak_rss_mb': peak_rss_mb(),
+        'tensorflow_imported': 'tensorflow' in sys.modules,
+        'latency': latencies
+    }
+
+
+def main():
+    """
+    Measure one backend and print the result as JSON (used by benchmark.py backends).
+    """
+    parser = argparse.ArgumentParser(description='Measure one inference backend')
+    parser.add_argument('--model_path', type=str, required=True,
+                        help='Path to the exported model')
+    parser.add_argument('--backend', type=str, default=None, choices=list(BACKENDS),
+                        help='Inference backend (default: inferred from --model_path)')
+    parser.add_argument('--num_threads', type=int, default=None,
+                        help='Threads per forward pass (tflite and onnx)')
+    parser.add_argument('--batch_sizes', type=int, nargs='+', default=[1, 8, 32],
+                        help='Batch sizes to time')
+    parser.add_argument('--iterations', type=int, default=20,
+                        help='Timed calls per batch size')
+
+    args = parser.parse_args()
+    result = measure_backend(
+        args.model_path, args.backend, args.num_threads, args.batch_sizes, args.iterations
+    )
+    print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+"""
+Dynamic micro-batching for the inference service.
+Groups concurrent single-image requests into one model forward pass.
+"""
+
+import asyncio
+import time
+import logging
+from collections import defaultdict, deque
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """Collect concurrent prediction requests and run them as a single batch."""
+
+    def __init__(self, predict_fn, max_batch_size=32, max_wait_ms=5.0,
+                 max_queue_size=0, executor=None, stats_window=1000):
+        """
+        Initialize batcher.
+
+        Args:
+            predict_fn: Callable mapping an (N, H, W, C) array to (N, 1) probabilities
+            max_batch_size: Maximum number of images per forward pass
+            max_wait_ms: Maximum time the first queued request waits for company
+            max_queue_size: Maximum queued requests before rejecting (0 = unbounded)
+            executor: BoundedExecutor for the forward pass, so it counts
+                against that executor's pending limit (None runs it on the
+                event loop thread)
+            stats_window: Number of recent queue waits kept for percentiles
+        """
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_ms = max(0.0, float(max_wait_ms))
+        self.max_queue_size = max(0, int(max_queue_size))
+        self.executor = executor
+
+        self._queue = None
+        self._worker = None
+        self._buffer = None
+
+        # Initialize metrics
+        self.metrics = {
+            'batches_run': 0,
+            'items_processed': 0,
+            'failed_batches': 0,
+            'batch_size_histogram': defaultdict(int),
+            'total_queue_wait_ms': 0.0,
+            'max_queue_wait_ms': 0.0
+        }
+        self._recent_waits = deque(maxlen=stats_window)
+
+    @property
+    def running(self):
+        """Whether the background batching task is active."""
+        return self._worker is not None and not self._worker.done()
+
+    async def start(self):
+        """Start the background batching task on the running event loop."""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._worker = asyncio.create_task(self._run())
+        logger.info(
+            f"Micro-batcher started (max_batch_size={self.max_batch_size}, "
+            f"max_wait_ms={self.max_wait_ms})"
+        )
+
+    async def stop(self):
+        """Stop the batching task and fail any requests still queued."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+        while self._queue is not None and not self._queue.empty():
+            _, _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Batcher stopped"))
+
+    async def submit(self, image):
+        """
+        Queue a single preprocessed image and wait for its probability.
+
+        Args:
+            image: Array of shape (1, H, W, C)
+
+        Returns:
+            Model output probability for the image
+
+        Raises:
+            asyncio.QueueFull: If max_queue_size requests are already waiting
+        """
+        if not self.running:
+            raise RuntimeError("Batcher is not running")
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((image, time.perf_counter(), future))
+        return await future
+
+    async def _collect_batch(self):
+        """Wait for one request, then gather more until full or the wait expires."""
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000.0
+
+        while len(batch) < self.max_batch_size:
+            # Take whatever is already queued before waiting on the clock
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        """Batching loop: collect, predict, fan results back out."""
+        while True:
+            batch = await self._collect_batch()
+            await self._process(batch)
+
+    async def _process(self, batch):
+        """Run one forward pass and resolve the waiting futures."""
+        started = time.perf_counter()
+        images = [image for image, _, _ in batch]
+
+        try:
+            if self.executor is not None:
+                predictions = await self.executor.run(self._forward, images)
+            else:
+                predictions = self._forward(images)
+        except Exception as e:
+            logger.error(f"Batched prediction failed for {len(batch)} images: {e}")
+            self.metrics['failed_batches'] += 1
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self._record_batch(batch, started)
+
+        for (_, _, future), prediction in zip(batch, predictions):
+            if not future.done():
+                future.set_result(float(np.ravel(prediction)[0]))
+
+    def _forward(self, images):
+        """Copy queued images into the reusable batch buffer and run the model."""
+        sample = images[0]
+        shape = (self.max_batch_size,) + sample.shape[1:]
+        if self._buffer is None or self._buffer.shape != shape or self._buffer.dtype != sample.dtype:
+            self._buffer = np.empty(shape, dtype=sample.dtype)
+
+        # Only one batch is in flight at a time, so the buffer is never shared
+        batch = self._buffer[:sum(image.shape[0] for image in images)]
+        np.concatenate(images, axis=0, out=batch)
+        return self.predict_fn(batch)
+
+    def _record_batch(self, batch, started):
+        """Update batch-size and queue-wait metrics."""
+        self.metrics['batches_run'] += 1
+        self.metrics['items_processed'] += len(batch)
+        self.metrics['batch_size_histogram'][len(batch)] += 1
+
+        for _, enqueued, _ in batch:
+            wait_ms = (started - enqueued) * 1000
+            self.metrics['total_queue_wait_ms'] += wait_ms
+            self.metrics['max_queue_wait_ms'] = max(self.metrics['max_queue_wait_ms'], wait_ms)
+            self._recent_waits.append(wait_ms)
+
+    def get_stats(self):
+        """
+        Get batching statistics.
+
+        Returns:
+            Dictionary with batch-size distribution and queue-wait summary
+        """
+        items = self.metrics['items_processed']
+        batches = self.metrics['batches_run']
+
+        if self._recent_waits:
+            p50, p99 = np.percentile(np.fromiter(self._recent_waits, dtype=float), [50, 99])
+        else:
+            p50 = p99 = 0.0
+
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait_ms,
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'batches_run': batches,
+            'items_processed': items,
+            'failed_batches': self.metrics['failed_batches'],
+            'average_batch_size': round(items / batches, 2) if batches > 0 else 0.0,
+            'batch_size_histogram': dict(sorted(self.metrics['batch_size_histogram'].items())),
+            'queue_wait_ms': {
+                'average': round(self.metrics['total_queue_wait_ms'] / items, 3) if items > 0 else 0.0,
+                'p50': round(float(p50), 3),
+                'p99': round(float(p99), 3),
+                'max': round(self.metrics['max_queue_wait_ms'], 3)
+            }
+        }
@@ -0,0 +1,628 @@
+"""
+Performance benchmarks for the Cats vs Dogs model.
+Measures serving overhead: model call paths, inference backends, service
+startup and image decoding.
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import subprocess
+import urllib.request
+import urllib.error
+import tempfile
+import argparse
+import numpy as np
+import tensorflow as tf
+from PIL import Image
+
+from model import MODEL_ARCHITECTURES, build_model, build_baseline_cnn, make_inference_fn, get_image_shape
+from data_preprocessing import (
+    open_image, preprocess_image_bytes, create_data_generators, create_tf_datasets
+)
+from distributed import find_free_ports
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def time_call(fn, iterations, warmup=3):
+    """
+    Time repeated calls of a function.
+
+    Args:
+        fn: Zero-argument callable to time
+        iterations: Number of timed calls
+        warmup: Number of untimed calls made first
+
+    Returns:
+        Dictionary with mean, p50 and p99 latency in milliseconds
+    """
+    for _ in range(warmup):
+        fn()
+
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    p50, p99 = np.percentile(timings, [50, 99])
+    return {
+        'mean_ms': float(np.mean(timings)),
+        'p50_ms': float(p50),
+        'p99_ms': float(p99)
+    }
+
+
+def benchmark_inference(model, batch_sizes=(1, 8, 32), iterations=20):
+    """
+    Compare model.predict against the traced inference function.
+
+    Args:
+        model: Keras model
+        batch_sizes: Batch sizes to measure
+        iterations: Timed calls per configuration
+
+    Returns:
+        List of result dictionaries, one per (method, batch size)
+    """
+    infer_fn = make_inference_fn(model)
+    input_shape = tuple(model.input_shape[1:])
+    results = []
+
+    for batch_size in batch_sizes:
+        images = np.random.rand(batch_size, *input_shape).astype(np.float32)
+
+        methods = {
+            'model.predict': lambda: model.predict(images, verbose=0),
+            'tf.function': lambda: infer_fn(images).numpy()
+        }
+
+        for method, fn in methods.items():
+            timing = time_call(fn, iterations)
+            timing.update({
+                'method': method,
+                'batch_size': batch_size,
+                'per_image_ms': timing['mean_ms'] / batch_size
+            })
+            results.append(timing)
+
+    return results
+
+
+def measure_latency(model, batch_sizes=(1, 32), iterations=20):
+    """
+    Measure CPU serving latency of a model at several batch sizes.
+
+    Uses the traced uint8 inference function the service runs.
+
+    Args:
+        model: Keras model
+        batch_sizes: Batch sizes to measure
+        iterations: Timed calls per batch size
+
+    Returns:
+        Dictionary mapping batch size to time_call results
+    """
+    infer_fn = make_inference_fn(model, input_dtype=tf.uint8)
+    rng = np.random.default_rng(0)
+    results = {}
+    for batch_size in batch_sizes:
+        images = rng.integers(0, 256, size=(batch_size,) + get_image_shape(model), dtype=np.uint8)
+        results[batch_size] = time_call(lambda: infer_fn(images).numpy(), iterations)
+    return results
+
+
+def describe_model(model, model_path=None, batch_sizes=(1, 32), iterations=20):
+    """
+    Summarize the size and serving cost of a model for comparing architectures.
+
+    Args:
+        model: Keras model
+        model_path: Saved model file (its size is reported if given)
+        batch_sizes: Batch sizes for latency
+        iterations: Timed calls per batch size
+
+    Returns:
+        Dictionary of metrics: param_count, model_size_mb and
+        latency_b{N}_ms (mean) per batch size
+    """
+    metrics = {'param_count': model.count_params()}
+    if model_path:
+        metrics['model_size_mb'] = os.path.getsize(model_path) / 2 ** 20
+    for batch_size, timing in measure_latency(model, batch_sizes, iterations).items():
+        metrics[f"latency_b{batch_size}_ms"] = timing['mean_ms']
+    return metrics
+
+
+def benchmark_architectures(architectures=MODEL_ARCHITECTURES, image_size=224,
+                            batch_sizes=(1, 32), iterations=20):
+    """
+    Compare parameter count, file size and latency of untrained architectures.
+
+    Accuracy needs training; train.py --model_architecture logs the same
+    metrics with validation accuracy to MLflow.
+
+    Args:
+        architectures: Names from MODEL_ARCHITECTURES
+        image_size: Input height/width
+        batch_sizes: Batch sizes for latency
+        iterations: Timed calls per batch size
+
+    Returns:
+        List of result dictionaries, one per architecture
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as model_dir:
+        for architecture in architectures:
+            model = build_model(architecture, input_shape=(image_size, image_size, 3))
+            model_path = os.path.join(model_dir, f"{architecture}.h5")
+            model.save(model_path)
+            result = describe_model(model, model_path, batch_sizes, iterations)
+            result['architecture'] = architecture
+            results.append(result)
+    return results
+
+
+def find_exported_models(model_path):
+    """
+    List the model and the exports of it that export_model.py writes by default.
+
+    Args:
+        model_path: Path to the trained .h5 model
+
+    Returns:
+        Existing model paths (.h5, SavedModel, .onnx and .tflite files)
+    """
+    stem = os.path.splitext(model_path)[0]
+    candidates = [
+        model_path,
+        f"{stem}_savedmodel",
+        f"{stem}.onnx",
+        f"{stem}_dynamic.tflite",
+        f"{stem}_int8.tflite"
+    ]
+    return [path for path in candidates if os.path.exists(path)]
+
+
+def benchmark_backends(model_paths, batch_sizes=(1, 8, 32), iterations=20, num_threads=None):
+    """
+    Compare cold start, peak RSS and batch latency of the inference backends.
+
+    Each model is measured in a fresh Python process running backends.py,
+    so cold start includes importing the backend's runtime and the RSS is
+    what a serving process with that backend would hold.
+
+    Args:
+        model_paths: Exported models; the backend is inferred from each path
+        batch_sizes: Batch sizes to time
+        iterations: Timed calls per batch size
+        num_threads: Threads per forward pass (tflite and onnx)
+
+    Returns:
+        List of result dictionaries, one per model
+    """
+    backends_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backends.py')
+    results = []
+    for model_path in model_paths:
+        command = [sys.executable, backends_script, '--model_path', model_path,
+                   '--iterations', str(iterations), '--batch_sizes', *map(str, batch_sizes)]
+        if num_threads:
+            command += ['--num_threads', str(num_threads)]
+
+        start = time.time()
+        completed = subprocess.run(command, capture_output=True, text=True)
+        if completed.returncode != 0:
+            print(f"Skipping {model_path}: {completed.stderr.strip().splitlines()[-1]}")
+            continue
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        result.update({
+            'model_path': model_path,
+            'size_mb': get_path_size(model_path) / 2 ** 20,
+            'cold_start_s': result['ready_at'] - start
+        })
+        results.append(result)
+    return results
+
+
+def get_path_size(path):
+    """Size in bytes of a file, or of all files under a directory."""
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path) for name in names
+    )
+
+
+def profile_imports(module='src.inference'):
+    """
+    Profile importing a module in a fresh interpreter with python -X importtime.
+
+    Args:
+        module: Dotted module name, imported from the project root
+
+    Returns:
+        Dictionary with 'total_ms' (cumulative import time of module) and
+        'modules', a list of (name, cumulative_ms, self_ms) for every
+        imported module, slowest first
+    """
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    )
+
+    modules = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append((name.strip(), int(cumulative_us) / 1000, int(self_us) / 1000))
+
+    total_ms = next(cumulative for name, cumulative, _ in modules if name == module)
+    return {
+        'total_ms': total_ms,
+        'modules': sorted(modules, key=lambda entry: entry[1], reverse=True)
+    }
+
+
+def wait_for_status(url, deadline, process):
+    """Poll url until it answers HTTP 200; return the time it did, or None."""
+    while time.time() < deadline and process.poll() is None:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return time.time()
+        except (urllib.error.URLError, ConnectionError, TimeoutError):
+            pass
+        time.sleep(0.05)
+    return None
+
+
+def measure_time_to_healthy(model_path, timeout=120, env=None):
+    """
+    Start the API with uvicorn and time how long its probes take to pass.
+
+    /health (liveness) answers once the app is imported and started;
+    /ready answers once the model is loaded and warmed up.
+
+    Args:
+        model_path: MODEL_PATH for the service
+        timeout: Seconds to wait for readiness
+        env: Extra environment variables for the service (e.g. INFERENCE_BACKEND)
+
+    Returns:
+        Dictionary with 'healthy_s' and 'ready_s' since process start (None if
+        a probe never passed)
+    """
+    port = find_free_ports(1)[0]
+    service_env = dict(os.environ, MODEL_PATH=model_path, **(env or {}))
+    start = time.time()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'src.inference:app', '--port', str(port),
+         '--log-level', 'warning'],
+        cwd=PROJECT_ROOT, env=service_env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        deadline = start + timeout
+        healthy_at = wait_for_status(f"http://127.0.0.1:{port}/health", deadline, process)
+        ready_at = wait_for_status(f"http://127.0.0.1:{port}/ready", deadline, process)
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+    return {
+        'healthy_s': healthy_at - start if healthy_at else None,
+        'ready_s': ready_at - start if ready_at else None
+    }
+
+
+def make_synthetic_jpeg(width=4000, height=3000, quality=90):
+    """Create an in-memory JPEG resembling a 12MP phone photo."""
+    y, x = np.mgrid[0:height, 0:width]
+    pixels = np.stack([
+        x / width * 255,
+        y / height * 255,
+        (np.sin(x / 50.0) + np.cos(y / 70.0)) * 60 + 128
+    ], axis=-1).astype(np.uint8)
+
+    img_bytes = io.BytesIO()
+    Image.fromarray(pixels).save(img_bytes, format='JPEG', quality=quality)
+    return img_bytes.getvalue()
+
+
+def benchmark_decode(image_bytes, target_size=(224, 224), iterations=10):
+    """
+    Compare full-resolution JPEG decoding against DCT-scaled (draft) decoding.
+
+    Args:
+        image_bytes: Encoded JPEG data
+        target_size: Preprocessing target size
+        iterations: Timed calls per configuration
+
+    Returns:
+        List of result dictionaries, one per decode mode
+    """
+    results = []
+    for fast_decode in (False, True):
+        decoded = open_image(io.BytesIO(image_bytes), target_size, fast_decode)
+        timing = time_call(
+            lambda: preprocess_image_bytes(io.BytesIO(image_bytes), target_size, fast_decode),
+            iterations
+        )
+        timing.update({
+            'method': 'draft decode' if fast_decode else 'full decode',
+            'decoded_size': decoded.size,
+            'decoded_mb': decoded.size[0] * decoded.size[1] * 3 / 1e6
+        })
+        results.append(timing)
+    return results
+
+
+def write_synthetic_dataset(directory, images_per_class=64, size=(500, 375)):
+    """Write a small class-per-subdirectory JPEG dataset for pipeline benchmarks."""
+    rng = np.random.default_rng(0)
+    for class_name in ('cats', 'dogs'):
+        class_dir = os.path.join(directory, class_name)
+        os.makedirs(class_dir, exist_ok=True)
+        for i in range(images_per_class):
+            pixels = rng.integers(0, 256, size=(size[1], size[0], 3), dtype=np.uint8)
+            Image.fromarray(pixels).save(os.path.join(class_dir, f'{i}.jpg'), quality=90)
+
+
+def time_batches(backend, data, batches):
+    """Measure images/sec drawing batches from a generator or dataset."""
+    iterator = iter(data)
+    next(iterator)
+
+    images = 0
+    start = time.perf_counter()
+    for _ in range(batches):
+        images += len(next(iterator)[0])
+    elapsed = time.perf_counter() - start
+
+    return {
+        'method': backend,
+        'images': images,
+        'seconds': elapsed,
+        'images_per_sec': images / elapsed
+    }
+
+
+def benchmark_data_pipelines(data_dir, batch_size=32, target_size=(224, 224), batches=20):
+    """
+    Compare training input throughput of ImageDataGenerator and tf.data.
+
+    All pipelines decode and augment the same directory; the first batch is
+    drawn untimed so tf.data graph tracing is not counted. The cached
+    pipeline reads from a decoded image cache built (untimed) beforehand.
+
+    Args:
+        data_dir: Class-per-subdirectory image directory
+        batch_size: Batch size
+        target_size: Tuple of (height, width)
+        batches: Number of timed batches per backend
+
+    Returns:
+        List of result dictionaries, one per backend
+    """
+    train_generator, _ = create_data_generators(data_dir, data_dir, batch_size, target_size)
+    train_dataset = create_tf_datasets(data_dir, data_dir, batch_size, target_size)[0]
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cached_dataset = create_tf_datasets(
+            data_dir, data_dir, batch_size, target_size, cache_dir=cache_dir
+        )[0]
+        backends = (
+            ('generator', train_generator),
+            ('tfdata', train_dataset.repeat()),
+            ('tfdata+cache', cached_dataset.repeat())
+        )
+        return [time_batches(backend, data, batches) for backend, data in backends]
+
+
+def print_data_results(results, title):
+    """Print input pipeline benchmark results as a table."""
+    print("\n" + "=" * 72)
+    print(title)
+    print("=" * 72)
+    print(f"{'Backend':<16}{'Images':>10}{'Seconds':>12}{'Images/sec':>14}")
+    for r in results:
+        print(f"{r['method']:<16}{r['images']:>10}{r['seconds']:>12.2f}{r['images_per_sec']:>14.1f}")
+    print("=" * 72)
+
+
+def print_decode_results(results, title):
+    """Print decode benchmark results as a table."""
+    print("\n" + "=" * 72)
+    print(title)
+    print("=" * 72)
+    print(f"{'Method':<16}{'Decoded size':>16}{'Decoded MB':>12}{'Mean ms':>12}{'p99 ms':>12}")
+    for r in results:
+        size = f"{r['decoded_size'][0]}x{r['decoded_size'][1]}"
+        print(f"{r['method']:<16}{size:>16}{r['decoded_mb']:>12.2f}{r['mean_ms']:>12.2f}{r['p99_ms']:>12.2f}")
+    print("=" * 72)
+
+
+def print_backend_results(results, title):
+    """Print backend benchmark results as a table."""
+    batch_sizes = list(results[0]['latency']) if results else []
+    print("\n" + "=" * 96)
+    print(title)
+    print("=" * 96)
+    header = f"{'Backend':<12}{'Model':<30}{'MB':>7}{'Cold s':>8}{'RSS MB':>8}{'TF':>4}"
+    print(header + ''.join(f"{'b' + size + ' ms':>10}" for size in batch_sizes))
+    for r in results:
+        row = (
+            f"{r['backend']:<12}{os.path.basename(r['model_path'])[:29]:<30}{r['size_mb']:>7.1f}"
+            f"{r['cold_start_s']:>8.2f}{r['peak_rss_mb']:>8.0f}"
+            f"{'yes' if r['tensorflow_imported'] else 'no':>4}"
+        )
+        print(row + ''.join(f"{r['latency'][size]['mean_ms']:>10.2f}" for size in batch_sizes))
+    print("=" * 96)
+
+
+def print_architecture_results(results, title):
+    """Print architecture comparison results as a table."""
+    latency_keys = [key for key in results[0] if key.startswith('latency_')] if results else []
+    print("\n" + "=" * 72)
+    print(title)
+    print("=" * 72)
+    print(f"{'Architecture':<16}{'Params':>12}{'MB':>8}" + ''.join(f"{key[8:]:>12}" for key in latency_keys))
+    for r in results:
+        print(f"{r['architecture']:<16}{r['param_count']:>12,}{r['model_size_mb']:>8.1f}"
+              + ''.join(f"{r[key]:>12.2f}" for key in latency_keys))
+    print("=" * 72)
+
+
+def print_import_profile(profile, title, top=15):
+    """Print the slowest imports of an import-time profile as a table."""
+    print("\n" + "=" * 72)
+    print(title)
+    print("=" * 72)
+    print(f"{'Module':<48}{'Cumulative ms':>14}{'Self ms':>10}")
+    for name, cumulative_ms, self_ms in profile['modules'][:top]:
+        print(f"{name[:47]:<48}{cumulative_ms:>14.1f}{self_ms:>10.1f}")
+    print(f"Total: {profile['total_ms']:.1f}ms")
+    print("=" * 72)
+
+
+def print_results(results, title):
+    """Print benchmark results as a table."""
+    print("\n" + "=" * 72)
+    print(title)
+    print("=" * 72)
+    print(f"{'Method':<16}{'Batch':>6}{'Mean ms':>12}{'p50 ms':>12}{'p99 ms':>12}{'ms/image':>12}")
+    for r in results:
+        print(
+            f"{r['method']:<16}{r['batch_size']:>6}{r['mean_ms']:>12.2f}"
+            f"{r['p50_ms']:>12.2f}{r['p99_ms']:>12.2f}{r['per_image_ms']:>12.2f}"
+        )
+    print("=" * 72)
+
+
+def load_or_build_model(model_path, image_size=224):
+    """Load a trained model, or build an untrained baseline if none exists."""
+    if model_path and os.path.exists(model_path):
+        print(f"Loading model from {model_path}")
+        return tf.keras.models.load_model(model_path)
+
+    print("No trained model found - benchmarking an untrained baseline CNN")
+    return build_baseline_cnn(input_shape=(image_size, image_size, 3))
+
+
+def main():
+    """
+    Main entry point for benchmarks.
+    """
+    parser = argparse.ArgumentParser(description='Benchmark Cats vs Dogs model performance')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    inference_parser = subparsers.add_parser(
+        'inference', help='Per-request overhead of model.predict vs traced tf.function'
+    )
+    inference_parser.add_argument('--model_path', type=str, default='models/cats_dogs_model.h5',
+                                  help='Path to trained model')
+    inference_parser.add_argument('--batch_sizes', type=int, nargs='+', default=[1, 8, 32],
+                                  help='Batch sizes to benchmark')
+    inference_parser.add_argument('--iterations', type=int, default=20,
+                                  help='Timed iterations per configuration')
+
+    architectures_parser = subparsers.add_parser(
+        'architectures', help='Parameters, file size and latency of each model architecture'
+    )
+    architectures_parser.add_argument('--architectures', type=str, nargs='+',
+                                      default=list(MODEL_ARCHITECTURES), choices=MODEL_ARCHITECTURES,
+                                      help='Architectures to compare')
+    architectures_parser.add_argument('--image_size', type=int, default=224,
+                                      help='Input height/width')
+    architectures_parser.add_argument('--batch_sizes', type=int, nargs='+', default=[1, 32],
+                                      help='Batch sizes to benchmark')
+    architectures_parser.add_argument('--iterations', type=int, default=20,
+                                      help='Timed iterations per configuration')
+
+    backends_parser = subparsers.add_parser(
+        'backends', help='Cold start, RSS and batch latency of each inference backend'
+    )
+    backends_parser.add_argument('--model_path', type=str, default='models/cats_dogs_model.h5',
+                                 help='Trained model; its exports next to it are found automatically')
+    backends_parser.add_argument('--model_paths', type=str, nargs='+', default=None,
+                                 help='Exported models to compare (overrides --model_path)')
+    backends_parser.add_argument('--batch_sizes', type=int, nargs='+', default=[1, 8, 32],
+                                 help='Batch sizes to benchmark')
+    backends_parser.add_argument('--iterations', type=int, default=20,
+                                 help='Timed iterations per configuration')
+    backends_parser.add_argument('--num_threads', type=int, default=None,
+                                 help='Threads per forward pass (tflite and onnx)')
+
+    startup_parser = subparsers.add_parser(
+        'startup', help='Import-time profile of the API and time until its probes pass'
+    )
+    startup_parser.add_argument('--model_path', type=str, default='models/cats_dogs_model.h5',
+                                help='MODEL_PATH for the service')
+    startup_parser.add_argument('--backend', type=str, default=None,
+                                help='INFERENCE_BACKEND for the service')
+
+    decode_parser = subparsers.add_parser(
+        'decode', help='Full-resolution vs reduced-resolution (draft) JPEG decoding'
+    )
+    decode_parser.add_argument('--image', type=str, default=None,
+                               help='JPEG to decode (default: synthetic 12MP image)')
+    decode_parser.add_argument('--iterations', type=int, default=10,
+                               help='Timed iterations per configuration')
+
+    data_parser = subparsers.add_parser(
+        'data', help='Training input throughput: ImageDataGenerator vs tf.data'
+    )
+    data_parser.add_argument('--data_dir', type=str, default=None,
+                             help='Class-per-subdirectory images (default: synthetic JPEGs)')
+    data_parser.add_argument('--batch_size', type=int, default=32,
+                             help='Batch size')
+    data_parser.add_argument('--batches', type=int, default=20,
+                             help='Timed batches per backend')
+
+    args = parser.parse_args()
+
+    if args.benchmark == 'inference':
+        model = load_or_build_model(args.model_path)
+        results = benchmark_inference(model, args.batch_sizes, args.iterations)
+        print_results(results, "Inference Overhead: model.predict vs tf.function")
+    elif args.benchmark == 'architectures':
+        results = benchmark_architectures(
+            args.architectures, args.image_size, args.batch_sizes, args.iterations
+        )
+        print_architecture_results(results, "Model Architectures (untrained)")
+    elif args.benchmark == 'backends':
+        model_paths = args.model_paths or find_exported_models(args.model_path)
+        results = benchmark_backends(model_paths, args.batch_sizes, args.iterations, args.num_threads)
+        print_backend_results(results, "Inference Backends: cold start, peak RSS, mean batch latency")
+    elif args.benchmark == 'startup':
+        print_import_profile(profile_imports('src.inference'), "Import time: src.inference")
+        env = {'INFERENCE_BACKEND': args.backend} if args.backend else None
+        timing = measure_time_to_healthy(os.path.abspath(args.model_path), env=env)
+        print(f"Time to /health: {timing['healthy_s']:.2f}s, "
+              f"time to /ready: {timing['ready_s']:.2f}s" if timing['ready_s']
+              else f"Service not ready: {timing}")
+    elif args.benchmark == 'decode':
+        if args.image:
+            with open(args.image, 'rb') as f:
+                image_bytes = f.read()
+        else:
+            image_bytes = make_synthetic_jpeg()
+        results = benchmark_decode(image_bytes, iterations=args.iterations)
+        print_decode_results(results, "JPEG Decode: full vs draft (DCT-scaled)")
+    elif args.benchmark == 'data':
+        if args.data_dir:
+            results = benchmark_data_pipelines(args.data_dir, args.batch_size, batches=args.batches)
+        else:
+            with tempfile.TemporaryDirectory() as data_dir:
+                write_synthetic_dataset(data_dir)
+                results = benchmark_data_pipelines(data_dir, args.batch_size, batches=args.batches)
+        print_data_results(results, "Training Input Throughput: ImageDataGenerator vs tf.data")
+
+
+if __name__ == '__main__':
+    main()
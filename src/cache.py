@@ -0,0 +1,143 @@
+"""
+Content-addressed prediction cache for the inference service.
+Returns stored predictions for re-uploaded images without decoding them.
+"""
+
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class PredictionCache:
+    """Bounded LRU cache with per-entry TTL, keyed by a hash of the upload bytes."""
+
+    def __init__(self, max_entries=10000, ttl_seconds=3600.0):
+        """
+        Initialize cache.
+
+        Args:
+            max_entries: Maximum number of cached predictions (0 disables caching)
+            ttl_seconds: Seconds an entry stays valid (0 = no expiry)
+        """
+        self.max_entries = max(0, int(max_entries))
+        self.ttl_seconds = max(0.0, float(ttl_seconds))
+        self.namespace = ''
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Initialize metrics
+        self.metrics = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0
+        }
+
+    @property
+    def enabled(self):
+        """Whether the cache stores anything."""
+        return self.max_entries > 0
+
+    def make_key(self, data):
+        """
+        Build a cache key from raw image bytes.
+
+        The key includes the current namespace (the model fingerprint), so
+        predictions from a previous model can never be returned.
+
+        Args:
+            data: Raw upload bytes
+
+        Returns:
+            Hex digest string
+        """
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        return f"{self.namespace}:{digest}"
+
+    def get(self, key):
+        """
+        Look up a cached value.
+
+        Args:
+            key: Key from make_key
+
+        Returns:
+            Cached value, or None on a miss or expired entry
+        """
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.metrics['misses'] += 1
+                return None
+
+            value, stored_at = entry
+            if self.ttl_seconds and time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.metrics['expirations'] += 1
+                self.metrics['misses'] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.metrics['hits'] += 1
+            return value
+
+    def put(self, key, value):
+        """
+        Store a value, evicting the least recently used entries when full.
+
+        Args:
+            key: Key from make_key
+            value: Value to cache
+        """
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.metrics['evictions'] += 1
+
+    def invalidate(self, namespace=None):
+        """
+        Drop every cached entry, optionally switching to a new namespace.
+
+        Args:
+            namespace: New key namespace (e.g. fingerprint of a newly loaded model)
+        """
+        with self._lock:
+            self._entries.clear()
+            if namespace is not None:
+                self.namespace = namespace
+            self.metrics['invalidations'] += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_stats(self):
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary of size, hit/miss/eviction counters and hit rate
+        """
+        lookups = self.metrics['hits'] + self.metrics['misses']
+        return {
+            'enabled': self.enabled,
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds,
+            'hits': self.metrics['hits'],
+            'misses': self.metrics['misses'],
+            'evictions': self.metrics['evictions'],
+            'expirations': self.metrics['expirations'],
+            'invalidations': self.metrics['invalidations'],
+            'hit_rate': round(self.metrics['hits'] / lookups, 4) if lookups > 0 else 0.0
+        }
@@ -0,0 +1,204 @@
+"""
+Resumable training for the Cats vs Dogs classifier.
+Periodic tf.train.Checkpoint saves of the model, optimizer, epoch and step
+counters, callback state and the MLflow run, so a preempted run can continue.
+"""
+
+import os
+import json
+import tensorflow as tf
+
+
+# Callback attributes that Keras resets in on_train_begin and that must
+# survive a resume, by callback class name. EarlyStopping's best_weights are
+# checkpointed as variables instead (see TrainingCheckpoint)
+CALLBACK_STATE = {
+    'EarlyStopping': ('wait', 'best', 'best_epoch', 'stopped_epoch'),
+    'ReduceLROnPlateau': ('wait', 'best', 'cooldown_counter'),
+    'ThroughputCallback': ('epochs',)
+}
+
+
+def read_checkpoint_state(checkpoint_dir):
+    """
+    Read the counters and run state of the latest checkpoint without building a model.
+
+    Args:
+        checkpoint_dir: Directory written by TrainingCheckpoint
+
+    Returns:
+        Dictionary with 'path', 'epoch', 'step' and 'run_state', or None if
+        the directory holds no checkpoint
+    """
+    path = tf.train.latest_checkpoint(checkpoint_dir) if checkpoint_dir else None
+    if path is None:
+        return None
+
+    def load(name):
+        return tf.train.load_variable(path, f"{name}/.ATTRIBUTES/VARIABLE_VALUE")
+
+    return {
+        'path': path,
+        'epoch': int(load('epoch')),
+        'step': int(load('step')),
+        'run_state': json.loads(load('run_state').decode())
+    }
+
+
+def clear_checkpoints(checkpoint_dir):
+    """
+    Remove the checkpoints of a previous run, so a fresh run never resumes from them.
+
+    Args:
+        checkpoint_dir: Checkpoint directory
+
+    Returns:
+        True if old checkpoints were removed
+    """
+    if not checkpoint_dir or tf.train.latest_checkpoint(checkpoint_dir) is None:
+        return False
+    tf.io.gfile.rmtree(checkpoint_dir)
+    return True
+
+
+class TrainingCheckpoint(tf.keras.callbacks.Callback):
+    """Save and restore the full training state with tf.train.Checkpoint."""
+
+    def __init__(self, model, checkpoint_dir, save_every_n_steps=0, max_to_keep=3,
+                 run_state=None, stateful_callbacks=(), write_dir=None):
+        """
+        Initialize callback.
+
+        Place it after stateful_callbacks in the callback list, so their
+        state is restored after Keras resets it in on_train_begin.
+
+        Args:
+            model: Compiled Keras model (its optimizer is checkpointed too)
+            checkpoint_dir: Directory to save checkpoints to and restore from
+            save_every_n_steps: Also save every N training steps (0 = epoch ends only)
+            max_to_keep: Number of checkpoints kept on disk
+            run_state: JSON-serializable dictionary saved with every checkpoint
+                (e.g. MLflow run id and shuffle seed)
+            stateful_callbacks: Callbacks whose CALLBACK_STATE attributes are saved
+            write_dir: Directory to write to instead of checkpoint_dir (for
+                non-chief workers, which must take part in saving)
+        """
+        super().__init__()
+        self.checkpoint_dir = checkpoint_dir
+        self.save_every_n_steps = save_every_n_steps
+        self.run_state = dict(run_state or {})
+        self.stateful_callbacks = list(stateful_callbacks)
+        self.restored_callback_state = None
+        self._steps_since_save = 0
+
+        self.epoch = tf.Variable(0, dtype=tf.int64, trainable=False)
+        self.step = tf.Variable(0, dtype=tf.int64, trainable=False)
+        self.state = tf.Variable('', dtype=tf.string, trainable=False)
+        # A copy of the weights for EarlyStopping(restore_best_weights=True),
+        # so a resumed run can still restore the best weights of the whole run
+        self.best_weights = []
+        if any(getattr(callback, 'restore_best_weights', False) for callback in self.stateful_callbacks):
+            self.best_weights = [
+                tf.Variable(tf.zeros(weight.shape, weight.dtype), trainable=False)
+                for weight in model.weights
+            ]
+        self.checkpoint = tf.train.Checkpoint(
+            model=model,
+            optimizer=model.optimizer,
+            epoch=self.epoch,
+            step=self.step,
+            run_state=self.state,
+            best_weights=self.best_weights
+        )
+        self.read_manager = tf.train.CheckpointManager(
+            self.checkpoint, checkpoint_dir, max_to_keep=max_to_keep
+        )
+        self.write_manager = self.read_manager
+        if write_dir and write_dir != checkpoint_dir:
+            self.write_manager = tf.train.CheckpointManager(
+                self.checkpoint, write_dir, max_to_keep=1
+            )
+
+    def restore(self):
+        """
+        Restore model weights, optimizer slots and counters from the latest checkpoint.
+
+        Returns:
+            Tuple of (epoch, step) to resume from, or None if there is no checkpoint
+        """
+        path = self.read_manager.latest_checkpoint
+        if path is None:
+            return None
+        self.checkpoint.restore(path)
+        state = json.loads(self.state.numpy().decode())
+        self.restored_callback_state = state.get('callbacks', {})
+        self.run_state.update({k: v for k, v in state.items() if k != 'callbacks'})
+        print(f"Restored {path} (epoch {int(self.epoch.numpy())}, step {int(self.step.numpy())})")
+        return int(self.epoch.numpy()), int(self.step.numpy())
+
+    def callback_state(self):
+        """
+        Snapshot the CALLBACK_STATE attributes of the stateful callbacks.
+
+        Best weights are copied into the checkpointed best_weights variables
+        and only flagged in the returned state.
+
+        Returns:
+            Dictionary of callback class name to attribute values
+        """
+        callbacks = {}
+        for callback in self.stateful_callbacks:
+            name = type(callback).__name__
+            callbacks[name] = {
+                attr: getattr(callback, attr) for attr in CALLBACK_STATE.get(name, ())
+            }
+            if self.best_weights and getattr(callback, 'best_weights', None) is not None:
+                for variable, value in zip(self.best_weights, callback.best_weights):
+                    variable.assign(value)
+                callbacks[name]['best_weights'] = True
+        return callbacks
+
+    def carry_over_callback_state(self):
+        """
+        Keep the current callback state across another model.fit call.
+
+        Keras resets callbacks in on_train_begin; this makes the next
+        on_train_begin restore their current state instead of the state
+        restored from the checkpoint.
+        """
+        self.restored_callback_state = self.callback_state()
+
+    def save(self):
+        """
+        Write a checkpoint numbered by the optimizer step.
+
+        Returns:
+            Path of the saved checkpoint
+        """
+        callbacks = self.callback_state()
+        self.state.assign(json.dumps(dict(self.run_state, callbacks=callbacks), default=float))
+        self.step.assign(self.model.optimizer.iterations)
+        self._steps_since_save = 0
+        return self.write_manager.save(checkpoint_number=self.step)
+
+    def on_train_begin(self, logs=None):
+        for callback in self.stateful_callbacks:
+            for attr, value in (self.restored_callback_state or {}).get(
+                    type(callback).__name__, {}).items():
+                if attr == 'best_weights':
+                    callback.best_weights = [variable.numpy() for variable in self.best_weights]
+                else:
+                    setattr(callback, attr, value)
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.epoch.assign(epoch)
+
+    def on_train_batch_end(self, batch, logs=None):
+        self._steps_since_save += 1
+        if self.save_every_n_steps and self._steps_since_save >= self.save_every_n_steps:
+            self.save()
+
+    def on_epoch_end(self, epoch, logs=None):
+        # The epoch is complete, so a resume starts at the next one
+        self.epoch.assign(epoch + 1)
+        self.save()
@@ -4,56 +4,154 @@ This module handles loading, preprocessing, and augmentation of image data.
 """
 
 import os
+import json
+import math
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from PIL import Image
-import tensorflow as tf
-from tensorflow.keras.preprocessing.image import ImageDataGenerator
-from sklearn.model_selection import train_test_split
 
 
-def load_and_preprocess_image(image_path, target_size=(224, 224)):
+def open_image(source, target_size=None, fast_decode=True):
+    """
+    Open an image as RGB, decoding JPEGs directly at reduced resolution.
+    
+    With fast_decode, JPEGs are decoded using DCT scaling (PIL draft mode) to
+    the smallest 1/2, 1/4 or 1/8 scale that is still at least target_size, so a
+    12MP photo is never fully decoded just to be resized to 224x224.
+    
+    Args:
+        source: File path or file-like object
+        target_size: Tuple of (height, width) the caller will resize to
+            (enables reduced decoding)
+        fast_decode: Whether to use reduced-resolution JPEG decoding
+    
+    Returns:
+        PIL Image in RGB mode
+    """
+    img = Image.open(source)
+    if fast_decode and target_size is not None and img.format == 'JPEG':
+        img.draft('RGB', (target_size[1], target_size[0]))
+    return img.convert('RGB')
+
+
+def allocate_batch_buffer(batch_size, target_size=(224, 224), dtype=np.float32):
+    """
+    Allocate a reusable batch buffer for preprocess_image_into.
+    
+    A uint8 buffer holds raw pixels (150KB per 224x224 image) for models that
+    rescale in-graph; a float32 buffer holds pixels normalized to [0, 1].
+    
+    Args:
+        batch_size: Number of image slots
+        target_size: Tuple of (height, width) of each image
+        dtype: np.float32 or np.uint8
+    
+    Returns:
+        Uninitialized array of shape (batch_size, height, width, 3)
+    """
+    return np.empty((batch_size, target_size[0], target_size[1], 3), dtype=dtype)
+
+
+def preprocess_image_into(source, out, target_size=(224, 224), fast_decode=True):
+    """
+    Decode and resize an image directly into a preallocated buffer slot.
+    
+    Writes raw pixels into a uint8 slot, or pixels normalized to [0, 1] into a
+    float32 slot, without creating intermediate float64 arrays.
+    
+    Args:
+        source: File path or file-like object
+        out: Array of shape (height, width, 3), e.g. one slot of a batch buffer
+        target_size: Tuple of (height, width) for resizing
+        fast_decode: Decode JPEGs at reduced resolution (see open_image)
+    
+    Returns:
+        The filled out array
+    
+    Raises:
+        ValueError: If the image cannot be decoded
+    """
+    try:
+        img = open_image(source, target_size, fast_decode)
+        # PIL sizes are (width, height)
+        pixels = np.asarray(img.resize((target_size[1], target_size[0])))
+    except Exception as e:
+        raise ValueError(f"Error preprocessing image: {e}")
+    
+    if out.dtype == np.uint8:
+        np.copyto(out, pixels)
+    else:
+        np.divide(pixels, out.dtype.type(255), out=out, dtype=out.dtype)
+    return out
+
+
+def load_image_batch(image_paths, target_size=(224, 224), dtype=np.float32, out=None):
+    """
+    Load several images into one contiguous batch buffer.
+    
+    Args:
+        image_paths: List of image file paths
+        target_size: Tuple of (height, width) for resizing
+        dtype: Buffer dtype when out is not given
+        out: Optional preallocated buffer with at least len(image_paths) slots
+    
+    Returns:
+        Tuple of (batch array view, list of indices of images that failed to load)
+    """
+    if out is None:
+        out = allocate_batch_buffer(len(image_paths), target_size, dtype)
+    
+    failed = []
+    for i, image_path in enumerate(image_paths):
+        try:
+            preprocess_image_into(image_path, out[i], target_size)
+        except ValueError as e:
+            print(f"Error loading image {image_path}: {e}")
+            out[i] = 0
+            failed.append(i)
+    return out[:len(image_paths)], failed
+
+
+def load_and_preprocess_image(image_path, target_size=(224, 224), fast_decode=True):
     """
     Load and preprocess a single image.
     
     Args:
         image_path: Path to the image file
         target_size: Tuple of (height, width) for resizing
+        fast_decode: Decode JPEGs at reduced resolution (see open_image)
     
     Returns:
-        Preprocessed image array normalized to [0, 1]
+        Preprocessed float32 image array normalized to [0, 1]
     """
     try:
-        img = Image.open(image_path).convert('RGB')
-        img = img.resize(target_size)
-        img_array = np.array(img) / 255.0
-        return img_array
+        out = allocate_batch_buffer(1, target_size)[0]
+        return preprocess_image_into(image_path, out, target_size, fast_decode)
     except Exception as e:
         print(f"Error loading image {image_path}: {e}")
         return None
 
 
-def preprocess_image_bytes(image_bytes, target_size=(224, 224)):
+def preprocess_image_bytes(image_bytes, target_size=(224, 224), fast_decode=True):
     """
     Preprocess image from bytes for inference.
     
     Args:
         image_bytes: Image data in bytes
         target_size: Tuple of (height, width) for resizing
+        fast_decode: Decode JPEGs at reduced resolution (see open_image)
     
     Returns:
-        Preprocessed image array ready for model input
+        Preprocessed float32 image array of shape (1, height, width, 3)
     """
-    try:
-        img = Image.open(image_bytes).convert('RGB')
-        img = img.resize(target_size)
-        img_array = np.array(img) / 255.0
-        img_array = np.expand_dims(img_array, axis=0)
-        return img_array
-    except Exception as e:
-        raise ValueError(f"Error preprocessing image: {e}")
+    out = allocate_batch_buffer(1, target_size)
+    preprocess_image_into(image_bytes, out[0], target_size, fast_decode)
+    return out
 
 
-def create_data_generators(train_dir, validation_dir, batch_size=32, target_size=(224, 224)):
+def create_data_generators(train_dir, validation_dir, batch_size=32, target_size=(224, 224),
+                           rescale=True):
     """
     Create data generators for training and validation with augmentation.
     
@@ -62,13 +160,19 @@ def create_data_generators(train_dir, validation_dir, batch_size=32, target_size
         validation_dir: Directory containing validation data
         batch_size: Batch size for training
         target_size: Image dimensions
+        rescale: Normalize pixels to [0, 1]; disable for models with
+            in-graph preprocessing layers, which take raw [0, 255] pixels
     
     Returns:
         Tuple of (train_generator, validation_generator)
     """
+    from tensorflow.keras.preprocessing.image import ImageDataGenerator
+    
+    rescale_factor = 1./255 if rescale else None
+    
     # Apply data augmentation for training
     train_datagen = ImageDataGenerator(
-        rescale=1./255,
+        rescale=rescale_factor,
         rotation_range=20,
         width_shift_range=0.2,
         height_shift_range=0.2,
@@ -78,7 +182,7 @@ def create_data_generators(train_dir, validation_dir, batch_size=32, target_size
     )
     
     # Only rescaling for validation
-    validation_datagen = ImageDataGenerator(rescale=1./255)
+    validation_datagen = ImageDataGenerator(rescale=rescale_factor)
     
     train_generator = train_datagen.flow_from_directory(
         train_dir,
@@ -99,6 +203,790 @@ def create_data_generators(train_dir, validation_dir, batch_size=32, target_size
     return train_generator, validation_generator
 
 
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.gif')
+
+
+def list_image_files(directory):
+    """
+    List images in a class-per-subdirectory layout, as flow_from_directory does.
+    
+    Args:
+        directory: Directory containing one subdirectory per class
+    
+    Returns:
+        Tuple of (file paths, integer labels, class names) with classes in
+        alphabetical order (cats=0, dogs=1)
+    """
+    class_names = sorted(
+        name for name in os.listdir(directory)
+        if os.path.isdir(os.path.join(directory, name))
+    )
+    
+    paths, labels = [], []
+    for label, class_name in enumerate(class_names):
+        class_dir = os.path.join(directory, class_name)
+        for filename in sorted(os.listdir(class_dir)):
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                paths.append(os.path.join(class_dir, filename))
+                labels.append(label)
+    
+    return paths, labels, class_names
+
+
+def independent_uniforms(count, batch, seed=None):
+    """
+    Draw `count` independent rows of uniform [0, 1) values.
+    
+    Each row comes from its own seed, split from `seed` with
+    stateless_split, so rows are uncorrelated even though one seed is given.
+    
+    Args:
+        count: Number of rows (one per random parameter)
+        batch: Values per row (one per image)
+        seed: Stateless seed: an int or a shape [2] integer tensor; None draws
+            a fresh seed on every call
+    
+    Returns:
+        float32 tensor of shape (count, batch)
+    """
+    import tensorflow as tf
+    
+    if seed is None:
+        seed = tf.random.uniform([2], maxval=tf.int32.max, dtype=tf.int32)
+    elif isinstance(seed, int):
+        seed = [seed, 0]
+    seeds = tf.random.experimental.stateless_split(tf.cast(seed, tf.int64), num=count)
+    return tf.stack([tf.random.stateless_uniform([batch], seeds[i]) for i in range(count)])
+
+
+def random_augment(images, rotation_range=20, shift_range=0.2, zoom_range=0.2,
+                   horizontal_flip=True, seed=None):
+    """
+    Vectorized augmentation matching the ImageDataGenerator settings.
+    
+    Like ImageDataGenerator, rotation, shift, zoom and flip are composed
+    into a single affine transform per image, so the whole batch is
+    resampled once (nearest fill) instead of once per augmentation.
+    
+    Args:
+        images: float32 tensor of shape (N, H, W, C)
+        rotation_range: Maximum rotation in degrees
+        shift_range: Maximum shift as a fraction of width/height
+        zoom_range: Zoom factors are drawn from [1 - zoom_range, 1 + zoom_range]
+        horizontal_flip: Randomly mirror half of the images
+        seed: Optional stateless seed (see independent_uniforms); the same
+            seed gives the same transforms
+    
+    Returns:
+        Augmented tensor with the same shape as images
+    """
+    import tensorflow as tf
+    
+    shape = tf.shape(images)
+    batch = shape[0]
+    height = tf.cast(shape[1], tf.float32)
+    width = tf.cast(shape[2], tf.float32)
+    
+    # One independent draw per parameter
+    draws = independent_uniforms(6, batch, seed)
+    
+    def uniform(index, low, high):
+        return low + (high - low) * draws[index]
+    
+    theta = uniform(0, -rotation_range, rotation_range) * (math.pi / 180)
+    shift_x = uniform(1, -shift_range, shift_range) * width
+    shift_y = uniform(2, -shift_range, shift_range) * height
+    zoom_x = uniform(3, 1 - zoom_range, 1 + zoom_range)
+    zoom_y = uniform(4, 1 - zoom_range, 1 + zoom_range)
+    if horizontal_flip:
+        flip = tf.where(draws[5] < 0.5, -1.0, 1.0)
+    else:
+        flip = tf.ones([batch])
+    
+    # Map each output pixel to its source pixel: rotate, zoom and flip
+    # about the image centre, then shift
+    cos, sin = tf.cos(theta), tf.sin(theta)
+    a0 = cos * zoom_x * flip
+    a1 = -sin * zoom_y
+    b0 = sin * zoom_x * flip
+    b1 = cos * zoom_y
+    center_x = (width - 1) / 2
+    center_y = (height - 1) / 2
+    a2 = center_x - a0 * center_x - a1 * center_y + shift_x
+    b2 = center_y - b0 * center_x - b1 * center_y + shift_y
+    zeros = tf.zeros([batch])
+    transforms = tf.stack([a0, a1, a2, b0, b1, b2, zeros, zeros], axis=1)
+    
+    return tf.raw_ops.ImageProjectiveTransformV3(
+        images=images,
+        transforms=transforms,
+        output_shape=shape[1:3],
+        fill_value=0.0,
+        interpolation='BILINEAR',
+        fill_mode='NEAREST'
+    )
+
+
+def decode_and_resize_bytes(contents, target_size=(224, 224)):
+    """
+    Decode and resize one encoded image inside the tf.data graph, like serving does.
+    
+    Matches preprocess_image_into: JPEGs are decoded at the same reduced DCT
+    scale PIL draft mode picks (see open_image), and images are resized with
+    antialiased bicubic interpolation and rounded to whole pixel values, so
+    training and serving see the same pixels.
+    
+    Args:
+        contents: Scalar string tensor with the encoded image
+        target_size: Tuple of (height, width)
+    
+    Returns:
+        float32 tensor of shape (height, width, 3) with values in [0, 255]
+    """
+    import tensorflow as tf
+    
+    def decode_jpeg():
+        shape = tf.image.extract_jpeg_shape(contents)
+        scale = tf.minimum(shape[0] // target_size[0], shape[1] // target_size[1])
+        return tf.case(
+            [(scale >= ratio, lambda ratio=ratio: tf.io.decode_jpeg(contents, channels=3, ratio=ratio))
+             for ratio in (8, 4, 2)],
+            default=lambda: tf.io.decode_jpeg(contents, channels=3)
+        )
+    
+    image = tf.cond(
+        tf.io.is_jpeg(contents),
+        decode_jpeg,
+        lambda: tf.io.decode_image(contents, channels=3, expand_animations=False)
+    )
+    image = tf.image.resize(image, target_size, method='bicubic', antialias=True)
+    return tf.clip_by_value(tf.round(image), 0, 255)
+
+
+def decode_and_resize(path, target_size=(224, 224)):
+    """
+    Read, decode and resize one image inside the tf.data graph.
+    
+    Args:
+        path: Scalar string tensor with the image path
+        target_size: Tuple of (height, width)
+    
+    Returns:
+        float32 tensor of shape (height, width, 3) with values in [0, 255]
+    """
+    import tensorflow as tf
+    
+    return decode_and_resize_bytes(tf.io.read_file(path), target_size)
+
+
+def augment_and_prefetch(dataset, training=False, rescale=True, seed=None):
+    """
+    Apply the per-batch tail of a training pipeline.
+    
+    Args:
+        dataset: tf.data.Dataset of (images, labels) batches with float32 pixels in [0, 255]
+        training: Augment batches
+        rescale: Normalize pixels to [0, 1]
+        seed: Optional random seed for augmentation
+    
+    Returns:
+        Prefetched tf.data.Dataset
+    """
+    import tensorflow as tf
+    
+    autotune = tf.data.AUTOTUNE
+    
+    if training and seed is None:
+        dataset = dataset.map(
+            lambda images, batch_labels: (random_augment(images), batch_labels),
+            num_parallel_calls=autotune
+        )
+    elif training:
+        # A seeded stream of per-batch seeds: batches get different transforms,
+        # reproducible for a given seed, and new ones every epoch
+        batch_seeds = tf.data.Dataset.random(seed=seed, rerandomize_each_iteration=True).batch(2)
+        dataset = tf.data.Dataset.zip((dataset, batch_seeds)).map(
+            lambda batch, batch_seed: (random_augment(batch[0], seed=batch_seed), batch[1]),
+            num_parallel_calls=autotune
+        )
+    
+    if rescale:
+        dataset = dataset.map(
+            lambda images, batch_labels: (images * (1.0 / 255), batch_labels),
+            num_parallel_calls=autotune
+        )
+    
+    return dataset.prefetch(autotune)
+
+
+def shuffle_for_training(dataset, buffer_size, seed=None, resume_offset=None, epoch_size=None):
+    """
+    Shuffle training examples, optionally resuming partway through an epoch.
+    
+    Each iteration reshuffles, so iterating the dataset once per epoch with a
+    fixed seed gives the same sequence of epoch orders in every process.
+    With resume_offset, the dataset is instead only the rest of the epoch
+    containing that offset, in the order the interrupted run would have
+    used. Skipping happens before decoding, so it is cheap.
+    
+    Args:
+        dataset: tf.data.Dataset of undecoded examples (paths, indices or records)
+        buffer_size: Shuffle buffer size
+        seed: Optional random seed
+        resume_offset: None for a single shuffled epoch, or the number of
+            examples already consumed since the start of the first epoch
+        epoch_size: Examples per epoch (defaults to buffer_size)
+    
+    Returns:
+        Shuffled tf.data.Dataset
+    """
+    import tensorflow as tf
+    
+    dataset = dataset.shuffle(buffer_size, seed=seed, reshuffle_each_iteration=True)
+    if resume_offset is None:
+        return dataset
+    epoch_size = epoch_size or buffer_size
+    return dataset.repeat().skip(resume_offset).take(epoch_size - resume_offset % epoch_size)
+
+
+def create_tf_dataset(paths, labels, batch_size=32, target_size=(224, 224), training=False,
+                      rescale=True, seed=None, resume_offset=None):
+    """
+    Build a tf.data pipeline over image files.
+    
+    Files are decoded in parallel (num_parallel_calls=AUTOTUNE), batched,
+    augmented per batch when training, and prefetched.
+    
+    Args:
+        paths: List of image file paths
+        labels: List of integer labels
+        batch_size: Batch size
+        target_size: Tuple of (height, width)
+        training: Shuffle and augment
+        rescale: Normalize pixels to [0, 1] (disable for in-graph preprocessing models)
+        seed: Optional random seed for shuffling and augmentation
+        resume_offset: Training only; yield the rest of the epoch after this
+            many examples (see shuffle_for_training)
+    
+    Returns:
+        tf.data.Dataset yielding (images, labels) batches
+    """
+    import tensorflow as tf
+    
+    dataset = tf.data.Dataset.from_tensor_slices(
+        (tf.constant(paths), tf.constant(labels, dtype=tf.float32))
+    )
+    
+    if training:
+        dataset = shuffle_for_training(dataset, len(paths), seed, resume_offset)
+    
+    dataset = dataset.map(
+        lambda path, label: (decode_and_resize(path, target_size), label),
+        num_parallel_calls=tf.data.AUTOTUNE
+    )
+    
+    return augment_and_prefetch(dataset.batch(batch_size), training, rescale, seed)
+
+
+def hash_file(path, chunk_size=1 << 20):
+    """
+    Hash a file's contents.
+    
+    Args:
+        path: File path
+        chunk_size: Bytes read per chunk
+    
+    Returns:
+        BLAKE2b hex digest (16 bytes)
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_decoded_cache(paths, labels, cache_dir, target_size=(224, 224), workers=None):
+    """
+    Decode and resize images once into a memory-mapped uint8 array on disk.
+    
+    The cache is keyed by the content hash of every source file, its label
+    and target_size, so it is reused across epochs and training runs until
+    any image changes. Files are hashed and decoded on a thread pool. Images
+    that fail to decode keep label -1 and are skipped by the datasets.
+    
+    Args:
+        paths: List of image file paths
+        labels: List of integer labels
+        cache_dir: Directory holding cache files
+        target_size: Tuple of (height, width)
+        workers: Decode threads (default: CPU count + 4, at most 32)
+    
+    Returns:
+        Tuple of (read-only uint8 memmap of shape (N, height, width, 3),
+        int32 label array)
+    """
+    height, width = target_size
+    workers = workers or min(32, (os.cpu_count() or 1) + 4)
+    
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        key = hashlib.blake2b(f"{height}x{width}".encode(), digest_size=16)
+        for file_hash, label in zip(pool.map(hash_file, paths), labels):
+            key.update(f"{file_hash}:{label}\n".encode())
+        
+        name = os.path.join(cache_dir, f"decoded_{height}x{width}_{key.hexdigest()}")
+        images_path = name + '.npy'
+        labels_path = name + '.labels.npy'
+        
+        # The labels file is written last, so its presence marks a complete cache
+        if os.path.exists(labels_path) and os.path.exists(images_path):
+            print(f"Using decoded image cache {images_path}")
+            return np.load(images_path, mmap_mode='r'), np.load(labels_path)
+        
+        print(f"Building decoded image cache {images_path} ({len(paths)} images)...")
+        os.makedirs(cache_dir, exist_ok=True)
+        images = np.lib.format.open_memmap(
+            images_path + '.tmp', mode='w+', dtype=np.uint8, shape=(len(paths), height, width, 3)
+        )
+        cached_labels = np.asarray(labels, dtype=np.int32)
+        
+        def decode(i):
+            try:
+                preprocess_image_into(paths[i], images[i], target_size)
+            except ValueError as e:
+                print(f"Error loading image {paths[i]}: {e}")
+                cached_labels[i] = -1
+        
+        list(pool.map(decode, range(len(paths))))
+    
+    images.flush()
+    del images
+    os.replace(images_path + '.tmp', images_path)
+    with open(labels_path + '.tmp', 'wb') as f:
+        np.save(f, cached_labels)
+    os.replace(labels_path + '.tmp', labels_path)
+    
+    return np.load(images_path, mmap_mode='r'), cached_labels
+
+
+def create_cached_dataset(images, labels, batch_size=32, training=False, rescale=True, seed=None,
+                          resume_offset=None):
+    """
+    Build a tf.data pipeline over a decoded image cache.
+    
+    Each batch is one sorted gather from the memory-mapped array, so only
+    the rows in use are paged in. Augmentation runs after the cache, so
+    every epoch still sees fresh random transforms.
+    
+    Args:
+        images: uint8 array or memmap of shape (N, H, W, 3) from build_decoded_cache
+        labels: Integer labels (-1 marks images to skip)
+        batch_size: Batch size
+        training: Shuffle and augment
+        rescale: Normalize pixels to [0, 1]
+        seed: Optional random seed for shuffling and augmentation
+        resume_offset: Training only; yield the rest of the epoch after this
+            many examples (see shuffle_for_training)
+    
+    Returns:
+        tf.data.Dataset yielding (images, labels) batches
+    """
+    import tensorflow as tf
+    
+    indices = np.flatnonzero(np.asarray(labels) >= 0)
+    float_labels = np.asarray(labels, dtype=np.float32)
+    
+    def gather(batch_indices):
+        batch_indices = np.sort(batch_indices)
+        return images[batch_indices], float_labels[batch_indices]
+    
+    def load_batch(batch_indices):
+        batch_images, batch_labels = tf.numpy_function(
+            gather, [batch_indices], (tf.uint8, tf.float32)
+        )
+        batch_images.set_shape((None,) + images.shape[1:])
+        batch_labels.set_shape((None,))
+        return tf.cast(batch_images, tf.float32), batch_labels
+    
+    dataset = tf.data.Dataset.from_tensor_slices(indices)
+    if training:
+        dataset = shuffle_for_training(dataset, len(indices), seed, resume_offset)
+    dataset = dataset.batch(batch_size).map(load_batch, num_parallel_calls=tf.data.AUTOTUNE)
+    
+    return augment_and_prefetch(dataset, training, rescale, seed)
+
+
+def build_feature_cache(paths, labels, cache_dir, extract_fn, extractor_id, target_size=(224, 224),
+                        batch_size=64, workers=None):
+    """
+    Compute embeddings of a frozen feature extractor once and store them on disk.
+    
+    Keyed like build_decoded_cache by the content hash of every source file
+    and its label, plus extractor_id and target_size, so a head can be
+    retrained any number of times without running the extractor again.
+    Images that fail to decode keep label -1.
+    
+    Args:
+        paths: List of image file paths
+        labels: List of integer labels
+        cache_dir: Directory holding cache files
+        extract_fn: Callable mapping a uint8 (N, height, width, 3) batch to
+            (N, embedding_dim) features
+        extractor_id: String identifying the extractor and its weights
+        target_size: Tuple of (height, width)
+        batch_size: Images decoded and embedded per call
+        workers: Hashing threads (default: CPU count + 4, at most 32)
+    
+    Returns:
+        Tuple of (read-only float32 memmap of shape (N, embedding_dim),
+        int32 label array)
+    """
+    if not paths:
+        raise ValueError("No images to extract features from")
+    height, width = target_size
+    workers = workers or min(32, (os.cpu_count() or 1) + 4)
+    
+    key = hashlib.blake2b(f"{extractor_id}:{height}x{width}".encode(), digest_size=16)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for file_hash, label in zip(pool.map(hash_file, paths), labels):
+            key.update(f"{file_hash}:{label}\n".encode())
+    
+    name = os.path.join(cache_dir, f"features_{key.hexdigest()}")
+    features_path = name + '.npy'
+    labels_path = name + '.labels.npy'
+    
+    # The labels file is written last, so its presence marks a complete cache
+    if os.path.exists(labels_path) and os.path.exists(features_path):
+        print(f"Using feature cache {features_path}")
+        return np.load(features_path, mmap_mode='r'), np.load(labels_path)
+    
+    print(f"Building feature cache {features_path} ({len(paths)} images)...")
+    os.makedirs(cache_dir, exist_ok=True)
+    cached_labels = np.asarray(labels, dtype=np.int32)
+    buffer = allocate_batch_buffer(batch_size, target_size, dtype=np.uint8)
+    features = None
+    
+    for start in range(0, len(paths), batch_size):
+        batch_paths = paths[start:start + batch_size]
+        images, failed = load_image_batch(batch_paths, target_size, out=buffer)
+        batch_features = np.asarray(extract_fn(images))
+        if features is None:
+            features = np.lib.format.open_memmap(
+                features_path + '.tmp', mode='w+', dtype=np.float32,
+                shape=(len(paths), batch_features.shape[1])
+            )
+        features[start:start + len(batch_paths)] = batch_features
+        for i in failed:
+            cached_labels[start + i] = -1
+    
+    features.flush()
+    del features
+    os.replace(features_path + '.tmp', features_path)
+    with open(labels_path + '.tmp', 'wb') as f:
+        np.save(f, cached_labels)
+    os.replace(labels_path + '.tmp', labels_path)
+    
+    return np.load(features_path, mmap_mode='r'), cached_labels
+
+
+def create_file_datasets(train_paths, train_labels, val_paths, val_labels, batch_size=32,
+                         target_size=(224, 224), rescale=True, seed=None, cache_dir=None,
+                         resume_offset=None):
+    """
+    Create training and validation pipelines from lists of image files.
+    
+    Args:
+        train_paths: Training image paths
+        train_labels: Training integer labels
+        val_paths: Validation image paths
+        val_labels: Validation integer labels
+        batch_size: Batch size for training
+        target_size: Image dimensions
+        rescale: Normalize pixels to [0, 1]
+        seed: Optional random seed
+        cache_dir: Decode images once into a reusable on-disk cache here
+            (see build_decoded_cache) instead of decoding every epoch
+        resume_offset: Make the training dataset the rest of the epoch after
+            this many examples (see shuffle_for_training)
+    
+    Returns:
+        Tuple of (train_dataset, validation_dataset, validation_labels,
+        train_samples, validation_samples)
+    """
+    if cache_dir:
+        train_images, train_labels = build_decoded_cache(
+            train_paths, train_labels, cache_dir, target_size
+        )
+        val_images, val_labels = build_decoded_cache(
+            val_paths, val_labels, cache_dir, target_size
+        )
+        train_dataset = create_cached_dataset(
+            train_images, train_labels, batch_size, training=True, rescale=rescale, seed=seed,
+            resume_offset=resume_offset
+        )
+        validation_dataset = create_cached_dataset(
+            val_images, val_labels, batch_size, training=False, rescale=rescale
+        )
+        val_labels = val_labels[val_labels >= 0]
+        return (train_dataset, validation_dataset, val_labels,
+                int((train_labels >= 0).sum()), len(val_labels))
+    
+    train_dataset = create_tf_dataset(
+        train_paths, train_labels, batch_size, target_size,
+        training=True, rescale=rescale, seed=seed, resume_offset=resume_offset
+    )
+    validation_dataset = create_tf_dataset(
+        val_paths, val_labels, batch_size, target_size,
+        training=False, rescale=rescale
+    )
+    
+    return (train_dataset, validation_dataset, np.array(val_labels),
+            len(train_paths), len(val_paths))
+
+
+def create_tf_datasets(train_dir, validation_dir, batch_size=32, target_size=(224, 224),
+                       rescale=True, seed=None, cache_dir=None, resume_offset=None):
+    """
+    Create tf.data pipelines for training and validation with augmentation.
+    
+    Drop-in alternative to create_data_generators with the same augmentation
+    semantics and class ordering.
+    
+    Args:
+        train_dir: Directory containing training data
+        validation_dir: Directory containing validation data
+        batch_size: Batch size for training
+        target_size: Image dimensions
+        rescale: Normalize pixels to [0, 1]
+        seed: Optional random seed
+        cache_dir: Decode images once into a reusable on-disk cache here
+            (see build_decoded_cache) instead of decoding every epoch
+        resume_offset: Make the training dataset the rest of the epoch after
+            this many examples (see shuffle_for_training)
+    
+    Returns:
+        Tuple of (train_dataset, validation_dataset, validation_labels,
+        train_samples, validation_samples)
+    """
+    train_paths, train_labels, _ = list_image_files(train_dir)
+    val_paths, val_labels, _ = list_image_files(validation_dir)
+    
+    return create_file_datasets(
+        train_paths, train_labels, val_paths, val_labels,
+        batch_size, target_size, rescale, seed, cache_dir, resume_offset
+    )
+
+
+def load_manifest_split(manifest_path, split, fraction=1.0, seed=42):
+    """
+    Load the images of one split from a prepare_dataset.py manifest.
+    
+    Entry paths are resolved relative to the manifest's directory. A
+    fraction below 1 draws a class-stratified random subset, so smaller
+    experiments need no copying.
+    
+    Args:
+        manifest_path: Path to manifest.jsonl
+        split: Split name ('train', 'validation' or 'test')
+        fraction: Fraction of each class to keep
+        seed: Random seed for subset sampling
+    
+    Returns:
+        Tuple of (file paths, integer labels)
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    with open(manifest_path) as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    entries = [entry for entry in entries if entry['split'] == split]
+    
+    if fraction < 1.0:
+        rng = np.random.default_rng(seed)
+        labels = np.array([entry['label'] for entry in entries])
+        keep = []
+        for label in np.unique(labels):
+            members = np.flatnonzero(labels == label)
+            keep.extend(rng.choice(members, max(1, round(len(members) * fraction)), replace=False))
+        entries = [entries[i] for i in sorted(keep)]
+    
+    paths = [os.path.normpath(os.path.join(base_dir, entry['path'])) for entry in entries]
+    return paths, [entry['label'] for entry in entries]
+
+
+def create_manifest_datasets(manifest_path, batch_size=32, target_size=(224, 224), rescale=True,
+                             seed=None, cache_dir=None, fraction=1.0,
+                             train_split='train', validation_split='validation',
+                             resume_offset=None):
+    """
+    Create training and validation pipelines straight from a split manifest.
+    
+    Args:
+        manifest_path: Path to manifest.jsonl
+        batch_size: Batch size for training
+        target_size: Image dimensions
+        rescale: Normalize pixels to [0, 1]
+        seed: Optional random seed
+        cache_dir: Optional decoded image cache directory (see build_decoded_cache)
+        fraction: Fraction of each class to keep in both splits
+        train_split: Manifest split used for training
+        validation_split: Manifest split used for validation
+        resume_offset: Make the training dataset the rest of the epoch after
+            this many examples (see shuffle_for_training)
+    
+    Returns:
+        Tuple of (train_dataset, validation_dataset, validation_labels,
+        train_samples, validation_samples)
+    """
+    sample_seed = 42 if seed is None else seed
+    train_paths, train_labels = load_manifest_split(manifest_path, train_split, fraction, sample_seed)
+    val_paths, val_labels = load_manifest_split(manifest_path, validation_split, fraction, sample_seed)
+    return create_file_datasets(
+        train_paths, train_labels, val_paths, val_labels,
+        batch_size, target_size, rescale, seed, cache_dir, resume_offset
+    )
+
+
+def tfrecord_features():
+    """
+    Feature spec of the TFRecord examples written by prepare_dataset.py.
+    
+    Returns:
+        Dictionary of tf.io.FixedLenFeature by feature name
+    """
+    import tensorflow as tf
+    
+    return {
+        'image': tf.io.FixedLenFeature([], tf.string),
+        'label': tf.io.FixedLenFeature([], tf.int64),
+        'filename': tf.io.FixedLenFeature([], tf.string)
+    }
+
+
+def read_shard_index(split_dir):
+    """
+    Read the index written by prepare_dataset.py --format tfrecord.
+    
+    Args:
+        split_dir: Directory of one sharded split (e.g. data/train)
+    
+    Returns:
+        Index dictionary with shard paths resolved against split_dir
+    """
+    with open(os.path.join(split_dir, 'index.json')) as f:
+        index = json.load(f)
+    for shard in index['shards']:
+        shard['path'] = os.path.join(split_dir, shard['file'])
+    return index
+
+
+def read_tfrecord_labels(split_dir):
+    """
+    Read labels of a sharded split in record order, without decoding images.
+    
+    Args:
+        split_dir: Directory of one sharded split
+    
+    Returns:
+        Integer label array in the order create_tfrecord_dataset yields
+        records when not training
+    """
+    import tensorflow as tf
+    
+    shard_paths = [shard['path'] for shard in read_shard_index(split_dir)['shards']]
+    label_feature = {'label': tfrecord_features()['label']}
+    labels = tf.data.TFRecordDataset(shard_paths).map(
+        lambda record: tf.io.parse_single_example(record, label_feature)['label'],
+        num_parallel_calls=tf.data.AUTOTUNE
+    )
+    return np.fromiter(labels.as_numpy_iterator(), dtype=np.int64)
+
+
+def create_tfrecord_dataset(split_dir, batch_size=32, target_size=(224, 224), training=False,
+                            rescale=True, seed=None, resume_offset=None):
+    """
+    Build a tf.data pipeline over a sharded TFRecord split.
+    
+    Shards are read sequentially in large blocks. When training, shard order
+    is shuffled and several shards are read in parallel; otherwise shards are
+    read one after another so record order matches read_tfrecord_labels.
+    
+    Args:
+        split_dir: Directory of one sharded split
+        batch_size: Batch size
+        target_size: Tuple of (height, width)
+        training: Shuffle and augment
+        rescale: Normalize pixels to [0, 1]
+        seed: Optional random seed for shuffling and augmentation
+        resume_offset: Training only; yield the rest of the epoch after this
+            many records (see shuffle_for_training)
+    
+    Returns:
+        tf.data.Dataset yielding (images, labels) batches
+    """
+    import tensorflow as tf
+    
+    autotune = tf.data.AUTOTUNE
+    index = read_shard_index(split_dir)
+    shard_paths = [shard['path'] for shard in index['shards']]
+    
+    if training:
+        files = tf.data.Dataset.from_tensor_slices(shard_paths).shuffle(
+            len(shard_paths), seed=seed, reshuffle_each_iteration=True
+        )
+        dataset = files.interleave(
+            tf.data.TFRecordDataset,
+            cycle_length=min(len(shard_paths), 8),
+            num_parallel_calls=autotune
+        )
+        dataset = shuffle_for_training(
+            dataset, min(index['num_records'], 10000), seed, resume_offset, index['num_records']
+        )
+    else:
+        dataset = tf.data.TFRecordDataset(shard_paths)
+    
+    features = tfrecord_features()
+    
+    def parse(record):
+        example = tf.io.parse_single_example(record, features)
+        image = decode_and_resize_bytes(example['image'], target_size)
+        return image, tf.cast(example['label'], tf.float32)
+    
+    dataset = dataset.map(parse, num_parallel_calls=autotune)
+    
+    return augment_and_prefetch(dataset.batch(batch_size), training, rescale, seed)
+
+
+def create_tfrecord_datasets(train_dir, validation_dir, batch_size=32, target_size=(224, 224),
+                             rescale=True, seed=None, resume_offset=None):
+    """
+    Create training and validation pipelines from sharded TFRecord splits.
+    
+    Args:
+        train_dir: Directory of the sharded training split
+        validation_dir: Directory of the sharded validation split
+        batch_size: Batch size for training
+        target_size: Image dimensions
+        rescale: Normalize pixels to [0, 1]
+        seed: Optional random seed
+        resume_offset: Make the training dataset the rest of the epoch after
+            this many records (see shuffle_for_training)
+    
+    Returns:
+        Tuple of (train_dataset, validation_dataset, validation_labels,
+        train_samples, validation_samples)
+    """
+    train_dataset = create_tfrecord_dataset(
+        train_dir, batch_size, target_size, training=True, rescale=rescale, seed=seed,
+        resume_offset=resume_offset
+    )
+    validation_dataset = create_tfrecord_dataset(
+        validation_dir, batch_size, target_size, training=False, rescale=rescale
+    )
+    val_labels = read_tfrecord_labels(validation_dir)
+    
+    return (train_dataset, validation_dataset, val_labels,
+            read_shard_index(train_dir)['num_records'], len(val_labels))
+
+
 def prepare_dataset_split(data_dir, output_dir, train_ratio=0.8, val_ratio=0.1, test_ratio=0.1):
     """
     Split dataset into train, validation, and test sets.
@@ -125,6 +1013,9 @@ def validate_image(image_path):
     """
     Validate if an image file is readable and has correct format.
     
+    Checks the file structure and then fully decodes it, since truncated
+    JPEGs pass Image.verify() and only fail when the pixels are read.
+    
     Args:
         image_path: Path to image file
     
@@ -132,8 +1023,10 @@ def validate_image(image_path):
         Boolean indicating if image is valid
     """
     try:
-        img = Image.open(image_path)
-        img.verify()
+        with Image.open(image_path) as img:
+            img.verify()
+        with Image.open(image_path) as img:
+            img.load()
         return True
-    except:
+    except Exception:
         return False
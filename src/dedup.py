@@ -0,0 +1,169 @@
+"""
+Near-duplicate image detection for dataset preparation.
+Perceptual (difference) hashes plus a multi-index hash lookup, so duplicate
+clusters can be kept inside a single split.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image
+
+
+HASH_SIZE = 8
+
+# Largest supported duplicate distance: beyond it the index chunks are 3 bits
+# or less, so most hashes share a chunk and the search approaches all pairs
+MAX_DISTANCE = 15
+
+
+def load_hash_thumbnail(path, hash_size=HASH_SIZE):
+    """
+    Load a tiny grayscale thumbnail for difference hashing.
+
+    JPEGs are decoded at reduced resolution (draft mode) since only a
+    (hash_size + 1) x hash_size image is needed.
+
+    Args:
+        path: Image file path
+        hash_size: Hash side length (hash has hash_size**2 bits)
+
+    Returns:
+        uint8 array of shape (hash_size, hash_size + 1)
+    """
+    with Image.open(path) as img:
+        img.draft('L', (hash_size * 8, hash_size * 8))
+        thumbnail = img.convert('L').resize((hash_size + 1, hash_size), Image.BILINEAR)
+        return np.asarray(thumbnail, dtype=np.uint8)
+
+
+def load_hash_thumbnails(paths, hash_size=HASH_SIZE, workers=8):
+    """
+    Load thumbnails for many images on a thread pool.
+
+    Args:
+        paths: List of image file paths
+        hash_size: Hash side length
+        workers: Number of concurrent decodes
+
+    Returns:
+        uint8 array of shape (len(paths), hash_size, hash_size + 1)
+    """
+    thumbnails = np.empty((len(paths), hash_size, hash_size + 1), dtype=np.uint8)
+
+    def load(i):
+        thumbnails[i] = load_hash_thumbnail(paths[i], hash_size)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(load, range(len(paths))))
+    return thumbnails
+
+
+def dhash_batch(thumbnails):
+    """
+    Compute 64-bit difference hashes for a batch of thumbnails at once.
+
+    Each bit records whether a pixel is brighter than its left neighbour,
+    which survives resizing, recompression and small brightness changes.
+
+    Args:
+        thumbnails: uint8 array of shape (N, 8, 9)
+
+    Returns:
+        uint64 array of N hashes
+    """
+    bits = thumbnails[:, :, 1:] > thumbnails[:, :, :-1]
+    packed = np.packbits(bits.reshape(len(thumbnails), -1), axis=1)
+    return packed.view('>u8').ravel().astype(np.uint64)
+
+
+def hamming_distance(a, b):
+    """
+    Element-wise Hamming distance between uint64 hash arrays.
+
+    Args:
+        a: uint64 array
+        b: uint64 array broadcastable with a
+
+    Returns:
+        Array of bit distances
+    """
+    xor = np.bitwise_xor(np.asarray(a, dtype=np.uint64), np.asarray(b, dtype=np.uint64))
+    flat = np.ascontiguousarray(xor).reshape(-1)
+    return np.unpackbits(flat.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1).reshape(xor.shape)
+
+
+def find_near_duplicates(hashes, max_distance=4):
+    """
+    Find all pairs of hashes within max_distance bits, without comparing every pair.
+
+    Multi-index hashing: the 64 bits are cut into max_distance + 1 chunks.
+    Two hashes within max_distance bits must agree exactly on at least one
+    chunk (pigeonhole), so only hashes sharing a chunk value are compared.
+
+    Args:
+        hashes: uint64 array of N hashes
+        max_distance: Maximum Hamming distance counted as a duplicate
+            (0 to MAX_DISTANCE)
+
+    Returns:
+        int64 array of shape (M, 2) of index pairs (i < j)
+
+    Raises:
+        ValueError: If max_distance is outside 0 to MAX_DISTANCE
+    """
+    if not 0 <= max_distance <= MAX_DISTANCE:
+        raise ValueError(f"max_distance must be between 0 and {MAX_DISTANCE}, got {max_distance}")
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    if len(hashes) < 2:
+        return np.empty((0, 2), dtype=np.int64)
+
+    bits = np.unpackbits(hashes.astype('>u8').view(np.uint8).reshape(-1, 8), axis=1)
+    candidates = []
+    for chunk in np.array_split(np.arange(64), max_distance + 1):
+        keys = bits[:, chunk].astype(np.int64) @ (1 << np.arange(len(chunk), dtype=np.int64))
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        # Pair every hash with the ones `offset` places later in the same bucket
+        offset = 1
+        while offset < len(order):
+            same = np.flatnonzero(sorted_keys[offset:] == sorted_keys[:-offset])
+            if len(same) == 0:
+                break
+            candidates.append(np.stack([order[same], order[same + offset]], axis=1))
+            offset += 1
+
+    if not candidates:
+        return np.empty((0, 2), dtype=np.int64)
+
+    pairs = np.sort(np.concatenate(candidates), axis=1).astype(np.int64)
+    codes = np.unique(pairs[:, 0] * len(hashes) + pairs[:, 1])
+    pairs = np.stack([codes // len(hashes), codes % len(hashes)], axis=1)
+    close = hamming_distance(hashes[pairs[:, 0]], hashes[pairs[:, 1]]) <= max_distance
+    return pairs[close]
+
+
+def cluster_pairs(num_items, pairs):
+    """
+    Group items connected by duplicate pairs (union-find).
+
+    Args:
+        num_items: Number of items
+        pairs: Array of shape (M, 2) of index pairs
+
+    Returns:
+        int array mapping each item to its cluster's smallest member index
+    """
+    parent = np.arange(num_items)
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in pairs:
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    return np.array([find(i) for i in range(num_items)])
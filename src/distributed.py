@@ -0,0 +1,239 @@
+"""
+Distributed training helpers: TF_CONFIG parsing, tf.distribute strategy
+creation, CPU thread configuration and a local multi-worker launcher.
+"""
+
+import os
+import sys
+import json
+import socket
+import argparse
+import subprocess
+import tensorflow as tf
+
+
+STRATEGIES = ('none', 'mirrored', 'multi_worker')
+
+
+def read_tf_config():
+    """
+    Read the cluster spec and task from the TF_CONFIG environment variable.
+
+    Returns:
+        Dictionary with 'cluster' and 'task' keys (empty when TF_CONFIG is unset)
+    """
+    tf_config = json.loads(os.environ.get('TF_CONFIG') or '{}')
+    return {
+        'cluster': tf_config.get('cluster', {}),
+        'task': tf_config.get('task', {})
+    }
+
+
+def is_chief(tf_config=None):
+    """
+    Whether this process is the chief, which owns logging and saved artifacts.
+
+    The chief is the 'chief' task, or worker 0 when the cluster has no chief.
+    A process without TF_CONFIG is always the chief.
+
+    Args:
+        tf_config: Parsed TF_CONFIG (defaults to the environment)
+
+    Returns:
+        True if this process should write the model and MLflow run
+    """
+    tf_config = tf_config or read_tf_config()
+    task_type = tf_config['task'].get('type')
+    if task_type is None or task_type == 'chief':
+        return True
+    return task_type == 'worker' and tf_config['task'].get('index', 0) == 0 \
+        and 'chief' not in tf_config['cluster']
+
+
+def local_tf_config(num_workers, index, ports):
+    """
+    Build TF_CONFIG for one of num_workers processes on this host.
+
+    Args:
+        num_workers: Number of worker processes
+        index: This worker's index
+        ports: List of num_workers free ports
+
+    Returns:
+        TF_CONFIG dictionary
+    """
+    return {
+        'cluster': {'worker': [f"localhost:{port}" for port in ports[:num_workers]]},
+        'task': {'type': 'worker', 'index': index}
+    }
+
+
+def configure_threads(intra_op_threads=0, inter_op_threads=0):
+    """
+    Set TensorFlow CPU thread pools. Must run before any TensorFlow op.
+
+    Args:
+        intra_op_threads: Threads used inside one op such as a convolution (0 = TF default)
+        inter_op_threads: Independent ops run concurrently (0 = TF default)
+    """
+    if intra_op_threads:
+        tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+    if inter_op_threads:
+        tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+
+
+def create_strategy(name='none'):
+    """
+    Create a tf.distribute strategy.
+
+    Args:
+        name: 'none' (default single-device strategy), 'mirrored' (all local
+            GPUs in one process) or 'multi_worker' (MultiWorkerMirroredStrategy,
+            cluster read from TF_CONFIG). Must be created before any TensorFlow op
+
+    Returns:
+        tf.distribute.Strategy
+    """
+    if name == 'mirrored':
+        return tf.distribute.MirroredStrategy()
+    if name == 'multi_worker':
+        return tf.distribute.MultiWorkerMirroredStrategy()
+    if name != 'none':
+        raise ValueError(f"Unknown strategy '{name}', expected one of {STRATEGIES}")
+    return tf.distribute.get_strategy()
+
+
+def scale_for_replicas(batch_size, learning_rate, num_replicas, lr_scaling='linear'):
+    """
+    Derive the global batch size and learning rate for synchronous data parallelism.
+
+    Each replica processes batch_size images per step, so the global batch
+    grows with the replica count. With linear scaling the learning rate grows
+    with it, which keeps the per-image update size of a single-replica run.
+
+    Args:
+        batch_size: Per-replica batch size
+        learning_rate: Single-replica learning rate
+        num_replicas: Replicas in sync across all workers
+        lr_scaling: 'linear' or 'none'
+
+    Returns:
+        Tuple of (global_batch_size, learning_rate)
+    """
+    global_batch_size = batch_size * num_replicas
+    if lr_scaling == 'linear':
+        learning_rate = learning_rate * num_replicas
+    return global_batch_size, learning_rate
+
+
+def shard_by_data(dataset):
+    """
+    Make multi-worker autosharding split a dataset by element.
+
+    The file-list and memmap pipelines are not file-based, so every worker
+    reads the same source and keeps its own 1/num_workers of the elements.
+
+    Args:
+        dataset: tf.data.Dataset (other inputs are returned unchanged)
+
+    Returns:
+        Dataset with the DATA auto-shard policy
+    """
+    if not isinstance(dataset, tf.data.Dataset):
+        return dataset
+    options = tf.data.Options()
+    options.experimental_distribute.auto_shard_policy = tf.data.experimental.AutoShardPolicy.DATA
+    return dataset.with_options(options)
+
+
+def describe_topology(strategy):
+    """
+    Summarize the training topology for logging.
+
+    Args:
+        strategy: tf.distribute.Strategy in use
+
+    Returns:
+        Dictionary of topology parameters
+    """
+    tf_config = read_tf_config()
+    cluster = tf_config['cluster']
+    return {
+        'strategy_class': type(strategy).__name__,
+        'num_workers': max(1, len(cluster.get('worker', [])) + len(cluster.get('chief', []))),
+        'num_replicas_in_sync': strategy.num_replicas_in_sync,
+        'task_type': tf_config['task'].get('type', 'local'),
+        'task_index': tf_config['task'].get('index', 0),
+        'intra_op_threads': tf.config.threading.get_intra_op_parallelism_threads(),
+        'inter_op_threads': tf.config.threading.get_inter_op_parallelism_threads(),
+        'host_cpu_count': os.cpu_count()
+    }
+
+
+def find_free_ports(count):
+    """
+    Reserve count free TCP ports on localhost.
+
+    Args:
+        count: Number of ports
+
+    Returns:
+        List of port numbers
+    """
+    sockets = [socket.socket() for _ in range(count)]
+    try:
+        for sock in sockets:
+            sock.bind(('localhost', 0))
+        return [sock.getsockname()[1] for sock in sockets]
+    finally:
+        for sock in sockets:
+            sock.close()
+
+
+def launch_local_workers(num_workers, train_args, intra_op_threads=None):
+    """
+    Run train.py as num_workers MultiWorkerMirroredStrategy processes on this host.
+
+    CPU cores are divided between the workers so they do not oversubscribe
+    the machine. Worker 0 is the chief and writes the model and MLflow run.
+
+    Args:
+        num_workers: Number of worker processes
+        train_args: Extra command-line arguments for train.py
+        intra_op_threads: Threads per worker (defaults to CPU count / num_workers)
+
+    Returns:
+        Highest worker exit code
+    """
+    ports = find_free_ports(num_workers)
+    threads = intra_op_threads or max(1, (os.cpu_count() or 1) // num_workers)
+    train_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'train.py')
+
+    processes = []
+    for index in range(num_workers):
+        env = dict(os.environ, TF_CONFIG=json.dumps(local_tf_config(num_workers, index, ports)))
+        command = [sys.executable, train_script, '--strategy', 'multi_worker',
+                   '--intra_op_threads', str(threads), *train_args]
+        processes.append(subprocess.Popen(command, env=env))
+
+    return max(process.wait() for process in processes)
+
+
+def main():
+    """
+    Main entry point for local multi-worker training.
+    """
+    parser = argparse.ArgumentParser(
+        description='Run multi-worker training locally; unknown arguments go to train.py'
+    )
+    parser.add_argument('--num_workers', type=int, default=2,
+                        help='Number of worker processes on this host')
+    parser.add_argument('--intra_op_threads', type=int, default=None,
+                        help='Threads per worker (default: CPU count / num_workers)')
+
+    args, train_args = parser.parse_known_args()
+    sys.exit(launch_local_workers(args.num_workers, train_args, args.intra_op_threads))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Bounded thread-pool executor for CPU-bound work in the inference service.
+Keeps image decoding and model inference off the asyncio event loop.
+"""
+
+import os
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorSaturatedError(RuntimeError):
+    """Raised when the executor already has the maximum number of pending tasks."""
+
+
+class BoundedExecutor:
+    """Thread pool that rejects new work instead of queueing without limit."""
+
+    def __init__(self, max_workers=None, max_pending=64, name='inference'):
+        """
+        Initialize executor.
+
+        Args:
+            max_workers: Number of worker threads (defaults to min(4, CPU count),
+                and at least 2 so decoding and inference can overlap)
+            max_pending: Maximum tasks queued or running before rejecting
+            name: Thread name prefix
+        """
+        self.max_workers = max_workers or max(2, min(4, os.cpu_count() or 1))
+        self.max_pending = max(1, int(max_pending))
+        self.pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=name)
+
+        # Counters are only touched from the event loop thread
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    @property
+    def saturated(self):
+        """Whether new work would currently be rejected."""
+        return self.pending >= self.max_pending
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        Run a blocking function on the pool and await its result.
+
+        Args:
+            fn: Callable to run in a worker thread
+            *args: Positional arguments for fn
+            **kwargs: Keyword arguments for fn
+
+        Returns:
+            Return value of fn
+
+        Raises:
+            ExecutorSaturatedError: If max_pending tasks are already in flight
+        """
+        if self.saturated:
+            self.rejected += 1
+            raise ExecutorSaturatedError(
+                f"Executor saturated ({self.pending}/{self.max_pending} tasks pending)"
+            )
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.pool, partial(fn, *args, **kwargs))
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    def shutdown(self, wait=True):
+        """Shut down the worker threads."""
+        self.pool.shutdown(wait=wait)
+
+    def get_stats(self):
+        """
+        Get executor statistics.
+
+        Returns:
+            Dictionary of pool size, queue depth and rejection counts
+        """
+        return {
+            'max_workers': self.max_workers,
+            'max_pending': self.max_pending,
+            'pending': self.pending,
+            'completed': self.completed,
+            'rejected': self.rejected
+        }
@@ -0,0 +1,369 @@
+"""
+Export a trained Cats vs Dogs model for serving.
+Converts older models that expect [0, 1] input into raw-pixel models,
+exports SavedModel and ONNX models for the inference backends, and
+dynamic-range and full-int8 quantized TFLite models with an accuracy
+report against the float model.
+"""
+
+import os
+import json
+import time
+import argparse
+import numpy as np
+import tensorflow as tf
+
+from model import (
+    add_preprocessing_layers, model_includes_preprocessing, get_image_shape, make_inference_fn
+)
+from data_preprocessing import list_image_files, load_image_batch
+from backends import TFLiteBackend
+
+
+EXPORT_FORMATS = ('raw', 'savedmodel', 'onnx', 'tflite')
+TFLITE_QUANTIZATIONS = ('dynamic', 'int8')
+
+
+def export_with_preprocessing(model_path, output_path):
+    """
+    Save a copy of a model with in-graph Resizing and Rescaling layers.
+
+    Args:
+        model_path: Path to a trained model expecting [0, 1] input
+        output_path: Path for the exported raw-pixel model
+
+    Returns:
+        Exported Keras model
+    """
+    model = tf.keras.models.load_model(model_path)
+    if model_includes_preprocessing(model):
+        print(f"{model_path} already includes preprocessing layers")
+
+    exported = add_preprocessing_layers(model)
+
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    exported.save(output_path)
+    print(f"Exported model with in-graph preprocessing to {output_path}")
+    return exported
+
+
+def export_savedmodel(model, output_dir):
+    """
+    Save a model as a SavedModel whose serving signature takes uint8 raw pixels.
+
+    The SavedModel backend loads the traced graph only, without Keras.
+
+    Args:
+        model: Keras model (with or without in-graph preprocessing)
+        output_dir: SavedModel directory
+
+    Returns:
+        output_dir
+    """
+    # Track only the weights the serving graph reads, not the optimizer slots
+    module = tf.Module()
+    module.weights = list(model.weights)
+    module.serve = make_inference_fn(model, input_dtype=tf.uint8)
+    tf.saved_model.save(module, output_dir, signatures={'serving_default': module.serve})
+    print(f"Exported SavedModel to {output_dir}")
+    return output_dir
+
+
+def export_onnx(model, output_path, opset=13):
+    """
+    Convert a model to ONNX with a uint8 raw-pixel input and a dynamic batch.
+
+    Args:
+        model: Keras model (with or without in-graph preprocessing)
+        output_path: Path for the .onnx file
+        opset: ONNX opset version
+
+    Returns:
+        output_path
+    """
+    try:
+        import tf2onnx
+    except ImportError as e:
+        raise ImportError("ONNX export needs tf2onnx (pip install tf2onnx)") from e
+
+    serve = make_inference_fn(model, input_dtype=tf.uint8)
+    spec = tf.TensorSpec((None,) + get_image_shape(model), tf.uint8, name='images')
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    tf2onnx.convert.from_function(serve, input_signature=[spec], opset=opset, output_path=output_path)
+    print(f"Exported ONNX model to {output_path}")
+    return output_path
+
+
+def sample_images(paths, labels, max_images=500, seed=42):
+    """
+    Draw a class-balanced random sample of images.
+
+    The sample is in random order, so any prefix (e.g. the calibration
+    images) mixes both classes.
+
+    Args:
+        paths: Image file paths
+        labels: Integer labels
+        max_images: Maximum number of images
+        seed: Random seed
+
+    Returns:
+        Tuple of (paths, integer label array)
+    """
+    labels = np.asarray(labels)
+    rng = np.random.default_rng(seed)
+    classes = np.unique(labels)
+    keep = []
+    for label in classes:
+        members = np.flatnonzero(labels == label)
+        per_class = min(len(members), max(1, max_images // len(classes)))
+        keep.extend(rng.choice(members, per_class, replace=False))
+    keep = rng.permutation(np.array(keep, dtype=np.int64))
+    return [paths[i] for i in keep], labels[keep]
+
+
+def raw_pixel_function(model):
+    """
+    Trace a model as a float32 raw [0, 255] pixel function with a dynamic batch.
+
+    Args:
+        model: Keras model (with or without in-graph preprocessing)
+
+    Returns:
+        Concrete function suitable for the TFLite converter
+    """
+    rescale = not model_includes_preprocessing(model)
+    spec = tf.TensorSpec((None,) + get_image_shape(model), tf.float32)
+
+    @tf.function(input_signature=[spec])
+    def serve(images):
+        if rescale:
+            images = images * (1.0 / 255.0)
+        return model(images, training=False)
+
+    return serve.get_concrete_function()
+
+
+def convert_to_tflite(model, quantization='dynamic', calibration_images=None):
+    """
+    Convert a Keras model to a TFLite flatbuffer taking raw pixels.
+
+    'dynamic' stores weights as int8 and computes in float, a ~4x smaller
+    file with no calibration. 'int8' quantizes weights and activations using
+    calibration images, with a uint8 input so decoded pixels are fed as-is.
+
+    Args:
+        model: Keras model
+        quantization: 'dynamic' or 'int8'
+        calibration_images: uint8 images for int8 activation ranges
+
+    Returns:
+        Serialized TFLite model bytes
+    """
+    concrete = raw_pixel_function(model)
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([concrete], model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+    if quantization == 'int8':
+        if calibration_images is None or len(calibration_images) == 0:
+            raise ValueError("int8 quantization needs calibration images")
+
+        def representative_dataset():
+            for image in calibration_images:
+                yield [image[np.newaxis].astype(np.float32)]
+
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.uint8
+    elif quantization != 'dynamic':
+        raise ValueError(f"Unknown quantization '{quantization}', expected one of {TFLITE_QUANTIZATIONS}")
+
+    return converter.convert()
+
+
+def evaluate_predictor(predict, images, labels, batch_size=32):
+    """
+    Score a uint8-input predictor on a sample.
+
+    Args:
+        predict: Callable mapping a uint8 batch to (N, 1) probabilities
+        images: uint8 images
+        labels: Integer labels
+        batch_size: Images per forward pass
+
+    Returns:
+        Tuple of (probabilities, accuracy, mean milliseconds per image)
+    """
+    predict(images[:1])  # warm-up
+    start = time.perf_counter()
+    probabilities = np.concatenate([
+        np.asarray(predict(images[i:i + batch_size])).reshape(-1)
+        for i in range(0, len(images), batch_size)
+    ])
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    accuracy = float(np.mean((probabilities > 0.5) == np.asarray(labels)))
+    return probabilities, accuracy, elapsed_ms / len(images)
+
+
+def load_decodable_images(paths, target_size):
+    """
+    Decode images as the service does, dropping any that fail to load.
+
+    Args:
+        paths: Image file paths
+        target_size: Tuple of (height, width)
+
+    Returns:
+        Tuple of (uint8 image array, indices of the loaded paths)
+    """
+    images, failed = load_image_batch(paths, target_size, dtype=np.uint8)
+    ok = np.setdiff1d(np.arange(len(paths)), failed)
+    return images[ok], ok
+
+
+def export_tflite_models(model_path, output_dir, paths, labels, num_calibration=200,
+                         max_accuracy_drop=0.01, num_threads=None, calibration_paths=None):
+    """
+    Export dynamic-range and int8 TFLite models and compare them with the float model.
+
+    Images are decoded the same way the service decodes uploads. int8
+    activation ranges are calibrated on num_calibration images that the
+    accuracy report never scores: the first images of calibration_paths if
+    given (e.g. from the training split), otherwise the first images of the
+    sample, which are then held out of the report.
+
+    Args:
+        model_path: Path to the trained Keras model
+        output_dir: Directory for the .tflite files and quantization_report.json
+        paths: Sample image paths (see sample_images)
+        labels: Integer labels of the sample
+        num_calibration: Number of calibration images
+        max_accuracy_drop: Largest accuracy loss versus float that passes the check
+        num_threads: TFLite interpreter threads used for evaluation
+        calibration_paths: Optional calibration image paths, disjoint from paths
+
+    Returns:
+        Report dictionary with a 'float' entry and one entry per quantization
+
+    Raises:
+        ValueError: If no sample images are left to score after calibration
+    """
+    model = tf.keras.models.load_model(model_path)
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    os.makedirs(output_dir, exist_ok=True)
+
+    target_size = get_image_shape(model)[:2]
+    images, ok = load_decodable_images(paths, target_size)
+    labels = np.asarray(labels)[ok]
+    if calibration_paths is None:
+        calibration = images[:num_calibration]
+        images, labels = images[num_calibration:], labels[num_calibration:]
+        if not len(images):
+            raise ValueError(f"All {len(calibration)} sample images are used for calibration; "
+                             "sample more images or pass separate calibration images")
+    else:
+        calibration, _ = load_decodable_images(calibration_paths[:num_calibration], target_size)
+
+    float_probabilities, float_accuracy, float_ms = evaluate_predictor(
+        make_inference_fn(model, input_dtype=tf.uint8), images, labels
+    )
+    report = {
+        'num_images': int(len(images)),
+        'num_calibration': int(len(calibration)),
+        'float': {
+            'path': model_path,
+            'size_mb': os.path.getsize(model_path) / 2 ** 20,
+            'accuracy': float_accuracy,
+            'ms_per_image': float_ms
+        }
+    }
+
+    for quantization in TFLITE_QUANTIZATIONS:
+        tflite_path = os.path.join(output_dir, f"{stem}_{quantization}.tflite")
+        with open(tflite_path, 'wb') as f:
+            f.write(convert_to_tflite(model, quantization, calibration))
+
+        probabilities, accuracy, ms = evaluate_predictor(
+            TFLiteBackend(tflite_path, num_threads), images, labels
+        )
+        report[quantization] = {
+            'path': tflite_path,
+            'size_mb': os.path.getsize(tflite_path) / 2 ** 20,
+            'accuracy': accuracy,
+            'accuracy_drop': float_accuracy - accuracy,
+            'agreement': float(np.mean((probabilities > 0.5) == (float_probabilities > 0.5))),
+            'max_probability_diff': float(np.max(np.abs(probabilities - float_probabilities))),
+            'ms_per_image': ms,
+            'passed': float_accuracy - accuracy <= max_accuracy_drop
+        }
+        print(f"{quantization}: {report[quantization]['size_mb']:.1f}MB, "
+              f"accuracy {accuracy:.4f} (float {float_accuracy:.4f}), "
+              f"agreement {report[quantization]['agreement']:.4f}, {ms:.2f}ms/image")
+
+    with open(os.path.join(output_dir, 'quantization_report.json'), 'w') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def main():
+    """
+    Main entry point for model export.
+    """
+    parser = argparse.ArgumentParser(description='Export Cats vs Dogs model for serving')
+    parser.add_argument('--model_path', type=str, default='models/cats_dogs_model.h5',
+                        help='Path to trained model')
+    parser.add_argument('--format', type=str, default='raw', choices=EXPORT_FORMATS,
+                        help='raw: Keras model taking raw pixels; savedmodel/onnx: uint8 serving '
+                             'model for that backend; tflite: quantized TFLite models and report')
+    parser.add_argument('--output_path', type=str, default=None,
+                        help='Path for the exported model (raw, savedmodel and onnx formats)')
+    parser.add_argument('--data_dir', type=str, default='data/validation',
+                        help='Images for the accuracy report (tflite)')
+    parser.add_argument('--calibration_dir', type=str, default=None,
+                        help='Images for int8 calibration, e.g. data/train (default: hold the '
+                             'first --num_calibration sampled --data_dir images out of the report)')
+    parser.add_argument('--num_samples', type=int, default=500,
+                        help='Images decoded from --data_dir for calibration and the accuracy report')
+    parser.add_argument('--num_calibration', type=int, default=200,
+                        help='Images used to calibrate int8 activation ranges')
+    parser.add_argument('--max_accuracy_drop', type=float, default=0.01,
+                        help='Fail if a quantized model loses more accuracy than this')
+    parser.add_argument('--output_dir', type=str, default='models',
+                        help='Directory for .tflite files and the report (tflite)')
+
+    args = parser.parse_args()
+
+    if args.format != 'tflite':
+        stem = os.path.splitext(args.model_path)[0]
+        default_paths = {
+            'raw': f"{stem}_raw.h5",
+            'savedmodel': f"{stem}_savedmodel",
+            'onnx': f"{stem}.onnx"
+        }
+        output_path = args.output_path or default_paths[args.format]
+        if args.format == 'raw':
+            export_with_preprocessing(args.model_path, output_path)
+        elif args.format == 'savedmodel':
+            export_savedmodel(tf.keras.models.load_model(args.model_path), output_path)
+        else:
+            export_onnx(tf.keras.models.load_model(args.model_path), output_path)
+        return
+
+    paths, labels, _ = list_image_files(args.data_dir)
+    paths, labels = sample_images(paths, labels, args.num_samples)
+    calibration_paths = None
+    if args.calibration_dir:
+        calibration_paths, _ = sample_images(
+            *list_image_files(args.calibration_dir)[:2], args.num_calibration
+        )
+    report = export_tflite_models(
+        args.model_path, args.output_dir, paths, labels,
+        args.num_calibration, args.max_accuracy_drop, calibration_paths=calibration_paths
+    )
+    failed = [name for name in TFLITE_QUANTIZATIONS if not report[name]['passed']]
+    if failed:
+        raise SystemExit(f"Accuracy regression above {args.max_accuracy_drop} for: {', '.join(failed)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -6,16 +6,24 @@ Provides REST API endpoints for health check and prediction.
 import os
 import io
 import time
+import asyncio
+import hashlib
 import logging
+import tarfile
+import zipfile
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, List, Optional
 import numpy as np
-import tensorflow as tf
+from PIL import Image
 from fastapi import FastAPI, File, UploadFile, HTTPException
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 
-from .data_preprocessing import preprocess_image_bytes
+from .data_preprocessing import allocate_batch_buffer, preprocess_image_into
+from .batching import MicroBatcher
+from .executor import BoundedExecutor, ExecutorSaturatedError
+from .cache import PredictionCache
+from .backends import create_backend
 
 
 # Configure logging
@@ -36,10 +44,56 @@ app = FastAPI(
 
 # Global variables for model and metrics
 model = None
+infer_fn = None
+image_shape = (224, 224, 3)
 MODEL_PATH = os.environ.get('MODEL_PATH', 'models/cats_dogs_model.h5')
+
+# Inference backend (keras, savedmodel, tflite or onnx; inferred from
+# MODEL_PATH if unset) and its threads per forward pass (tflite and onnx)
+INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND') or None
+INFERENCE_NUM_THREADS = int(os.environ.get('INFERENCE_NUM_THREADS', '0')) or None
 request_count = 0
 total_latency = 0.0
 
+# Micro-batching configuration
+batcher = None
+BATCH_MAX_SIZE = int(os.environ.get('BATCH_MAX_SIZE', '32'))
+BATCH_MAX_WAIT_MS = float(os.environ.get('BATCH_MAX_WAIT_MS', '5'))
+
+# Worker pool for CPU-bound decode and bulk inference (keeps the event loop
+# free), and a dedicated thread for micro-batched forward passes, so they
+# never wait behind decodes
+executor = None
+model_executor = None
+INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS', '0')) or None
+MAX_PENDING_REQUESTS = int(os.environ.get('MAX_PENDING_REQUESTS', '64'))
+
+# Bulk prediction limits
+BATCH_MAX_FILES = int(os.environ.get('BATCH_MAX_FILES', '1000'))
+BATCH_MAX_MEMBER_BYTES = int(os.environ.get('BATCH_MAX_MEMBER_BYTES', str(10 * 1024 * 1024)))
+BATCH_MAX_ARCHIVE_BYTES = int(os.environ.get('BATCH_MAX_ARCHIVE_BYTES', str(256 * 1024 * 1024)))
+ARCHIVE_CONTENT_TYPES = {
+    'application/zip',
+    'application/x-zip-compressed',
+    'application/x-tar',
+    'application/gzip',
+    'application/x-gzip',
+    'application/x-gtar'
+}
+ARCHIVE_EXTENSIONS = ('.zip', '.tar', '.tar.gz', '.tgz')
+
+# Prediction cache keyed by upload bytes (size 0 disables it)
+prediction_cache = PredictionCache(
+    max_entries=int(os.environ.get('PREDICTION_CACHE_SIZE', '10000')),
+    ttl_seconds=float(os.environ.get('PREDICTION_CACHE_TTL_SECONDS', '3600'))
+)
+
+# Warm-up and readiness (comma-separated batch sizes; empty disables warm-up)
+WARMUP_BATCH_SIZES = os.environ.get('WARMUP_BATCH_SIZES')
+WARMUP_ITERATIONS = int(os.environ.get('WARMUP_ITERATIONS', '2'))
+model_ready = False
+startup_task = None
+
 
 class PredictionResponse(BaseModel):
     """Response model for prediction endpoint."""
@@ -49,30 +103,70 @@ class PredictionResponse(BaseModel):
     timestamp: str
 
 
+class BatchItemResult(BaseModel):
+    """Per-image result within a batch prediction."""
+    filename: str
+    class_label: Optional[str] = None
+    probability: Optional[float] = None
+    error: Optional[str] = None
+
+
+class BatchPredictionResponse(BaseModel):
+    """Response model for batch prediction endpoint."""
+    results: List[BatchItemResult]
+    total: int
+    succeeded: int
+    failed: int
+    prediction_time_ms: float
+    timestamp: str
+
+
 class HealthResponse(BaseModel):
     """Response model for health check endpoint."""
     status: str
     model_loaded: bool
+    ready: bool
     model_path: str
+    backend: Optional[str]
     requests_served: int
     average_latency_ms: float
+    cache: Dict[str, Any]
+
+
+class ReadinessResponse(BaseModel):
+    """Response model for readiness endpoint."""
+    ready: bool
+    status: str
 
 
 def load_model():
     """
-    Load the trained model from disk.
+    Load the trained model from disk with the configured inference backend.
+    
+    INFERENCE_BACKEND selects the runtime (see backends.BACKENDS); by default
+    it follows MODEL_PATH: .h5/.keras files run in Keras, directories as
+    SavedModels, .tflite files in the TFLite interpreter and .onnx files in
+    ONNX Runtime.
     
     Returns:
-        Loaded Keras model
+        Loaded backend (callable on uint8 image batches)
     """
-    global model
+    global model, infer_fn, image_shape
     try:
         if not os.path.exists(MODEL_PATH):
             logger.error(f"Model file not found at {MODEL_PATH}")
             return None
         
         logger.info(f"Loading model from {MODEL_PATH}")
-        model = tf.keras.models.load_model(MODEL_PATH)
+        loaded = create_backend(MODEL_PATH, INFERENCE_BACKEND, INFERENCE_NUM_THREADS)
+        infer_fn = loaded
+        image_shape = loaded.image_shape
+        logger.info(f"Serving with the {loaded.name} backend "
+                    f"(threads={INFERENCE_NUM_THREADS or 'default'})")
+        model = loaded
+        
+        # Cached predictions belong to the model that produced them
+        prediction_cache.invalidate(namespace=get_model_fingerprint(MODEL_PATH))
         logger.info("Model loaded successfully")
         return model
     except Exception as e:
@@ -80,21 +174,329 @@ def load_model():
         return None
 
 
+def get_model_fingerprint(model_path):
+    """
+    Identify a model file by path, size and modification time.
+    
+    Args:
+        model_path: Path to the model file
+    
+    Returns:
+        Short hex string that changes whenever the model file changes
+    """
+    stat = os.stat(model_path)
+    identity = f"{os.path.abspath(model_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    return hashlib.blake2b(identity.encode(), digest_size=8).hexdigest()
+
+
+def get_warmup_batch_sizes():
+    """
+    Batch sizes to push through the model before reporting ready.
+    
+    Defaults to powers of two up to BATCH_MAX_SIZE, plus BATCH_MAX_SIZE itself,
+    covering the shapes the micro-batcher and bulk endpoint produce.
+    
+    Returns:
+        Sorted list of batch sizes
+    """
+    if WARMUP_BATCH_SIZES is not None:
+        return sorted({int(size) for size in WARMUP_BATCH_SIZES.split(',') if size.strip()})
+    
+    sizes = {BATCH_MAX_SIZE}
+    size = 1
+    while size < BATCH_MAX_SIZE:
+        sizes.add(size)
+        size *= 2
+    return sorted(sizes)
+
+
+def warm_up_model():
+    """
+    Run synthetic batches through decode and inference.
+    
+    Pays graph tracing, kernel selection and allocator growth before the
+    pod receives traffic instead of on the first real requests.
+    """
+    start = time.time()
+    
+    # Exercise the JPEG decode path once
+    sample = io.BytesIO()
+    Image.new('RGB', (320, 240), color='gray').save(sample, format='JPEG')
+    decode_image(sample.getvalue())
+    
+    for batch_size in get_warmup_batch_sizes():
+        batch_start = time.time()
+        images = np.random.randint(0, 256, size=(batch_size,) + image_shape, dtype=np.uint8)
+        for _ in range(WARMUP_ITERATIONS):
+            predict_batch(images)
+        logger.info(
+            f"Warm-up batch size {batch_size}: {(time.time() - batch_start) * 1000:.0f}ms"
+        )
+    
+    logger.info(f"Model warm-up finished in {(time.time() - start) * 1000:.0f}ms")
+
+
+def decode_image(image_bytes):
+    """
+    Decode an upload into a single-image uint8 batch.
+    
+    Raw pixels take 150KB per image while queued, a quarter of float32.
+    
+    Args:
+        image_bytes: Raw upload bytes
+    
+    Returns:
+        Array of shape (1, height, width, 3) for the loaded model's image_shape, dtype uint8
+    """
+    out = allocate_batch_buffer(1, target_size=image_shape[:2], dtype=np.uint8)
+    preprocess_image_into(io.BytesIO(image_bytes), out[0], target_size=image_shape[:2])
+    return out
+
+
+def predict_batch(images):
+    """
+    Run one forward pass over a batch of decoded images.
+    
+    Args:
+        images: uint8 array of shape (N,) + image_shape
+    
+    Returns:
+        Array of shape (N, 1) with dog probabilities
+    """
+    return np.asarray(infer_fn(images))
+
+
+def interpret_probability(probability):
+    """
+    Convert a sigmoid output into a class label and its confidence.
+    
+    Args:
+        probability: Model output (probability of dog)
+    
+    Returns:
+        Tuple of (class_label, confidence)
+    """
+    # Determine class (0: cat, 1: dog)
+    class_label = "dog" if probability > 0.5 else "cat"
+    confidence = probability if probability > 0.5 else 1 - probability
+    return class_label, confidence
+
+
+def is_archive(file):
+    """Check whether an upload is a zip or tar archive of images."""
+    filename = (file.filename or '').lower()
+    return file.content_type in ARCHIVE_CONTENT_TYPES or filename.endswith(ARCHIVE_EXTENSIONS)
+
+
+def read_archive_members(archive_bytes, max_members, max_member_bytes=None, max_total_bytes=None):
+    """
+    Extract regular files from a zip or tar archive held in memory.
+    
+    Uncompressed sizes are checked against the archive headers before any
+    member is read, so a small archive cannot expand into a very large one.
+    
+    Args:
+        archive_bytes: Raw archive data
+        max_members: Maximum number of files to extract
+        max_member_bytes: Maximum uncompressed size of one file (None for no limit)
+        max_total_bytes: Maximum uncompressed size of all extracted files (None for no limit)
+    
+    Returns:
+        List of (member_name, file_bytes) tuples
+    
+    Raises:
+        ValueError: If the archive is unreadable or exceeds a size limit
+    """
+    members = []
+    total_bytes = 0
+    stream = io.BytesIO(archive_bytes)
+    
+    def check_size(name, size):
+        nonlocal total_bytes
+        if max_member_bytes is not None and size > max_member_bytes:
+            raise ValueError(f"Archive member {name} exceeds {max_member_bytes} bytes")
+        total_bytes += size
+        if max_total_bytes is not None and total_bytes > max_total_bytes:
+            raise ValueError(f"Archive contents exceed {max_total_bytes} bytes")
+    
+    if zipfile.is_zipfile(stream):
+        try:
+            with zipfile.ZipFile(stream) as archive:
+                for info in archive.infolist():
+                    if info.is_dir() or os.path.basename(info.filename).startswith('.'):
+                        continue
+                    if len(members) >= max_members:
+                        break
+                    check_size(info.filename, info.file_size)
+                    members.append((info.filename, archive.read(info)))
+        except zipfile.BadZipFile as e:
+            raise ValueError(f"Unreadable archive: {e}")
+        return members
+    
+    stream.seek(0)
+    try:
+        with tarfile.open(fileobj=stream, mode='r:*') as archive:
+            for info in archive:
+                if not info.isfile() or os.path.basename(info.name).startswith('.'):
+                    continue
+                if len(members) >= max_members:
+                    break
+                check_size(info.name, info.size)
+                members.append((info.name, archive.extractfile(info).read()))
+    except tarfile.TarError as e:
+        raise ValueError(f"Unreadable archive: {e}")
+    return members
+
+
+def predict_chunk(items):
+    """
+    Decode a chunk of images and classify the decodable ones in one forward pass.
+    
+    Args:
+        items: List of (filename, image_bytes) tuples
+    
+    Returns:
+        List of BatchItemResult in the same order as items, with unrounded
+        probabilities
+    """
+    results = [None] * len(items)
+    positions = []
+    
+    # Decode straight into consecutive slots of one batch buffer
+    buffer = allocate_batch_buffer(len(items), target_size=image_shape[:2], dtype=np.uint8)
+    for i, (filename, image_bytes) in enumerate(items):
+        try:
+            preprocess_image_into(
+                io.BytesIO(image_bytes), buffer[len(positions)], target_size=image_shape[:2]
+            )
+            positions.append(i)
+        except ValueError as e:
+            results[i] = BatchItemResult(filename=filename, error=str(e))
+    
+    if positions:
+        predictions = predict_batch(buffer[:len(positions)])
+        for i, prediction in zip(positions, predictions):
+            class_label, confidence = interpret_probability(float(prediction[0]))
+            results[i] = BatchItemResult(
+                filename=items[i][0],
+                class_label=class_label,
+                probability=confidence
+            )
+    
+    return results
+
+
+def predict_cached_chunk(items):
+    """
+    Classify a chunk of images, serving re-uploaded images from the prediction cache.
+    
+    Runs on the worker pool, so hashing large uploads never blocks the event
+    loop. Only cache misses are decoded and predicted, and their raw
+    confidences are cached, as /predict does.
+    
+    Args:
+        items: List of (filename, image_bytes) tuples
+    
+    Returns:
+        List of BatchItemResult in the same order as items, with unrounded
+        probabilities
+    """
+    results = [None] * len(items)
+    keys = [prediction_cache.make_key(image_bytes) for _, image_bytes in items]
+    misses = []
+    for i, ((filename, _), key) in enumerate(zip(items, keys)):
+        cached = prediction_cache.get(key)
+        if cached is None:
+            misses.append(i)
+        else:
+            class_label, confidence = cached
+            results[i] = BatchItemResult(
+                filename=filename, class_label=class_label, probability=confidence
+            )
+    
+    if misses:
+        for i, result in zip(misses, predict_chunk([items[i] for i in misses])):
+            if result.error is None:
+                prediction_cache.put(keys[i], (result.class_label, result.probability))
+            results[i] = result
+    
+    return results
+
+
+def service_unavailable(detail):
+    """Build a 503 response telling clients to back off and retry."""
+    return HTTPException(status_code=503, detail=detail, headers={"Retry-After": "1"})
+
+
+async def initialize_service():
+    """Load and warm up the model in the background, then mark the service ready."""
+    global batcher, model_ready
+    
+    loop = asyncio.get_running_loop()
+    try:
+        # Loading and warming the model is slow; keep the event loop responsive meanwhile
+        await loop.run_in_executor(executor.pool, load_model)
+        if model is None:
+            logger.warning("Model not loaded - service running in degraded mode")
+            return
+        
+        await loop.run_in_executor(executor.pool, warm_up_model)
+        
+        batcher = MicroBatcher(
+            predict_batch,
+            max_batch_size=BATCH_MAX_SIZE,
+            max_wait_ms=BATCH_MAX_WAIT_MS,
+            max_queue_size=MAX_PENDING_REQUESTS,
+            executor=model_executor
+        )
+        await batcher.start()
+        
+        model_ready = True
+        logger.info("Inference service ready")
+    except Exception as e:
+        logger.error(f"Service initialization failed: {e}")
+
+
 @app.on_event("startup")
 async def startup_event():
-    """Load model on application startup."""
+    """Start the worker pools and begin loading the model on application startup."""
+    global executor, model_executor, startup_task
+    
     logger.info("Starting up inference service...")
-    load_model()
-    if model is None:
-        logger.warning("Model not loaded - service running in degraded mode")
-    else:
-        logger.info("Inference service ready")
+    executor = BoundedExecutor(
+        max_workers=INFERENCE_WORKERS,
+        max_pending=MAX_PENDING_REQUESTS
+    )
+    # The batcher runs one forward pass at a time
+    model_executor = BoundedExecutor(max_workers=1, max_pending=1, name='model')
+    
+    # /health answers immediately; /ready reports 503 until warm-up completes
+    startup_task = asyncio.create_task(initialize_service())
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the micro-batcher and worker pools on application shutdown."""
+    if batcher is not None:
+        await batcher.stop()
+    for pool in (executor, model_executor):
+        if pool is not None:
+            pool.shutdown(wait=False)
+
+
+def get_service_status():
+    """Describe the service lifecycle state: starting, healthy or degraded."""
+    if model_ready:
+        return "healthy"
+    if startup_task is not None and not startup_task.done():
+        return "starting"
+    return "degraded"
 
 
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
     """
-    Health check endpoint to verify service status.
+    Health check (liveness) endpoint to verify service status.
     
     Returns:
         Service health status and metrics
@@ -104,14 +506,31 @@ async def health_check():
     avg_latency = total_latency / request_count if request_count > 0 else 0.0
     
     return HealthResponse(
-        status="healthy" if model is not None else "degraded",
+        status=get_service_status(),
         model_loaded=model is not None,
+        ready=model_ready,
         model_path=MODEL_PATH,
+        backend=model.name if model is not None else INFERENCE_BACKEND,
         requests_served=request_count,
-        average_latency_ms=round(avg_latency, 2)
+        average_latency_ms=round(avg_latency, 2),
+        cache=prediction_cache.get_stats()
     )
 
 
+@app.get("/ready", response_model=ReadinessResponse)
+async def readiness_check():
+    """
+    Readiness endpoint: 200 only once the model is loaded and warmed up.
+    
+    Returns:
+        Readiness state (HTTP 503 while starting or degraded)
+    """
+    response = ReadinessResponse(ready=model_ready, status=get_service_status())
+    if not model_ready:
+        return JSONResponse(status_code=503, content=response.dict())
+    return response
+
+
 @app.post("/predict", response_model=PredictionResponse)
 async def predict(file: UploadFile = File(...)):
     """
@@ -128,10 +547,10 @@ async def predict(file: UploadFile = File(...)):
     start_time = time.time()
     
     try:
-        # Validate model is loaded
-        if model is None:
-            logger.error("Prediction requested but model not loaded")
-            raise HTTPException(status_code=503, detail="Model not loaded")
+        # Validate model is loaded and warmed up
+        if not model_ready:
+            logger.error("Prediction requested but model not ready")
+            raise service_unavailable("Model not ready")
         
         # Validate file type
         if not file.content_type.startswith('image/'):
@@ -141,21 +560,32 @@ async def predict(file: UploadFile = File(...)):
         # Read and preprocess image
         logger.info(f"Processing image: {file.filename}")
         image_bytes = await file.read()
-        image_stream = io.BytesIO(image_bytes)
         
-        try:
-            processed_image = preprocess_image_bytes(image_stream, target_size=(224, 224))
-        except ValueError as e:
-            logger.error(f"Image preprocessing failed: {e}")
-            raise HTTPException(status_code=400, detail=str(e))
-        
-        # Make prediction
-        prediction = model.predict(processed_image, verbose=0)
-        probability = float(prediction[0][0])
+        # Re-uploaded images skip decoding and inference entirely
+        cache_key = prediction_cache.make_key(image_bytes)
+        cached = prediction_cache.get(cache_key)
         
-        # Determine class (0: cat, 1: dog)
-        class_label = "dog" if probability > 0.5 else "cat"
-        confidence = probability if probability > 0.5 else 1 - probability
+        if cached is not None:
+            class_label, confidence = cached
+        else:
+            try:
+                processed_image = await executor.run(decode_image, image_bytes)
+            except ValueError as e:
+                logger.error(f"Image preprocessing failed: {e}")
+                raise HTTPException(status_code=400, detail=str(e))
+            except ExecutorSaturatedError as e:
+                logger.warning(f"Rejecting request: {e}")
+                raise service_unavailable("Server busy, retry later")
+            
+            # Make prediction (queued with concurrent requests into one batch)
+            try:
+                probability = await batcher.submit(processed_image)
+            except asyncio.QueueFull:
+                logger.warning("Rejecting request: prediction queue full")
+                raise service_unavailable("Server busy, retry later")
+            
+            class_label, confidence = interpret_probability(probability)
+            prediction_cache.put(cache_key, (class_label, confidence))
         
         # Calculate latency
         end_time = time.time()
@@ -182,6 +612,139 @@ async def predict(file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+@app.post("/predict/batch", response_model=BatchPredictionResponse)
+async def predict_batch_endpoint(files: List[UploadFile] = File(...)):
+    """
+    Bulk prediction endpoint for many images in one request.
+    
+    Accepts several image files and/or zip/tar archives of images. Images are
+    decoded in parallel on the worker pool and classified in chunks of
+    BATCH_MAX_SIZE; undecodable items get a per-item error instead of failing
+    the whole request.
+    
+    Args:
+        files: Uploaded image files or archives
+    
+    Returns:
+        Per-image predictions and errors
+    """
+    global request_count, total_latency
+    
+    start_time = time.time()
+    
+    try:
+        if not model_ready:
+            logger.error("Batch prediction requested but model not ready")
+            raise service_unavailable("Model not ready")
+        
+        # Collect (filename, bytes) items, expanding archives
+        items = []
+        errors = {}
+        for file in files:
+            data = await file.read()
+            if is_archive(file):
+                try:
+                    members = await executor.run(
+                        read_archive_members, data, BATCH_MAX_FILES - len(items) + 1,
+                        BATCH_MAX_MEMBER_BYTES, BATCH_MAX_ARCHIVE_BYTES
+                    )
+                except ValueError as e:
+                    raise HTTPException(status_code=400, detail=str(e))
+                items.extend(members)
+            else:
+                if not (file.content_type or '').startswith('image/'):
+                    errors[len(items)] = "File must be an image"
+                items.append((file.filename, data))
+            
+            if len(items) > BATCH_MAX_FILES:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Too many images (limit {BATCH_MAX_FILES})"
+                )
+        
+        logger.info(f"Processing batch of {len(items)} images")
+        
+        results = [None] * len(items)
+        for i, message in errors.items():
+            results[i] = BatchItemResult(filename=items[i][0], error=message)
+        
+        # Look up, decode and predict chunks concurrently on the worker pool,
+        # at most one per worker
+        valid = [(i, item) for i, item in enumerate(items) if results[i] is None]
+        chunks = [valid[i:i + BATCH_MAX_SIZE] for i in range(0, len(valid), BATCH_MAX_SIZE)]
+        slots = asyncio.Semaphore(executor.max_workers)
+        
+        async def run_chunk(chunk):
+            async with slots:
+                return await executor.run(predict_cached_chunk, [item for _, item in chunk])
+        
+        chunk_results = await asyncio.gather(*[run_chunk(chunk) for chunk in chunks])
+        
+        # The cache holds raw confidences; round only in the response
+        for chunk, chunk_result in zip(chunks, chunk_results):
+            for (i, _), result in zip(chunk, chunk_result):
+                if result.error is None:
+                    result.probability = round(result.probability, 4)
+                results[i] = result
+        
+        succeeded = sum(1 for result in results if result.error is None)
+        
+        # Calculate latency and update metrics
+        latency_ms = (time.time() - start_time) * 1000
+        request_count += 1
+        total_latency += latency_ms
+        
+        logger.info(
+            f"Batch prediction: {succeeded}/{len(results)} succeeded, Latency: {latency_ms:.2f}ms"
+        )
+        
+        return BatchPredictionResponse(
+            results=results,
+            total=len(results),
+            succeeded=succeeded,
+            failed=len(results) - succeeded,
+            prediction_time_ms=round(latency_ms, 2),
+            timestamp=datetime.utcnow().isoformat()
+        )
+    
+    except HTTPException:
+        raise
+    except ExecutorSaturatedError as e:
+        logger.warning(f"Rejecting batch request: {e}")
+        raise service_unavailable("Server busy, retry later")
+    except Exception as e:
+        logger.error(f"Unexpected error during batch prediction: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@app.delete("/cache")
+async def clear_cache():
+    """
+    Drop all cached predictions (e.g. after replacing the model file).
+    
+    Returns:
+        Cache statistics after invalidation
+    """
+    prediction_cache.invalidate()
+    logger.info("Prediction cache invalidated")
+    return prediction_cache.get_stats()
+
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Metrics endpoint exposing micro-batching and worker pool statistics.
+    
+    Returns:
+        Batch-size distribution, queue-wait summary and executor load
+    """
+    return {
+        "batching": batcher.get_stats() if batcher is not None else None,
+        "executor": executor.get_stats() if executor is not None else None,
+        "model_executor": model_executor.get_stats() if model_executor is not None else None
+    }
+
+
 @app.get("/")
 async def root():
     """Root endpoint with API information."""
@@ -190,7 +753,10 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "health": "/health",
+            "ready": "/ready",
             "predict": "/predict",
+            "predict_batch": "/predict/batch",
+            "metrics": "/metrics",
             "docs": "/docs"
         },
         "description": "Binary image classification for pet adoption platform"
@@ -6,26 +6,81 @@ import tensorflow as tf
 from tensorflow.keras import layers, models
 
 
-def build_baseline_cnn(input_shape=(224, 224, 3), learning_rate=0.001):
+MODEL_ARCHITECTURES = ('baseline_cnn', 'gap_cnn', 'separable_cnn', 'transfer')
+BACKBONES = ('mobilenet_v2', 'mobilenet_v3_small', 'efficientnet_v2_b0')
+
+
+def build_model(architecture='baseline_cnn', input_shape=(224, 224, 3), learning_rate=0.001,
+                include_preprocessing=False, jit_compile=False, backbone='mobilenet_v2',
+                backbone_weights=None):
+    """
+    Build one of the MODEL_ARCHITECTURES.
+    
+    Args:
+        architecture: 'baseline_cnn' (Flatten + Dense(512) head), 'gap_cnn'
+            (global average pooling head), 'separable_cnn' (depthwise-separable
+            convolutions and global average pooling head) or 'transfer'
+            (pretrained backbone, see build_transfer_model)
+        input_shape: Shape of input images (height, width, channels)
+        learning_rate: Learning rate for optimizer
+        include_preprocessing: If True, the model takes raw [0, 255] pixels
+        jit_compile: Compile training and inference steps with XLA
+        backbone: One of BACKBONES ('transfer' only)
+        backbone_weights: Local backbone weights file ('transfer' only)
+    
+    Returns:
+        Compiled Keras model
+    """
+    builders = {
+        'baseline_cnn': build_baseline_cnn,
+        'gap_cnn': build_gap_cnn,
+        'separable_cnn': build_separable_cnn
+    }
+    if architecture == 'transfer':
+        return build_transfer_model(
+            backbone=backbone,
+            input_shape=input_shape,
+            learning_rate=learning_rate,
+            include_preprocessing=include_preprocessing,
+            jit_compile=jit_compile,
+            weights_path=backbone_weights
+        )
+    if architecture not in builders:
+        raise ValueError(f"Unknown architecture '{architecture}', expected one of {MODEL_ARCHITECTURES}")
+    return builders[architecture](
+        input_shape=input_shape,
+        learning_rate=learning_rate,
+        include_preprocessing=include_preprocessing,
+        jit_compile=jit_compile
+    )
+
+
+def build_baseline_cnn(input_shape=(224, 224, 3), learning_rate=0.001, include_preprocessing=False,
+                       jit_compile=False):
     """
     Build a baseline CNN model for binary classification.
     
     Architecture:
-    - 3 Convolutional blocks with MaxPooling
+    - Optional in-graph Resizing and Rescaling(1/255) preprocessing
+    - 4 Convolutional blocks with MaxPooling
     - Flatten and Dense layers
     - Dropout for regularization
-    - Sigmoid activation for binary output
+    - Sigmoid activation for binary output, always computed in float32 so
+      the probabilities and loss stay accurate under a mixed precision policy
     
     Args:
         input_shape: Shape of input images (height, width, channels)
         learning_rate: Learning rate for optimizer
+        include_preprocessing: If True, the model takes raw [0, 255] pixels of
+            any height/width and resizes and normalizes them itself
+        jit_compile: Compile training and inference steps with XLA
     
     Returns:
         Compiled Keras model
     """
-    model = models.Sequential([
+    model = models.Sequential(input_layers(input_shape, include_preprocessing) + [
         # First convolutional block
-        layers.Conv2D(32, (3, 3), activation='relu', input_shape=input_shape),
+        layers.Conv2D(32, (3, 3), activation='relu'),
         layers.MaxPooling2D((2, 2)),
         
         # Second convolutional block
@@ -44,10 +99,270 @@ def build_baseline_cnn(input_shape=(224, 224, 3), learning_rate=0.001):
         layers.Flatten(),
         layers.Dense(512, activation='relu'),
         layers.Dropout(0.5),
-        layers.Dense(1, activation='sigmoid')
+        layers.Dense(1, activation='sigmoid', dtype='float32')
     ])
     
-    # Compile model
+    return compile_model(model, learning_rate, jit_compile)
+
+
+def build_gap_cnn(input_shape=(224, 224, 3), learning_rate=0.001, include_preprocessing=False,
+                  jit_compile=False):
+    """
+    Build the baseline CNN with a global average pooling head.
+    
+    The convolutional blocks match build_baseline_cnn. Flatten + Dense(512)
+    holds over 95% of the baseline's weights at 224x224 (12x12x128 -> 512);
+    averaging each feature map first leaves a 128 -> 128 dense layer, so the
+    model is ~37x smaller and its head no longer depends on the input size.
+    
+    Args:
+        input_shape: Shape of input images (height, width, channels)
+        learning_rate: Learning rate for optimizer
+        include_preprocessing: If True, the model takes raw [0, 255] pixels
+        jit_compile: Compile training and inference steps with XLA
+    
+    Returns:
+        Compiled Keras model
+    """
+    model = models.Sequential(input_layers(input_shape, include_preprocessing) + [
+        layers.Conv2D(32, (3, 3), activation='relu'),
+        layers.MaxPooling2D((2, 2)),
+        layers.Conv2D(64, (3, 3), activation='relu'),
+        layers.MaxPooling2D((2, 2)),
+        layers.Conv2D(128, (3, 3), activation='relu'),
+        layers.MaxPooling2D((2, 2)),
+        layers.Conv2D(128, (3, 3), activation='relu'),
+        layers.MaxPooling2D((2, 2))
+    ] + pooled_head())
+    
+    return compile_model(model, learning_rate, jit_compile)
+
+
+def build_separable_cnn(input_shape=(224, 224, 3), learning_rate=0.001, include_preprocessing=False,
+                        jit_compile=False):
+    """
+    Build a CNN with depthwise-separable convolutions and a global average pooling head.
+    
+    The first block stays a regular convolution (a separable convolution
+    over 3 input channels saves nothing); blocks 2-4 factor each 3x3
+    convolution into a depthwise 3x3 and a pointwise 1x1, cutting their
+    multiply-adds by ~8x.
+    
+    Args:
+        input_shape: Shape of input images (height, width, channels)
+        learning_rate: Learning rate for optimizer
+        include_preprocessing: If True, the model takes raw [0, 255] pixels
+        jit_compile: Compile training and inference steps with XLA
+    
+    Returns:
+        Compiled Keras model
+    """
+    model = models.Sequential(input_layers(input_shape, include_preprocessing) + [
+        layers.Conv2D(32, (3, 3), activation='relu'),
+        layers.MaxPooling2D((2, 2)),
+        layers.SeparableConv2D(64, (3, 3), activation='relu'),
+        layers.MaxPooling2D((2, 2)),
+        layers.SeparableConv2D(128, (3, 3), activation='relu'),
+        layers.MaxPooling2D((2, 2)),
+        layers.SeparableConv2D(128, (3, 3), activation='relu'),
+        layers.MaxPooling2D((2, 2))
+    ] + pooled_head())
+    
+    return compile_model(model, learning_rate, jit_compile)
+
+
+def build_backbone(name='mobilenet_v2', input_shape=(224, 224, 3), weights_path=None):
+    """
+    Build a headless Keras Applications backbone returning pooled embeddings.
+    
+    The backbone's own input scaling is left out (see backbone_input_layers),
+    so it is visible to model_includes_preprocessing in the full model.
+    
+    Args:
+        name: One of BACKBONES
+        input_shape: Shape of input images (height, width, channels)
+        weights_path: Local weights file for the headless ('no_top') backbone,
+            e.g. mobilenet_v2_weights_tf_dim_ordering_tf_kernels_1.0_224_no_top.h5;
+            None initializes randomly. Nothing is downloaded
+    
+    Returns:
+        Keras model mapping scaled images to (N, embedding_dim) features
+    """
+    applications = tf.keras.applications
+    kwargs = {
+        'input_shape': input_shape,
+        'include_top': False,
+        'weights': weights_path,
+        'pooling': 'avg'
+    }
+    if name == 'mobilenet_v2':
+        return applications.MobileNetV2(**kwargs)
+    if name == 'mobilenet_v3_small':
+        return applications.MobileNetV3Small(include_preprocessing=False, **kwargs)
+    if name == 'efficientnet_v2_b0':
+        return applications.EfficientNetV2B0(include_preprocessing=False, **kwargs)
+    raise ValueError(f"Unknown backbone '{name}', expected one of {BACKBONES}")
+
+
+def backbone_input_layers(name='mobilenet_v2'):
+    """
+    Layers scaling raw [0, 255] pixels the way a backbone was pretrained.
+    
+    Args:
+        name: One of BACKBONES
+    
+    Returns:
+        List of Keras layers
+    """
+    if name == 'efficientnet_v2_b0':
+        return [
+            layers.Rescaling(1.0 / 255),
+            layers.Normalization(
+                mean=[0.485, 0.456, 0.406], variance=[0.229 ** 2, 0.224 ** 2, 0.225 ** 2]
+            )
+        ]
+    return [layers.Rescaling(1.0 / 127.5, offset=-1.0)]
+
+
+def build_transfer_model(backbone='mobilenet_v2', input_shape=(224, 224, 3), learning_rate=0.001,
+                         include_preprocessing=False, jit_compile=False, weights_path=None):
+    """
+    Build a classifier on a frozen pretrained backbone.
+    
+    The model always takes raw [0, 255] pixels and scales them in-graph for
+    the backbone. Only the head (dropout and a sigmoid unit over the pooled
+    embedding) is trainable; see split_transfer_model for training it on
+    cached features and unfreeze_backbone for fine-tuning.
+    
+    Args:
+        backbone: One of BACKBONES
+        input_shape: Shape of input images (height, width, channels)
+        learning_rate: Learning rate for optimizer
+        include_preprocessing: If True, the model also resizes images of any size
+        jit_compile: Compile training and inference steps with XLA
+        weights_path: Local backbone weights file (see build_backbone); without
+            it the frozen backbone is random, which only suits tests
+    
+    Returns:
+        Compiled Keras model
+    """
+    if weights_path is None:
+        print(f"WARNING: {backbone} backbone has random weights; pass weights_path for "
+              "transfer learning")
+    base = build_backbone(backbone, input_shape, weights_path)
+    base.trainable = False
+    
+    if include_preprocessing:
+        inputs = [
+            layers.Input(shape=(None, None, input_shape[2])),
+            layers.Resizing(input_shape[0], input_shape[1])
+        ]
+    else:
+        inputs = [layers.Input(shape=input_shape)]
+    
+    model = models.Sequential(inputs + backbone_input_layers(backbone) + [
+        base,
+        layers.Dropout(0.2),
+        layers.Dense(1, activation='sigmoid', dtype='float32')
+    ], name=f"transfer_{backbone}")
+    
+    return compile_model(model, learning_rate, jit_compile)
+
+
+def split_transfer_model(model, learning_rate=0.001):
+    """
+    Split a transfer model into a feature extractor and a head sharing its layers.
+    
+    Training the head on cached backbone embeddings trains the full model's
+    head, without running the backbone every epoch.
+    
+    Args:
+        model: Model from build_transfer_model
+        learning_rate: Learning rate for the head's optimizer
+    
+    Returns:
+        Tuple of (extractor taking raw pixels, compiled head taking embeddings)
+    """
+    index = next(i for i, layer in enumerate(model.layers) if isinstance(layer, models.Model))
+    extractor = models.Sequential(
+        [layers.Input(shape=model.input_shape[1:])] + model.layers[:index + 1]
+    )
+    head = models.Sequential(
+        [layers.Input(shape=model.layers[index].output_shape[1:])] + model.layers[index + 1:]
+    )
+    return extractor, compile_model(head, learning_rate)
+
+
+def unfreeze_backbone(model, num_layers=30, learning_rate=1e-5, jit_compile=False):
+    """
+    Make the top layers of a transfer model's backbone trainable and recompile.
+    
+    BatchNormalization layers stay frozen, so their statistics (computed on
+    the pretraining data) are not disturbed by small fine-tuning batches.
+    
+    Args:
+        model: Model from build_transfer_model
+        num_layers: Number of backbone layers, counted from the top, to train
+        learning_rate: Fine-tuning learning rate (well below the head's)
+        jit_compile: Compile training and inference steps with XLA
+    
+    Returns:
+        The recompiled model
+    """
+    base = next(layer for layer in model.layers if isinstance(layer, models.Model))
+    base.trainable = True
+    for i, layer in enumerate(base.layers):
+        layer.trainable = (
+            i >= len(base.layers) - num_layers
+            and not isinstance(layer, layers.BatchNormalization)
+        )
+    return compile_model(model, learning_rate, jit_compile)
+
+
+def input_layers(input_shape=(224, 224, 3), include_preprocessing=False):
+    """
+    Input layers shared by all architectures.
+    
+    Args:
+        input_shape: Shape the convolutional blocks expect (height, width, channels)
+        include_preprocessing: Accept raw pixels of any size and resize and
+            normalize them in-graph
+    
+    Returns:
+        List of Keras layers
+    """
+    if include_preprocessing:
+        return preprocessing_layers(input_shape)
+    return [layers.Input(shape=input_shape)]
+
+
+def pooled_head():
+    """
+    Classification head over globally averaged feature maps.
+    
+    Returns:
+        List of Keras layers ending in a float32 sigmoid output
+    """
+    return [
+        layers.GlobalAveragePooling2D(),
+        layers.Dense(128, activation='relu'),
+        layers.Dropout(0.5),
+        layers.Dense(1, activation='sigmoid', dtype='float32')
+    ]
+
+
+def compile_model(model, learning_rate=0.001, jit_compile=False):
+    """
+    Compile a binary classifier with Adam and the tracked metrics.
+    
+    Args:
+        model: Keras model with a sigmoid output
+        learning_rate: Learning rate for optimizer
+        jit_compile: Compile training and inference steps with XLA
+    
+    Returns:
+        The compiled model
+    """
     model.compile(
         optimizer=tf.keras.optimizers.Adam(learning_rate=learning_rate),
         loss='binary_crossentropy',
@@ -55,12 +370,115 @@ def build_baseline_cnn(input_shape=(224, 224, 3), learning_rate=0.001):
             'accuracy',
             tf.keras.metrics.Precision(name='precision'),
             tf.keras.metrics.Recall(name='recall')
-        ]
+        ],
+        jit_compile=jit_compile
     )
-    
     return model
 
 
+def preprocessing_layers(input_shape=(224, 224, 3)):
+    """
+    Layers that resize and normalize raw pixels inside the model graph.
+    
+    Args:
+        input_shape: Shape the rest of the network expects (height, width, channels)
+    
+    Returns:
+        List of Keras layers accepting (None, None, channels) raw pixel input
+    """
+    return [
+        layers.Input(shape=(None, None, input_shape[2])),
+        layers.Resizing(input_shape[0], input_shape[1]),
+        layers.Rescaling(1.0 / 255)
+    ]
+
+
+def model_includes_preprocessing(model):
+    """
+    Check whether a model normalizes its own input.
+    
+    Args:
+        model: Keras model
+    
+    Returns:
+        True if the model contains a Rescaling layer (expects raw [0, 255] pixels)
+    """
+    return any(isinstance(layer, layers.Rescaling) for layer in model.layers)
+
+
+def get_image_shape(model):
+    """
+    Get the (height, width, channels) images should be resized to for a model.
+    
+    Models with in-graph preprocessing accept any size; the Resizing target
+    is used for them.
+    
+    Args:
+        model: Keras model
+    
+    Returns:
+        Tuple of (height, width, channels)
+    """
+    height, width, channels = model.input_shape[1:]
+    if height is None or width is None:
+        for layer in model.layers:
+            if isinstance(layer, layers.Resizing):
+                return (layer.height, layer.width, channels)
+    return (height, width, channels)
+
+
+def add_preprocessing_layers(model):
+    """
+    Export an existing model so it accepts raw pixels.
+    
+    Wraps a model trained on [0, 1] inputs (e.g. an older .h5 file) with the
+    Resizing and Rescaling layers, reusing its trained weights.
+    
+    Args:
+        model: Keras model expecting normalized input
+    
+    Returns:
+        Compiled Keras model expecting raw [0, 255] pixels
+    """
+    if model_includes_preprocessing(model):
+        return model
+    
+    exported = models.Sequential(preprocessing_layers(get_image_shape(model)) + [model])
+    exported.compile(optimizer='adam', loss='binary_crossentropy', metrics=['accuracy'])
+    return exported
+
+
+def make_inference_fn(model, input_dtype=tf.float32):
+    """
+    Wrap a model in a traced tf.function for low-overhead serving.
+    
+    Unlike model.predict, calling the returned function does not build a data
+    adapter or iterator per call; it runs a single graph traced once for a fixed
+    input signature with a variable batch dimension.
+    
+    Args:
+        model: Keras model
+        input_dtype: tf.float32 for inputs already in the range the model
+            expects, or tf.uint8 for raw pixels; these are cast inside the graph
+            and rescaled by 1/255 unless the model does that itself
+    
+    Returns:
+        Callable mapping an (N, H, W, C) batch to an (N, 1) tensor
+    """
+    input_spec = tf.TensorSpec(shape=(None,) + get_image_shape(model), dtype=input_dtype)
+    rescale = not model_includes_preprocessing(model)
+    
+    @tf.function(input_signature=[input_spec])
+    def infer(images):
+        if images.dtype == tf.uint8:
+            images = tf.cast(images, tf.float32)
+            if rescale:
+                images = images * (1.0 / 255.0)
+        return model(images, training=False)
+    
+    return infer
+
+
 def get_model_summary(model):
     """
     Get model architecture summary as string.
@@ -0,0 +1,453 @@
+"""
+Shrink a trained Cats vs Dogs model by pruning and weight clustering.
+Structured channel pruning removes whole filters, so the model gets smaller
+and faster on CPU. Magnitude pruning then zeroes the smallest remaining
+weights during a short fine-tuning run, and weight clustering snaps each
+kernel to a few shared values. Zeros and repeated values only shrink the
+compressed file, not the latency of dense kernels.
+"""
+
+import os
+import gzip
+import json
+import argparse
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras import layers, models
+
+from model import compile_model, model_includes_preprocessing, get_image_shape
+from data_preprocessing import create_tf_datasets
+from benchmark import describe_model
+
+
+# Layers whose weights channel pruning can slice; others must be weightless
+CHANNEL_PRUNABLE_LAYERS = (layers.Conv2D, layers.SeparableConv2D, layers.Dense)
+
+
+def prunable_weights(model):
+    """
+    Trainable kernels of a model's convolution and dense layers (biases excluded).
+
+    Args:
+        model: Keras model
+
+    Returns:
+        List of tf.Variable
+    """
+    return [
+        weight
+        for layer in model.layers if isinstance(layer, CHANNEL_PRUNABLE_LAYERS)
+        for weight in layer.trainable_weights if 'kernel' in weight.name
+    ]
+
+
+def model_sparsity(model):
+    """
+    Fraction of zero weights over the prunable kernels.
+
+    Args:
+        model: Keras model
+
+    Returns:
+        Sparsity between 0 and 1
+    """
+    kernels = [weight.numpy() for weight in prunable_weights(model)]
+    total = sum(kernel.size for kernel in kernels)
+    return float(sum(np.count_nonzero(kernel == 0) for kernel in kernels) / max(total, 1))
+
+
+def _top_channels(norms, fraction):
+    """Sorted indices of the channels with the largest norms, dropping `fraction` of them."""
+    num_keep = max(1, int(round(len(norms) * (1.0 - fraction))))
+    return np.sort(np.argsort(norms)[::-1][:num_keep])
+
+
+def prune_channels(model, fraction=0.25, learning_rate=1e-4):
+    """
+    Remove the filters and dense units with the smallest L1 norms.
+
+    Every Conv2D, SeparableConv2D and hidden Dense layer of a Sequential
+    model loses `fraction` of its outputs, and the next layer loses the
+    matching inputs, so the result is a smaller dense model rather than a
+    masked one. The output layer keeps all its units. With fraction 0 it
+    returns a recompiled copy of the model.
+
+    Args:
+        model: Sequential Keras model (baseline_cnn, gap_cnn or separable_cnn)
+        fraction: Fraction of channels to remove from each layer
+        learning_rate: Learning rate the returned model is compiled with
+
+    Returns:
+        Compiled Keras model with the surviving weights
+    """
+    if not isinstance(model, models.Sequential):
+        raise ValueError("Channel pruning needs a Sequential model")
+
+    output_layer = model.layers[-1]
+    keep = np.arange(model.input_shape[-1])
+    new_layers, new_weights = [], []
+
+    for layer in model.layers:
+        config = layer.get_config()
+        weights = layer.get_weights()
+
+        if isinstance(layer, layers.SeparableConv2D):
+            depthwise, pointwise, *bias = weights
+            multiplier = depthwise.shape[-1]
+            depthwise = depthwise[:, :, keep, :]
+            pointwise = pointwise[:, :, (keep[:, None] * multiplier + np.arange(multiplier)).ravel(), :]
+            keep = _top_channels(np.abs(pointwise).sum(axis=(0, 1, 2)), fraction)
+            config['filters'] = len(keep)
+            weights = [depthwise, pointwise[..., keep]] + [b[keep] for b in bias]
+        elif isinstance(layer, layers.Conv2D):
+            kernel, *bias = weights
+            kernel = kernel[:, :, keep, :]
+            keep = _top_channels(np.abs(kernel).sum(axis=(0, 1, 2)), fraction)
+            config['filters'] = len(keep)
+            weights = [kernel[..., keep]] + [b[keep] for b in bias]
+        elif isinstance(layer, layers.Dense):
+            kernel, *bias = weights
+            kernel = kernel[keep]
+            keep = np.arange(kernel.shape[1])
+            if layer is not output_layer:
+                keep = _top_channels(np.abs(kernel).sum(axis=0), fraction)
+            config['units'] = len(keep)
+            weights = [kernel[:, keep]] + [b[keep] for b in bias]
+        elif isinstance(layer, layers.Flatten):
+            # Channels-last flattening: feature (position, channel) sits at position * channels + channel
+            height, width, channels = layer.input_shape[1:]
+            keep = (np.arange(height * width)[:, None] * channels + keep[None, :]).ravel()
+        elif weights:
+            raise ValueError(f"Channel pruning does not support {type(layer).__name__} layers")
+
+        new_layers.append(type(layer).from_config(config))
+        new_weights.append(weights)
+
+    pruned = models.Sequential(
+        [layers.Input(shape=model.input_shape[1:])] + new_layers, name=model.name
+    )
+    for layer, weights in zip(pruned.layers, new_weights):
+        layer.set_weights(weights)
+    return compile_model(pruned, learning_rate)
+
+
+def polynomial_sparsity(step, target_sparsity, end_step, initial_sparsity=0.0, power=3):
+    """
+    Sparsity schedule rising quickly at first and levelling off at the target.
+
+    The same polynomial decay schedule as TensorFlow Model Optimization's
+    PolynomialDecay, starting at step 0.
+
+    Args:
+        step: Training step
+        target_sparsity: Final sparsity
+        end_step: Step at which the target is reached
+        initial_sparsity: Sparsity at step 0
+        power: Exponent of the decay
+
+    Returns:
+        Sparsity for this step
+    """
+    progress = min(1.0, step / max(end_step, 1))
+    return target_sparsity + (initial_sparsity - target_sparsity) * (1.0 - progress) ** power
+
+
+def magnitude_mask(kernel, sparsity):
+    """
+    Mask keeping the largest-magnitude weights of a kernel.
+
+    Args:
+        kernel: Weight array
+        sparsity: Fraction of weights to zero
+
+    Returns:
+        float32 array of 0s and 1s shaped like kernel
+    """
+    num_pruned = int(round(kernel.size * sparsity))
+    mask = np.ones(kernel.size, dtype=np.float32)
+    if num_pruned:
+        mask[np.argsort(np.abs(kernel), axis=None)[:num_pruned]] = 0.0
+    return mask.reshape(kernel.shape)
+
+
+class MagnitudePruning(tf.keras.callbacks.Callback):
+    """
+    Keras callback zeroing the smallest weights of every kernel while the model trains.
+
+    Masks are recomputed every `update_every` steps following
+    polynomial_sparsity and applied after every batch, so the optimizer
+    cannot regrow pruned weights. Training ends at exactly the target
+    sparsity, even if it stops early.
+    """
+
+    def __init__(self, target_sparsity=0.5, end_step=1000, update_every=50):
+        """
+        Set up the pruning schedule.
+
+        Args:
+            target_sparsity: Final fraction of zero weights in each kernel
+            end_step: Step at which the target is reached
+            update_every: Steps between mask updates
+        """
+        super().__init__()
+        self.target_sparsity = target_sparsity
+        self.end_step = end_step
+        self.update_every = update_every
+        self.step = 0
+        self.masks = None
+
+    def _update_masks(self, sparsity):
+        self.masks = [
+            tf.constant(magnitude_mask(weight.numpy(), sparsity))
+            for weight in prunable_weights(self.model)
+        ]
+
+    def _apply_masks(self):
+        for weight, mask in zip(prunable_weights(self.model), self.masks):
+            weight.assign(weight * tf.cast(mask, weight.dtype))
+
+    def on_train_batch_begin(self, batch, logs=None):
+        if self.masks is None or self.step % self.update_every == 0:
+            self._update_masks(polynomial_sparsity(self.step, self.target_sparsity, self.end_step))
+            self._apply_masks()
+
+    def on_train_batch_end(self, batch, logs=None):
+        self.step += 1
+        self._apply_masks()
+
+    def on_train_end(self, logs=None):
+        self._update_masks(self.target_sparsity)
+        self._apply_masks()
+
+
+def cluster_weights(model, num_clusters=16, iterations=10):
+    """
+    Replace each kernel's nonzero weights with the nearest of num_clusters shared values.
+
+    Runs 1-D k-means per kernel with centroids initialized evenly between
+    the smallest and largest weight. Pruned (zero) weights stay zero, so
+    clustering keeps the sparsity.
+
+    Args:
+        model: Keras model, changed in place
+        num_clusters: Distinct nonzero values per kernel
+        iterations: k-means iterations
+
+    Returns:
+        The model
+    """
+    for weight in prunable_weights(model):
+        kernel = weight.numpy()
+        nonzero = kernel != 0
+        values = kernel[nonzero]
+        if values.size <= num_clusters:
+            continue
+        centroids = np.linspace(values.min(), values.max(), num_clusters)
+        for _ in range(iterations):
+            assignment = np.argmin(np.abs(values[:, None] - centroids[None, :]), axis=1)
+            counts = np.bincount(assignment, minlength=num_clusters)
+            sums = np.bincount(assignment, weights=values, minlength=num_clusters)
+            centroids = np.where(counts > 0, sums / np.maximum(counts, 1), centroids)
+        assignment = np.argmin(np.abs(values[:, None] - centroids[None, :]), axis=1)
+        kernel[nonzero] = centroids[assignment]
+        weight.assign(kernel)
+    return model
+
+
+def gzipped_size_mb(path):
+    """
+    Size of a model file after gzip, which is where sparsity and clustering show up.
+
+    Args:
+        path: Model file
+
+    Returns:
+        Megabytes
+    """
+    with open(path, 'rb') as f:
+        return len(gzip.compress(f.read())) / 2 ** 20
+
+
+def evaluate_accuracy(model, val_data):
+    """
+    Validation accuracy of a compiled model.
+
+    Args:
+        model: Compiled Keras model
+        val_data: Validation dataset or generator
+
+    Returns:
+        Accuracy between 0 and 1
+    """
+    results = model.evaluate(val_data, verbose=0, return_dict=True)
+    return float(results['accuracy'])
+
+
+def describe_optimization(model, model_path, val_data, batch_sizes=(1, 32), iterations=10):
+    """
+    Size, sparsity, latency and accuracy of one model for the optimization report.
+
+    Args:
+        model: Compiled Keras model
+        model_path: Saved model file
+        val_data: Validation dataset or generator
+        batch_sizes: Batch sizes for latency
+        iterations: Timed calls per batch size
+
+    Returns:
+        Dictionary of metrics (see describe_model) plus gzip_size_mb,
+        sparsity and accuracy
+    """
+    metrics = describe_model(model, model_path, batch_sizes, iterations)
+    metrics['gzip_size_mb'] = gzipped_size_mb(model_path)
+    metrics['sparsity'] = model_sparsity(model)
+    metrics['accuracy'] = evaluate_accuracy(model, val_data)
+    return metrics
+
+
+def optimize_model(model, model_path, output_path, train_data, val_data, steps_per_epoch,
+                   channel_fraction=0.25, sparsity=0.5, epochs=2, learning_rate=1e-4,
+                   num_clusters=16, callbacks=None):
+    """
+    Prune, fine-tune and cluster a trained model and compare it with the dense one.
+
+    Steps:
+    1. prune_channels removes channel_fraction of every layer's filters.
+    2. Fine-tuning for `epochs` recovers accuracy while MagnitudePruning
+       raises the sparsity of every kernel to `sparsity`.
+    3. cluster_weights shares num_clusters values per kernel (0 skips it).
+
+    Args:
+        model: Trained Sequential Keras model; left unchanged
+        model_path: Saved file of the trained model
+        output_path: Path for the optimized .h5 model
+        train_data: Training dataset or generator (same input scaling as the model)
+        val_data: Validation dataset or generator
+        steps_per_epoch: Training steps per fine-tuning epoch
+        channel_fraction: Fraction of channels removed per layer
+        sparsity: Target fraction of zero weights per kernel
+        epochs: Fine-tuning epochs
+        learning_rate: Fine-tuning learning rate
+        num_clusters: Shared values per kernel (0 disables clustering)
+        callbacks: Extra Keras callbacks for fine-tuning
+
+    Returns:
+        Tuple of (optimized model, report dictionary with 'dense',
+        'optimized' and 'ratio' entries)
+    """
+    dense_metrics = describe_optimization(model, model_path, val_data)
+
+    optimized = prune_channels(model, channel_fraction, learning_rate)
+    if epochs:
+        # Reach the target sparsity halfway, so the last steps recover accuracy at it
+        pruning = MagnitudePruning(sparsity, end_step=max(1, epochs * steps_per_epoch // 2))
+        optimized.fit(
+            train_data,
+            epochs=epochs,
+            steps_per_epoch=steps_per_epoch,
+            callbacks=[pruning] + list(callbacks or []),
+            verbose=1
+        )
+    elif sparsity:
+        for weight in prunable_weights(optimized):
+            weight.assign(weight * magnitude_mask(weight.numpy(), sparsity))
+    if num_clusters:
+        cluster_weights(optimized, num_clusters)
+
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    optimized.save(output_path)
+    optimized_metrics = describe_optimization(optimized, output_path, val_data)
+
+    report = {
+        'settings': {
+            'channel_fraction': channel_fraction,
+            'sparsity': sparsity,
+            'epochs': epochs,
+            'num_clusters': num_clusters
+        },
+        'dense': dict(dense_metrics, path=model_path),
+        'optimized': dict(optimized_metrics, path=output_path),
+        # Optimized / dense: below 1 means smaller or faster
+        'ratio': {
+            key: optimized_metrics[key] / dense_metrics[key]
+            for key in dense_metrics
+            if key.endswith(('_mb', '_ms')) or key == 'param_count'
+        }
+    }
+    report['accuracy_drop'] = dense_metrics['accuracy'] - optimized_metrics['accuracy']
+
+    report_path = os.path.splitext(output_path)[0] + '_report.json'
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    report['report_path'] = report_path
+    print_optimization_report(report)
+    return optimized, report
+
+
+def print_optimization_report(report):
+    """
+    Print dense and optimized model metrics side by side.
+
+    Args:
+        report: Report from optimize_model
+    """
+    print(f"\n{'Metric':<18} {'Dense':>12} {'Optimized':>12} {'Ratio':>8}")
+    for key, dense_value in report['dense'].items():
+        if key == 'path':
+            continue
+        ratio = report['ratio'].get(key)
+        ratio_text = f"{ratio:>8.2f}" if ratio is not None else ' ' * 8
+        print(f"{key:<18} {dense_value:>12.4g} {report['optimized'][key]:>12.4g} {ratio_text}")
+
+
+def main():
+    """
+    Main entry point for optimizing an already trained model.
+    """
+    parser = argparse.ArgumentParser(description='Prune and cluster a trained Cats vs Dogs model')
+    parser.add_argument('--model_path', type=str, default='models/cats_dogs_model.h5',
+                        help='Path to trained model')
+    parser.add_argument('--output_path', type=str, default=None,
+                        help='Path for the optimized model (default: <model>_optimized.h5)')
+    parser.add_argument('--train_dir', type=str, default='data/train',
+                        help='Training images for fine-tuning')
+    parser.add_argument('--val_dir', type=str, default='data/validation',
+                        help='Validation images for the accuracy comparison')
+    parser.add_argument('--batch_size', type=int, default=32,
+                        help='Fine-tuning batch size')
+    parser.add_argument('--channel_fraction', type=float, default=0.25,
+                        help='Fraction of filters removed from each layer')
+    parser.add_argument('--sparsity', type=float, default=0.5,
+                        help='Target fraction of zero weights in each kernel')
+    parser.add_argument('--epochs', type=int, default=2,
+                        help='Fine-tuning epochs')
+    parser.add_argument('--learning_rate', type=float, default=1e-4,
+                        help='Fine-tuning learning rate')
+    parser.add_argument('--num_clusters', type=int, default=16,
+                        help='Shared weight values per kernel (0 disables clustering)')
+
+    args = parser.parse_args()
+
+    model = tf.keras.models.load_model(args.model_path)
+    height, width, _ = get_image_shape(model)
+    train_data, val_data, _, train_samples, _ = create_tf_datasets(
+        args.train_dir,
+        args.val_dir,
+        batch_size=args.batch_size,
+        target_size=(height, width),
+        rescale=not model_includes_preprocessing(model)
+    )
+    output_path = args.output_path or f"{os.path.splitext(args.model_path)[0]}_optimized.h5"
+    optimize_model(
+        model, args.model_path, output_path, train_data, val_data,
+        steps_per_epoch=int(np.ceil(train_samples / args.batch_size)),
+        channel_fraction=args.channel_fraction,
+        sparsity=args.sparsity,
+        epochs=args.epochs,
+        learning_rate=args.learning_rate,
+        num_clusters=args.num_clusters
+    )
+
+
+if __name__ == '__main__':
+    main()
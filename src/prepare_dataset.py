@@ -4,18 +4,763 @@ Run this after downloading the raw dataset from Kaggle.
 """
 
 import os
+import json
+import math
+import heapq
+import hashlib
 import shutil
 from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import numpy as np
+from PIL import Image
 from sklearn.model_selection import train_test_split
 import argparse
 
+from dedup import (
+    load_hash_thumbnails, dhash_batch, find_near_duplicates, cluster_pairs, MAX_DISTANCE
+)
 
-def count_files(directory, pattern):
-    """Count files matching pattern in directory."""
-    return len(list(Path(directory).glob(pattern)))
 
+SPLITS = ['train', 'validation', 'test']
+CLASS_NAMES = ['cats', 'dogs']
+SHARD_INDEX = 'index.json'
+MANIFEST_NAME = 'manifest.jsonl'
+LINK_MODES = ['copy', 'hardlink', 'reflink', 'symlink', 'auto']
+FICLONE = 0x40049409
+IMAGE_METADATA = ('width', 'height', 'format')
 
-def split_dataset(source_dir, output_dir, train_ratio=0.8, val_ratio=0.1, test_ratio=0.1):
+
+def compute_splits(cat_files, dog_files, train_ratio=0.8, val_ratio=0.1, test_ratio=0.1,
+                   random_state=42):
+    """
+    Split cat and dog filenames into train/validation/test sets per class.
+    
+    Args:
+        cat_files: Sorted list of cat image filenames
+        dog_files: Sorted list of dog image filenames
+        train_ratio: Proportion for training set
+        val_ratio: Proportion for validation set
+        test_ratio: Proportion for test set
+        random_state: Random seed for reproducible splits
+    
+    Returns:
+        Dictionary mapping split name to {class_name: [filenames]}
+    """
+    val_size = val_ratio / (val_ratio + test_ratio)
+    
+    splits = {split: {} for split in SPLITS}
+    for class_name, files in (('cats', cat_files), ('dogs', dog_files)):
+        train_files, temp_files = train_test_split(
+            files, 
+            train_size=train_ratio, 
+            random_state=random_state
+        )
+        val_files, test_files = train_test_split(
+            temp_files, 
+            train_size=val_size, 
+            random_state=random_state
+        )
+        splits['train'][class_name] = train_files
+        splits['validation'][class_name] = val_files
+        splits['test'][class_name] = test_files
+    
+    return splits
+
+
+def inspect_image(path):
+    """
+    Fully check an image file: header and structure, then a complete decode.
+    
+    Image.verify() alone accepts truncated JPEGs, which only fail when the
+    pixel data is decoded (e.g. mid-epoch in training), so both are run.
+    
+    Args:
+        path: Image file path
+    
+    Returns:
+        Dictionary of width, height and format
+    
+    Raises:
+        ValueError: If the file is empty, unreadable, truncated or corrupt
+    """
+    try:
+        with Image.open(path) as img:
+            img.verify()
+        with Image.open(path) as img:
+            img.load()
+            return {'width': img.width, 'height': img.height, 'format': img.format}
+    except Exception as e:
+        raise ValueError(f"{type(e).__name__}: {e}")
+
+
+def check_image(path):
+    """
+    Process-pool worker for validate_images.
+    
+    Args:
+        path: Image file path
+    
+    Returns:
+        Tuple of (metadata dictionary or None, error message or None)
+    """
+    try:
+        return inspect_image(path), None
+    except ValueError as e:
+        return None, str(e)
+
+
+def validate_images(source_path, filenames, previous=None, workers=None):
+    """
+    Validate images on a process pool, reusing results for unchanged files.
+    
+    A file whose size and mtime match its entry in a previous manifest is
+    not opened again; its recorded dimensions and format are reused.
+    
+    Args:
+        source_path: Path of the raw image directory
+        filenames: Image filenames to validate
+        previous: Dictionary of source filename to manifest entry from an earlier run
+        workers: Number of worker processes (default: CPU count)
+    
+    Returns:
+        Tuple of ({filename: metadata} for valid images, {filename: error} for bad ones)
+    """
+    previous = previous or {}
+    valid, bad, pending = {}, {}, []
+    for filename in filenames:
+        stat = os.stat(source_path / filename)
+        old = previous.get(filename)
+        if (old is not None and 'format' in old
+                and old.get('size') == stat.st_size and old.get('mtime_ns') == stat.st_mtime_ns):
+            valid[filename] = {key: old[key] for key in IMAGE_METADATA}
+        else:
+            pending.append(filename)
+    
+    print(f"\nValidating {len(pending)} images ({len(valid)} cached)...")
+    if pending:
+        workers = workers or os.cpu_count() or 1
+        paths = [str(source_path / filename) for filename in pending]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(check_image, paths, chunksize=max(1, len(paths) // (4 * workers)))
+            for filename, (metadata, error) in zip(pending, results):
+                if error is None:
+                    valid[filename] = metadata
+                else:
+                    bad[filename] = error
+    
+    return valid, bad
+
+
+def quarantine_files(source_path, quarantine_path, bad, move=False):
+    """
+    Copy bad images into quarantine and log why.
+    
+    The source directory is left untouched unless move is set. A file whose
+    copy of the same size is already in quarantine is not copied or logged
+    again, so re-runs do not duplicate report entries.
+    
+    Args:
+        source_path: Path of the raw image directory
+        quarantine_path: Directory receiving the bad files
+        bad: Dictionary of filename to error message
+        move: Move the bad files out of the source directory instead of copying them
+    """
+    quarantine_path.mkdir(parents=True, exist_ok=True)
+    with open(quarantine_path / 'quarantine.jsonl', 'a') as report:
+        for filename, error in sorted(bad.items()):
+            source, target = source_path / filename, quarantine_path / filename
+            if move:
+                shutil.move(str(source), str(target))
+            elif target.exists() and target.stat().st_size == source.stat().st_size:
+                continue
+            else:
+                shutil.copy2(source, target)
+            report.write(json.dumps({
+                'source': filename,
+                'error': error,
+                'quarantined_at': datetime.now().isoformat(timespec='seconds')
+            }) + '\n')
+            print(f"  Quarantined {filename}: {error}")
+
+
+def compute_hashes(source_path, filenames, previous=None, workers=8):
+    """
+    Compute perceptual hashes, reusing those of unchanged files.
+    
+    Args:
+        source_path: Path of the raw image directory
+        filenames: Image filenames
+        previous: Dictionary of source filename to manifest entry from an earlier run
+        workers: Number of concurrent thumbnail decodes
+    
+    Returns:
+        uint64 array of hashes aligned with filenames
+    """
+    previous = previous or {}
+    hashes = np.zeros(len(filenames), dtype=np.uint64)
+    pending = []
+    for i, filename in enumerate(filenames):
+        stat = os.stat(source_path / filename)
+        old = previous.get(filename)
+        if (old is not None and 'dhash' in old
+                and old.get('size') == stat.st_size and old.get('mtime_ns') == stat.st_mtime_ns):
+            hashes[i] = int(old['dhash'], 16)
+        else:
+            pending.append(i)
+    
+    print(f"\nHashing {len(pending)} images ({len(filenames) - len(pending)} cached)...")
+    if pending:
+        thumbnails = load_hash_thumbnails(
+            [str(source_path / filenames[i]) for i in pending], workers=workers
+        )
+        hashes[pending] = dhash_batch(thumbnails)
+    return hashes
+
+
+def deduplicate_splits(splits, hashes_by_file, max_distance=4, mode='group'):
+    """
+    Keep near-duplicate clusters out of more than one split.
+    
+    In 'group' mode every cluster moves to the split holding most of its
+    members (ties go to train, so evaluation sets lose rather than gain
+    images). In 'drop' mode only the cluster's first file is kept.
+    
+    Args:
+        splits: Dictionary from compute_splits or assign_splits
+        hashes_by_file: Dictionary of filename to uint64 perceptual hash
+        max_distance: Maximum Hamming distance counted as a duplicate
+        mode: 'group' or 'drop'
+    
+    Returns:
+        Tuple of (new splits, {filename: first file of its cluster} for every
+        file in a cluster of two or more)
+    """
+    placement = {
+        filename: (split, class_name)
+        for split in SPLITS
+        for class_name in CLASS_NAMES
+        for filename in splits[split][class_name]
+    }
+    filenames = sorted(placement)
+    hashes = np.array([hashes_by_file[filename] for filename in filenames], dtype=np.uint64)
+    roots = cluster_pairs(len(filenames), find_near_duplicates(hashes, max_distance))
+    
+    clusters = {}
+    for index, root in enumerate(roots):
+        clusters.setdefault(root, []).append(index)
+    clusters = [members for members in clusters.values() if len(members) > 1]
+    
+    duplicate_of, moved, dropped = {}, 0, 0
+    for members in clusters:
+        names = [filenames[i] for i in members]
+        for name in names:
+            duplicate_of[name] = names[0]
+        if mode == 'drop':
+            for name in names[1:]:
+                del placement[name]
+                dropped += 1
+            continue
+        
+        counts = [sum(placement[name][0] == split for name in names) for split in SPLITS]
+        target = SPLITS[counts.index(max(counts))]
+        for name in names:
+            if placement[name][0] != target:
+                placement[name] = (target, placement[name][1])
+                moved += 1
+    
+    print(f"Found {len(clusters)} near-duplicate clusters ({len(duplicate_of)} images); "
+          f"moved {moved}, dropped {dropped}")
+    
+    new_splits = {split: {class_name: [] for class_name in CLASS_NAMES} for split in SPLITS}
+    for filename in filenames:
+        if filename in placement:
+            split, class_name = placement[filename]
+            new_splits[split][class_name].append(filename)
+    return new_splits, duplicate_of
+
+
+def hash_split(filename, train_ratio=0.8, val_ratio=0.1):
+    """
+    Assign a file to a split from a stable hash of its name.
+    
+    Used for images added after the initial split, so that re-running never
+    moves an existing image to a different split.
+    
+    Args:
+        filename: Source image filename
+        train_ratio: Proportion for training set
+        val_ratio: Proportion for validation set
+    
+    Returns:
+        Split name
+    """
+    digest = hashlib.blake2b(filename.encode(), digest_size=8).digest()
+    position = int.from_bytes(digest, 'big') / 2 ** 64
+    if position < train_ratio:
+        return 'train'
+    if position < train_ratio + val_ratio:
+        return 'validation'
+    return 'test'
+
+
+def assign_splits(cat_files, dog_files, previous, train_ratio=0.8, val_ratio=0.1, test_ratio=0.1):
+    """
+    Split images, keeping the split of every image already in the manifest.
+    
+    Args:
+        cat_files: Sorted list of cat image filenames
+        dog_files: Sorted list of dog image filenames
+        previous: Dictionary of source filename to manifest entry from an earlier run
+        train_ratio: Proportion for training set
+        val_ratio: Proportion for validation set
+        test_ratio: Proportion for test set
+    
+    Returns:
+        Dictionary mapping split name to {class_name: [filenames]}
+    """
+    if not previous:
+        return compute_splits(cat_files, dog_files, train_ratio, val_ratio, test_ratio)
+    
+    splits = {split: {class_name: [] for class_name in CLASS_NAMES} for split in SPLITS}
+    for class_name, files in (('cats', cat_files), ('dogs', dog_files)):
+        for filename in files:
+            entry = previous.get(filename)
+            if entry is not None and entry['class'] == class_name:
+                split = entry['split']
+            else:
+                split = hash_split(filename, train_ratio, val_ratio)
+            splits[split][class_name].append(filename)
+    return splits
+
+
+def ratios_changed(previous, ratios):
+    """
+    Check whether a previous manifest was split with different ratios.
+    
+    Entries written before the ratios were recorded carry no split_ratios
+    and are taken to match.
+    
+    Args:
+        previous: Dictionary of source filename to manifest entry from an earlier run
+        ratios: (train_ratio, val_ratio, test_ratio) of this run
+    
+    Returns:
+        True if any entry records ratios other than the given ones
+    """
+    for entry in previous.values():
+        stored = entry.get('split_ratios')
+        if stored is not None and not all(
+            math.isclose(old, new, abs_tol=1e-6) for old, new in zip(stored, ratios)
+        ):
+            return True
+    return False
+
+
+def read_manifest(manifest_path):
+    """
+    Read a JSON-lines split manifest.
+    
+    Args:
+        manifest_path: Path to manifest.jsonl
+    
+    Returns:
+        List of entry dictionaries (empty if the manifest does not exist)
+    """
+    if not os.path.exists(manifest_path):
+        return []
+    with open(manifest_path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def write_manifest(manifest_path, entries):
+    """
+    Atomically write a JSON-lines split manifest.
+    
+    Args:
+        manifest_path: Path to manifest.jsonl
+        entries: List of entry dictionaries
+    """
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + '\n')
+    os.replace(tmp_path, manifest_path)
+
+
+def reflink_file(src, dst):
+    """
+    Clone a file with a copy-on-write reflink (Linux FICLONE).
+    
+    Args:
+        src: Source file path
+        dst: Destination file path
+    
+    Returns:
+        True if the clone succeeded, False if unsupported
+    """
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    
+    with open(src, 'rb') as src_file, open(dst, 'wb') as dst_file:
+        try:
+            fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+            return True
+        except OSError:
+            pass
+    os.remove(dst)
+    return False
+
+
+def link_file(src, dst, link_mode='copy'):
+    """
+    Materialize one file in the output layout.
+    
+    Modes: 'copy' always copies; 'hardlink', 'reflink' and 'symlink' use only
+    that method; 'auto' tries a hardlink, then a reflink, then a copy.
+    
+    Args:
+        src: Source file path
+        dst: Destination file path (replaced if it exists)
+        link_mode: One of LINK_MODES
+    
+    Returns:
+        Name of the method used
+    """
+    if os.path.lexists(dst):
+        os.remove(dst)
+    
+    if link_mode == 'symlink':
+        os.symlink(os.path.abspath(src), dst)
+        return 'symlink'
+    
+    if link_mode in ('auto', 'hardlink'):
+        try:
+            os.link(src, dst)
+            return 'hardlink'
+        except OSError:
+            if link_mode == 'hardlink':
+                raise
+    
+    if link_mode in ('auto', 'reflink'):
+        if reflink_file(src, dst):
+            return 'reflink'
+        if link_mode == 'reflink':
+            raise OSError(f"Reflinks are not supported for {dst}")
+    
+    shutil.copy(src, dst)
+    return 'copy'
+
+
+def checksum_file(path, chunk_size=1 << 20):
+    """
+    Compute the manifest checksum of a file.
+    
+    Args:
+        path: File path
+        chunk_size: Bytes read per chunk
+    
+    Returns:
+        BLAKE2b hex digest (16 bytes)
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_manifest_entries(source_path, splits, path_fn, previous=None):
+    """
+    Build one manifest entry per image, reusing checksums of unchanged files.
+    
+    Args:
+        source_path: Path of the raw image directory
+        splits: Dictionary from compute_splits or assign_splits
+        path_fn: Callable (split, class_name, filename) -> entry path, relative
+            to the manifest's directory
+        previous: Dictionary of source filename to manifest entry from an earlier run
+    
+    Returns:
+        Tuple of (entries, entries whose file is new or changed)
+    """
+    previous = previous or {}
+    entries, changed = [], []
+    for split in SPLITS:
+        for label, class_name in enumerate(CLASS_NAMES):
+            for filename in splits[split][class_name]:
+                stat = os.stat(source_path / filename)
+                entry = {
+                    'path': path_fn(split, class_name, filename),
+                    'label': label,
+                    'split': split,
+                    'checksum': None,
+                    'source': filename,
+                    'class': class_name,
+                    'size': stat.st_size,
+                    'mtime_ns': stat.st_mtime_ns
+                }
+                old = previous.get(filename)
+                if old is not None and all(old.get(key) == entry[key] for key in ('size', 'mtime_ns')):
+                    entry['checksum'] = old.get('checksum')
+                    # Only an output at this very path counts as materialized;
+                    # manifest-only entries point at the source image
+                    if 'method' in old and old['path'] == entry['path']:
+                        entry['method'] = old['method']
+                if entry['checksum'] is None:
+                    changed.append(entry)
+                entries.append(entry)
+    return entries, changed
+
+
+def checksum_entries(source_path, entries, workers=8):
+    """
+    Fill in checksums of manifest entries on a thread pool.
+    
+    Args:
+        source_path: Path of the raw image directory
+        entries: Manifest entries to checksum in place
+        workers: Number of concurrent reads
+    """
+    def checksum(entry):
+        entry['checksum'] = checksum_file(source_path / entry['source'])
+    
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(checksum, entries))
+
+
+def index_splits(source_path, output_path, splits, workers=8, previous=None):
+    """
+    Describe the split in a manifest without copying or linking any file.
+    
+    Entry paths point at the source images, relative to output_path, so
+    the manifest keeps working when both directories move together.
+    
+    Args:
+        source_path: Path of the raw image directory
+        output_path: Directory that will hold the manifest
+        splits: Dictionary from compute_splits or assign_splits
+        workers: Number of concurrent checksum reads
+        previous: Dictionary of source filename to manifest entry from an earlier run
+    
+    Returns:
+        List of manifest entries, one per image
+    """
+    output_path.mkdir(parents=True, exist_ok=True)
+    relative_source = os.path.relpath(source_path, output_path)
+    entries, changed = build_manifest_entries(
+        source_path, splits,
+        lambda split, class_name, filename: os.path.join(relative_source, filename),
+        previous
+    )
+    
+    print(f"\nIndexing {len(entries)} images ({len(changed)} new or changed)...")
+    checksum_entries(source_path, changed, workers)
+    return entries
+
+
+def is_inside(directory, path):
+    """
+    Check whether a relative path stays inside a directory.
+    
+    Symlinks are not followed, so a linked output counts as inside even
+    though it points at a source image.
+    
+    Args:
+        directory: Base directory
+        path: Path relative to directory
+    
+    Returns:
+        True if directory/path is directory itself or below it
+    """
+    base = os.path.abspath(directory)
+    target = os.path.abspath(os.path.join(base, path))
+    return os.path.commonpath([base, target]) == base
+
+
+def materialize_splits(source_path, output_path, splits, link_mode='copy', workers=8,
+                       previous=None):
+    """
+    Link or copy split images into the split/class/file layout, incrementally.
+    
+    Images whose manifest entry from a previous run matches their current
+    split, size and mtime, and whose output file still exists, are skipped.
+    Outputs for removed or re-assigned images are deleted. The remaining
+    files are processed on a thread pool.
+    
+    Args:
+        source_path: Path of the raw image directory
+        output_path: Path of the organized dataset
+        splits: Dictionary from compute_splits or assign_splits
+        link_mode: One of LINK_MODES (see link_file)
+        workers: Number of concurrent link/copy operations
+        previous: Dictionary of source filename to manifest entry from an earlier run
+    
+    Returns:
+        List of manifest entries, one per image
+    """
+    previous = previous or {}
+    for split in SPLITS:
+        for class_name in CLASS_NAMES:
+            output_path.joinpath(split, class_name).mkdir(parents=True, exist_ok=True)
+    
+    entries, changed = build_manifest_entries(
+        source_path, splits,
+        lambda split, class_name, filename: f"{split}/{class_name}/{filename}",
+        previous
+    )
+    changed_sources = {entry['source'] for entry in changed}
+    pending = [
+        entry for entry in entries
+        if entry['source'] in changed_sources
+        or 'method' not in entry
+        or not os.path.lexists(output_path / entry['path'])
+    ]
+    
+    # Remove outputs of images that were deleted from the source or moved.
+    # Only materialized entries inside output_path are touched: manifest-only
+    # entries point at sources.
+    current_paths = {entry['path'] for entry in entries}
+    stale = [
+        old['path'] for old in previous.values()
+        if 'method' in old and old['path'] not in current_paths
+        and is_inside(output_path, old['path'])
+    ]
+    for path in stale:
+        if os.path.lexists(output_path / path):
+            os.remove(output_path / path)
+    
+    print(f"\nMaterializing {len(pending)} new or changed images "
+          f"({len(entries) - len(pending)} unchanged, {len(stale)} removed, mode={link_mode})...")
+    
+    def materialize(entry):
+        entry['method'] = link_file(
+            source_path / entry['source'], output_path / entry['path'], link_mode
+        )
+    
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(materialize, pending))
+    checksum_entries(source_path, changed, workers)
+    
+    return entries
+
+
+def balance_shards(sizes, num_shards):
+    """
+    Assign items to shards so that shard byte totals are as even as possible.
+    
+    Uses the longest-processing-time heuristic: largest items first, each
+    to the currently smallest shard. Items keep their original relative
+    order within a shard.
+    
+    Args:
+        sizes: List of item sizes in bytes
+        num_shards: Number of shards
+    
+    Returns:
+        List of num_shards lists of item indices
+    """
+    heap = [(0, shard) for shard in range(num_shards)]
+    assignment = [[] for _ in range(num_shards)]
+    for index in sorted(range(len(sizes)), key=lambda i: sizes[i], reverse=True):
+        total, shard = heapq.heappop(heap)
+        assignment[shard].append(index)
+        heapq.heappush(heap, (total + sizes[index], shard))
+    return [sorted(indices) for indices in assignment]
+
+
+def write_shard(shard_path, records):
+    """
+    Write (path, label, source name) records into one TFRecord file.
+    
+    Args:
+        shard_path: Output .tfrecord path
+        records: List of (image path, integer label, source filename)
+    
+    Returns:
+        Number of image bytes written
+    """
+    import tensorflow as tf
+    
+    num_bytes = 0
+    with tf.io.TFRecordWriter(str(shard_path)) as writer:
+        for image_path, label, filename in records:
+            image_bytes = Path(image_path).read_bytes()
+            num_bytes += len(image_bytes)
+            example = tf.train.Example(features=tf.train.Features(feature={
+                'image': tf.train.Feature(bytes_list=tf.train.BytesList(value=[image_bytes])),
+                'label': tf.train.Feature(int64_list=tf.train.Int64List(value=[label])),
+                'filename': tf.train.Feature(bytes_list=tf.train.BytesList(value=[filename.encode()]))
+            }))
+            writer.write(example.SerializeToString())
+    return num_bytes
+
+
+def shard_splits(source_path, output_path, splits, shard_size_mb=100, workers=4):
+    """
+    Pack each split into size-balanced TFRecord shards with an index.
+    
+    Each split is written to output_path/split/ as split-XXXXX-of-YYYYY.tfrecord
+    files of roughly shard_size_mb each, plus an index.json describing the
+    shards, so readers do a few large sequential reads instead of one open
+    per image.
+    
+    Args:
+        source_path: Path of the raw image directory
+        output_path: Path of the sharded dataset
+        splits: Dictionary from compute_splits
+        shard_size_mb: Target shard size in megabytes
+        workers: Number of shards written concurrently
+    """
+    print("\nWriting TFRecord shards...")
+    for split in SPLITS:
+        records = [
+            (source_path / filename, label, filename)
+            for label, class_name in enumerate(CLASS_NAMES)
+            for filename in splits[split][class_name]
+        ]
+        sizes = [os.path.getsize(image_path) for image_path, _, _ in records]
+        num_shards = max(1, min(len(records), math.ceil(sum(sizes) / (shard_size_mb * 1e6))))
+        
+        split_path = output_path / split
+        split_path.mkdir(parents=True, exist_ok=True)
+        shard_names = [
+            f"{split}-{shard:05d}-of-{num_shards:05d}.tfrecord" for shard in range(num_shards)
+        ]
+        assignment = balance_shards(sizes, num_shards)
+        
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            shard_bytes = list(pool.map(
+                lambda shard: write_shard(
+                    split_path / shard_names[shard], [records[i] for i in assignment[shard]]
+                ),
+                range(num_shards)
+            ))
+        
+        index = {
+            'split': split,
+            'format': 'tfrecord',
+            'class_names': CLASS_NAMES,
+            'num_records': len(records),
+            'num_bytes': sum(shard_bytes),
+            'shards': [
+                {'file': name, 'num_records': len(indices), 'num_bytes': num_bytes}
+                for name, indices, num_bytes in zip(shard_names, assignment, shard_bytes)
+            ]
+        }
+        with open(split_path / SHARD_INDEX, 'w') as f:
+            json.dump(index, f, indent=2)
+        
+        print(f"{split.capitalize()}: {len(records)} images in {num_shards} shards "
+              f"({sum(shard_bytes) / 1e6:.1f} MB)")
+
+
+def split_dataset(source_dir, output_dir, train_ratio=0.8, val_ratio=0.1, test_ratio=0.1,
+                  output_format='directories', shard_size_mb=100, link_mode='copy', workers=8,
+                  incremental=True, validate=True, quarantine_dir=None, dedup='off',
+                  dedup_distance=4, move_corrupt=False):
     """
     Split Kaggle cats vs dogs dataset into train/validation/test sets.
     
@@ -25,6 +770,24 @@ def split_dataset(source_dir, output_dir, train_ratio=0.8, val_ratio=0.1, test_r
         train_ratio: Proportion for training set
         val_ratio: Proportion for validation set
         test_ratio: Proportion for test set
+        output_format: 'directories' copies files into split/class folders;
+            'manifest' only writes manifest.jsonl pointing at the source files;
+            'tfrecord' packs each split into sharded TFRecord files
+        shard_size_mb: Target shard size for the tfrecord format
+        link_mode: How the directories format materializes files (see link_file)
+        workers: Number of concurrent link/copy or shard-writing operations
+        incremental: Keep the split assignments recorded in the manifest of a
+            previous run (otherwise re-split from scratch). The manifest records
+            the ratios, and the dataset is re-split if they changed; in all cases only
+            new or changed images are linked, copied or checksummed
+        validate: Fully decode every new or changed image on a process pool
+            before splitting and quarantine the ones that fail
+        quarantine_dir: Where bad images are copied (default: output_dir/quarantine)
+        dedup: 'off'; 'group' keeps near-duplicate clusters in one split;
+            'drop' keeps one image per cluster (see deduplicate_splits)
+        dedup_distance: Maximum perceptual hash distance (of 64 bits) for duplicates
+        move_corrupt: Move bad images out of source_dir into quarantine instead
+            of copying them (the source is otherwise never modified)
     """
     assert abs(train_ratio + val_ratio + test_ratio - 1.0) < 0.001, "Ratios must sum to 1"
     
@@ -39,13 +802,6 @@ def split_dataset(source_dir, output_dir, train_ratio=0.8, val_ratio=0.1, test_r
     if not source_path.exists():
         raise ValueError(f"Source directory not found: {source_dir}")
     
-    # Create output directory structure
-    print("\nCreating directory structure...")
-    for split in ['train', 'validation', 'test']:
-        for class_name in ['cats', 'dogs']:
-            output_path.joinpath(split, class_name).mkdir(parents=True, exist_ok=True)
-    print("Directory structure created")
-    
     # Collect cat files
     print("\nCollecting cat images...")
     cat_files = sorted([f for f in os.listdir(source_path) if f.startswith('cat.')])
@@ -56,104 +812,80 @@ def split_dataset(source_dir, output_dir, train_ratio=0.8, val_ratio=0.1, test_r
     dog_files = sorted([f for f in os.listdir(source_path) if f.startswith('dog.')])
     print(f"Found {len(dog_files)} dog images")
     
-    # Split cat files
-    print("\nSplitting cat images...")
-    train_cats, temp_cats = train_test_split(
-        cat_files, 
-        train_size=train_ratio, 
-        random_state=42
-    )
-    val_size = val_ratio / (val_ratio + test_ratio)
-    val_cats, test_cats = train_test_split(
-        temp_cats, 
-        train_size=val_size, 
-        random_state=42
-    )
-    
-    # Split dog files
-    print("Splitting dog images...")
-    train_dogs, temp_dogs = train_test_split(
-        dog_files, 
-        train_size=train_ratio, 
-        random_state=42
-    )
-    val_dogs, test_dogs = train_test_split(
-        temp_dogs, 
-        train_size=val_size, 
-        random_state=42
-    )
-    
-    # Copy files to organized structure
-    print("\nCopying files to organized structure...")
-    
-    # Training set
-    print("Copying training set...")
-    for filename in train_cats:
-        shutil.copy(
-            source_path / filename, 
-            output_path / 'train' / 'cats' / filename
-        )
-    for filename in train_dogs:
-        shutil.copy(
-            source_path / filename, 
-            output_path / 'train' / 'dogs' / filename
-        )
+    # The tfrecord format keeps no manifest, so it always re-validates
+    manifest_path = output_path / MANIFEST_NAME
+    previous = {}
+    if output_format != 'tfrecord':
+        previous = {entry['source']: entry for entry in read_manifest(manifest_path)}
+        if previous:
+            print(f"Found manifest with {len(previous)} images from a previous run")
+        if incremental and ratios_changed(previous, (train_ratio, val_ratio, test_ratio)):
+            print("Split ratios differ from the previous manifest, re-splitting from scratch")
+            incremental = False
     
-    # Validation set
-    print("Copying validation set...")
-    for filename in val_cats:
-        shutil.copy(
-            source_path / filename, 
-            output_path / 'validation' / 'cats' / filename
-        )
-    for filename in val_dogs:
-        shutil.copy(
-            source_path / filename, 
-            output_path / 'validation' / 'dogs' / filename
+    metadata = {}
+    if validate:
+        metadata, bad = validate_images(
+            source_path, cat_files + dog_files, previous, min(workers, os.cpu_count() or 1)
         )
+        if bad:
+            quarantine_path = Path(quarantine_dir) if quarantine_dir else output_path / 'quarantine'
+            print(f"Found {len(bad)} corrupt images, {'moving' if move_corrupt else 'copying'} "
+                  f"them to {quarantine_path}")
+            quarantine_files(source_path, quarantine_path, bad, move_corrupt)
+            cat_files = [f for f in cat_files if f not in bad]
+            dog_files = [f for f in dog_files if f not in bad]
     
-    # Test set
-    print("Copying test set...")
-    for filename in test_cats:
-        shutil.copy(
-            source_path / filename, 
-            output_path / 'test' / 'cats' / filename
-        )
-    for filename in test_dogs:
-        shutil.copy(
-            source_path / filename, 
-            output_path / 'test' / 'dogs' / filename
+    print("\nSplitting images...")
+    if output_format == 'tfrecord':
+        splits = compute_splits(cat_files, dog_files, train_ratio, val_ratio, test_ratio)
+    else:
+        splits = assign_splits(
+            cat_files, dog_files, previous if incremental else None,
+            train_ratio, val_ratio, test_ratio
         )
     
+    if dedup != 'off':
+        filenames = cat_files + dog_files
+        hashes = dict(zip(filenames, compute_hashes(source_path, filenames, previous, workers)))
+        splits, duplicate_of = deduplicate_splits(splits, hashes, dedup_distance, dedup)
+        for filename, file_hash in hashes.items():
+            entry_metadata = metadata.setdefault(filename, {})
+            entry_metadata['dhash'] = f"{int(file_hash):016x}"
+            if filename in duplicate_of:
+                entry_metadata['duplicate_of'] = duplicate_of[filename]
+    
+    if output_format == 'tfrecord':
+        shard_splits(source_path, output_path, splits, shard_size_mb, workers)
+    else:
+        if output_format == 'manifest':
+            entries = index_splits(source_path, output_path, splits, workers, previous)
+        else:
+            entries = materialize_splits(
+                source_path, output_path, splits, link_mode, workers, previous
+            )
+        for entry in entries:
+            entry.update(metadata.get(entry['source'], {}))
+            entry['split_ratios'] = [train_ratio, val_ratio, test_ratio]
+        write_manifest(manifest_path, entries)
+        
+        print(f"Manifest written to {manifest_path}")
+    
     # Print statistics
     print("\n" + "=" * 60)
     print("Dataset Split Complete!")
     print("=" * 60)
-    print(f"\nTraining Set:")
-    print(f"  Cats: {len(train_cats)}")
-    print(f"  Dogs: {len(train_dogs)}")
-    print(f"  Total: {len(train_cats) + len(train_dogs)}")
-    
-    print(f"\nValidation Set:")
-    print(f"  Cats: {len(val_cats)}")
-    print(f"  Dogs: {len(val_dogs)}")
-    print(f"  Total: {len(val_cats) + len(val_dogs)}")
-    
-    print(f"\nTest Set:")
-    print(f"  Cats: {len(test_cats)}")
-    print(f"  Dogs: {len(test_dogs)}")
-    print(f"  Total: {len(test_cats) + len(test_dogs)}")
+    for split in SPLITS:
+        cats = len(splits[split]['cats'])
+        dogs = len(splits[split]['dogs'])
+        print(f"\n{split.capitalize()} Set:")
+        print(f"  Cats: {cats}")
+        print(f"  Dogs: {dogs}")
+        print(f"  Total: {cats + dogs}")
     
     print(f"\nGrand Total: {len(cat_files) + len(dog_files)} images")
     print("=" * 60)
     
-    # Verify
-    print("\nVerifying file counts...")
-    for split in ['train', 'validation', 'test']:
-        cats_count = count_files(output_path / split / 'cats', '*.jpg')
-        dogs_count = count_files(output_path / split / 'dogs', '*.jpg')
-        print(f"{split.capitalize()}: {cats_count} cats, {dogs_count} dogs")
-    
     print("\n✓ Dataset preparation complete!")
     print(f"Organized dataset saved to: {output_dir}")
 
@@ -193,15 +925,90 @@ def main():
         default=0.1,
         help='Test set ratio'
     )
+    parser.add_argument(
+        '--format', 
+        type=str, 
+        default='directories',
+        choices=['directories', 'manifest', 'tfrecord'],
+        help='Copy files into split/class folders, only write a manifest of the split, '
+             'or pack them into TFRecord shards'
+    )
+    parser.add_argument(
+        '--shard_size_mb', 
+        type=float, 
+        default=100,
+        help='Target shard size in MB for --format tfrecord'
+    )
+    parser.add_argument(
+        '--link_mode', 
+        type=str, 
+        default='copy',
+        choices=LINK_MODES,
+        help='Materialize files by copy, hardlink, reflink, symlink, or auto '
+             '(hardlink, then reflink, then copy)'
+    )
+    parser.add_argument(
+        '--workers', 
+        type=int, 
+        default=8,
+        help='Concurrent file operations'
+    )
+    parser.add_argument(
+        '--full', 
+        action='store_true',
+        help='Ignore the previous manifest and re-split from scratch'
+    )
+    parser.add_argument(
+        '--skip_validation', 
+        action='store_true',
+        help='Do not decode-check images before splitting'
+    )
+    parser.add_argument(
+        '--quarantine_dir', 
+        type=str, 
+        default=None,
+        help='Where corrupt images are copied (default: <output>/quarantine)'
+    )
+    parser.add_argument(
+        '--move_corrupt', 
+        action='store_true',
+        help='Move corrupt images out of the source directory instead of copying them'
+    )
+    parser.add_argument(
+        '--dedup', 
+        type=str, 
+        default='off',
+        choices=['off', 'group', 'drop'],
+        help='Keep near-duplicate clusters in one split (group) or keep one image per cluster (drop)'
+    )
+    parser.add_argument(
+        '--dedup_distance', 
+        type=int, 
+        default=4,
+        help=f'Maximum perceptual hash Hamming distance (of 64 bits, at most {MAX_DISTANCE}) '
+             'counted as a duplicate'
+    )
     
     args = parser.parse_args()
+    if not 0 <= args.dedup_distance <= MAX_DISTANCE:
+        parser.error(f'--dedup_distance must be between 0 and {MAX_DISTANCE}')
     
     split_dataset(
         args.source,
         args.output,
         args.train_ratio,
         args.val_ratio,
-        args.test_ratio
+        args.test_ratio,
+        output_format=args.format,
+        shard_size_mb=args.shard_size_mb,
+        link_mode=args.link_mode,
+        workers=args.workers,
+        incremental=not args.full,
+        validate=not args.skip_validation,
+        quarantine_dir=args.quarantine_dir,
+        dedup=args.dedup,
+        dedup_distance=args.dedup_distance,
+        move_corrupt=args.move_corrupt
     )
 
 
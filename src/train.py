@@ -3,8 +3,11 @@ Training script for Cats vs Dogs classification model with MLflow experiment tra
 """
 
 import os
+import time
 import argparse
 import json
+import shutil
+import tempfile
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
@@ -14,8 +17,113 @@ from sklearn.metrics import confusion_matrix, classification_report
 import mlflow
 import mlflow.tensorflow
 
-from model import build_baseline_cnn
-from data_preprocessing import create_data_generators
+from model import (
+    MODEL_ARCHITECTURES, BACKBONES, build_model, split_transfer_model, unfreeze_backbone,
+    make_inference_fn
+)
+from data_preprocessing import (
+    create_data_generators, create_tf_datasets, create_tfrecord_datasets, create_manifest_datasets,
+    list_image_files, load_manifest_split, build_feature_cache, hash_file
+)
+from export_model import TFLITE_QUANTIZATIONS, sample_images, export_tflite_models
+from benchmark import describe_model
+from optimize_model import optimize_model
+from checkpointing import TrainingCheckpoint, read_checkpoint_state, clear_checkpoints
+from distributed import (
+    STRATEGIES, configure_threads, create_strategy, scale_for_replicas, shard_by_data,
+    describe_topology, is_chief
+)
+
+
+class ThroughputCallback(tf.keras.callbacks.Callback):
+    """Measure training step time and images/sec per epoch and log them to MLflow."""
+    
+    def __init__(self, batch_size):
+        """
+        Initialize callback.
+        
+        Args:
+            batch_size: Images per training step
+        """
+        super().__init__()
+        self.batch_size = batch_size
+        self.epochs = []
+        self._step_times = []
+        self._step_start = None
+    
+    def on_epoch_begin(self, epoch, logs=None):
+        self._step_times = []
+    
+    def on_train_batch_begin(self, batch, logs=None):
+        self._step_start = time.perf_counter()
+    
+    def on_train_batch_end(self, batch, logs=None):
+        self._step_times.append(time.perf_counter() - self._step_start)
+    
+    def on_epoch_end(self, epoch, logs=None):
+        # The first step of an epoch includes iterator start-up (and tracing/XLA
+        # compilation in epoch 0), so it is left out when there are others
+        step_times = self._step_times[1:] or self._step_times
+        if not step_times:
+            return
+        
+        step_time = float(np.mean(step_times))
+        stats = {
+            'step_time_ms': step_time * 1000,
+            'images_per_sec': self.batch_size / step_time
+        }
+        self.epochs.append(stats)
+        for name, value in stats.items():
+            mlflow.log_metric(name, value, step=epoch)
+        print(f"\nEpoch {epoch + 1}: {stats['step_time_ms']:.1f} ms/step, "
+              f"{stats['images_per_sec']:.1f} images/sec")
+    
+    def summary(self):
+        """
+        Average throughput over all epochs after the first (warm-up) epoch.
+        
+        Returns:
+            Dictionary of mean step time and images/sec, or empty if no epoch ran
+        """
+        epochs = self.epochs[1:] or self.epochs
+        if not epochs:
+            return {}
+        return {
+            f"mean_{name}": float(np.mean([stats[name] for stats in epochs]))
+            for name in ('step_time_ms', 'images_per_sec')
+        }
+
+
+class EpochMetricsCallback(tf.keras.callbacks.Callback):
+    """Log loss and accuracy to MLflow as each epoch ends, so interrupted runs keep them."""
+    
+    METRICS = {
+        'loss': 'train_loss',
+        'accuracy': 'train_accuracy',
+        'val_loss': 'val_loss',
+        'val_accuracy': 'val_accuracy'
+    }
+    
+    def on_epoch_end(self, epoch, logs=None):
+        for key, name in self.METRICS.items():
+            if key in (logs or {}):
+                mlflow.log_metric(name, float(logs[key]), step=epoch)
+
+
+def set_precision_policy(mixed_precision):
+    """
+    Set the global Keras dtype policy.
+    
+    Args:
+        mixed_precision: 'none' (float32), 'float16' or 'bfloat16'. bfloat16 is
+            the useful choice on CPUs with AVX512-BF16/AMX; float16 targets GPUs
+    
+    Returns:
+        Name of the policy now in effect
+    """
+    policy = 'float32' if mixed_precision == 'none' else f"mixed_{mixed_precision}"
+    tf.keras.mixed_precision.set_global_policy(policy)
+    return policy
 
 
 def plot_training_history(history, save_path='training_history.png'):
@@ -76,27 +184,196 @@ def plot_confusion_matrix(y_true, y_pred, save_path='confusion_matrix.png'):
     print(f"Confusion matrix saved to {save_path}")
 
 
-def evaluate_model(model, test_generator):
+def create_training_data(train_dir, val_dir, config, resume_offset=None):
+    """
+    Create training and validation inputs with the configured data backend.
+    
+    Args:
+        train_dir: Training data directory
+        val_dir: Validation data directory
+        config: Dictionary of training configuration
+        resume_offset: For tf.data backends, make training data the rest of
+            the epoch after this many examples (see shuffle_for_training)
+    
+    Returns:
+        Tuple of (train_data, val_data, val_labels, train_samples, val_samples)
+    """
+    target_size = (config['image_size'], config['image_size'])
+    # Models with in-graph scaling (including every transfer model) take raw pixels
+    rescale = not (config['include_preprocessing'] or config['model_architecture'] == 'transfer')
+    
+    if config['manifest']:
+        return create_manifest_datasets(
+            config['manifest'],
+            batch_size=config['batch_size'],
+            target_size=target_size,
+            rescale=rescale,
+            seed=config['seed'],
+            cache_dir=config['cache_dir'],
+            fraction=config['sample_fraction'],
+            resume_offset=resume_offset
+        )
+    
+    if config['data_backend'] == 'tfrecord':
+        return create_tfrecord_datasets(
+            train_dir,
+            val_dir,
+            batch_size=config['batch_size'],
+            target_size=target_size,
+            rescale=rescale,
+            seed=config['seed'],
+            resume_offset=resume_offset
+        )
+    
+    if config['data_backend'] == 'tfdata':
+        return create_tf_datasets(
+            train_dir,
+            val_dir,
+            batch_size=config['batch_size'],
+            target_size=target_size,
+            rescale=rescale,
+            seed=config['seed'],
+            cache_dir=config['cache_dir'],
+            resume_offset=resume_offset
+        )
+    
+    train_generator, val_generator = create_data_generators(
+        train_dir,
+        val_dir,
+        batch_size=config['batch_size'],
+        target_size=target_size,
+        rescale=rescale
+    )
+    return (train_generator, val_generator, val_generator.classes,
+            train_generator.samples, val_generator.samples)
+
+
+def list_split_files(train_dir, val_dir, config):
+    """
+    List the training and validation image files create_training_data reads.
+    
+    Args:
+        train_dir: Training data directory
+        val_dir: Validation data directory
+        config: Dictionary of training configuration
+    
+    Returns:
+        Tuple of (train_paths, train_labels, val_paths, val_labels)
+    """
+    if config['manifest']:
+        sample_seed = 42 if config['seed'] is None else config['seed']
+        train_paths, train_labels = load_manifest_split(
+            config['manifest'], 'train', config['sample_fraction'], sample_seed
+        )
+        val_paths, val_labels = load_manifest_split(
+            config['manifest'], 'validation', config['sample_fraction'], sample_seed
+        )
+        return train_paths, train_labels, val_paths, val_labels
+    
+    train_paths, train_labels, _ = list_image_files(train_dir)
+    val_paths, val_labels, _ = list_image_files(val_dir)
+    return train_paths, train_labels, val_paths, val_labels
+
+
+def fit_transfer_model(model, train_data, val_data, train_dir, val_dir, config, callbacks):
+    """
+    Train a transfer model: the head on cached backbone features, then optional fine-tuning.
+    
+    Backbone embeddings of every training and validation image are computed
+    once and cached on disk (see build_feature_cache), so head epochs take
+    seconds and later runs with the same images and backbone skip
+    extraction. Cached features are not augmented; fine-tuning trains the
+    whole model on the augmented image pipeline.
+    
+    Args:
+        model: Model from build_transfer_model
+        train_data: Training image pipeline (used for fine-tuning)
+        val_data: Validation image pipeline (used for fine-tuning)
+        train_dir: Training data directory
+        val_dir: Validation data directory
+        config: Dictionary of training configuration
+        callbacks: Keras callbacks for both phases
+    
+    Returns:
+        Keras History covering the head and fine-tuning epochs
+    """
+    extractor, head = split_transfer_model(model, config['learning_rate'])
+    weights_id = hash_file(config['backbone_weights']) if config['backbone_weights'] else 'random'
+    policy = tf.keras.mixed_precision.global_policy().name
+    extractor_id = f"{config['backbone']}:{weights_id}:{config['include_preprocessing']}:{policy}"
+    extract_fn = make_inference_fn(extractor, input_dtype=tf.uint8)
+    
+    # Phase 1: embed every image once, then train the head over the embeddings
+    start = time.time()
+    train_paths, train_labels, val_paths, val_labels = list_split_files(train_dir, val_dir, config)
+    target_size = (config['image_size'], config['image_size'])
+    train_features, train_labels = build_feature_cache(
+        train_paths, train_labels, config['feature_cache_dir'], extract_fn, extractor_id, target_size
+    )
+    val_features, val_labels = build_feature_cache(
+        val_paths, val_labels, config['feature_cache_dir'], extract_fn, extractor_id, target_size
+    )
+    mlflow.log_metric('feature_extraction_seconds', time.time() - start)
+    
+    train_keep, val_keep = train_labels >= 0, val_labels >= 0
+    print(f"\nTraining head on cached {train_features.shape[1]}-d {config['backbone']} features...")
+    history = head.fit(
+        np.asarray(train_features[train_keep]),
+        train_labels[train_keep].astype(np.float32),
+        batch_size=config['batch_size'],
+        epochs=config['epochs'],
+        validation_data=(np.asarray(val_features[val_keep]), val_labels[val_keep].astype(np.float32)),
+        shuffle=True,
+        callbacks=callbacks,
+        verbose=1
+    )
+    
+    # Phase 2: unfreeze the top of the backbone and train end to end at a low learning rate
+    if config['fine_tune_epochs']:
+        print(f"\nFine-tuning the top {config['fine_tune_layers']} backbone layers...")
+        unfreeze_backbone(
+            model, config['fine_tune_layers'], config['fine_tune_learning_rate'], config['jit_compile']
+        )
+        head_epochs = len(history.epoch)
+        fine_tune = model.fit(
+            train_data,
+            epochs=head_epochs + config['fine_tune_epochs'],
+            initial_epoch=head_epochs,
+            validation_data=val_data,
+            callbacks=callbacks,
+            verbose=1
+        )
+        for metric_name, values in fine_tune.history.items():
+            history.history.setdefault(metric_name, []).extend(values)
+        history.epoch.extend(fine_tune.epoch)
+    
+    return history
+
+
+def evaluate_model(model, test_data, y_true=None, confusion_matrix_path='confusion_matrix.png'):
     """
     Evaluate model on test set and generate metrics.
     
     Args:
         model: Trained Keras model
-        test_generator: Test data generator
+        test_data: Test data generator or unshuffled tf.data.Dataset
+        y_true: True labels in dataset order (defaults to test_data.classes)
+        confusion_matrix_path: Path to save the confusion matrix plot
     
     Returns:
         Dictionary of evaluation metrics
     """
     # Get predictions
-    predictions = model.predict(test_generator)
+    predictions = model.predict(test_data)
     y_pred = (predictions > 0.5).astype(int).flatten()
-    y_true = test_generator.classes
+    if y_true is None:
+        y_true = test_data.classes
     
     # Calculate metrics
-    test_loss, test_accuracy, test_precision, test_recall = model.evaluate(test_generator)
+    test_loss, test_accuracy, test_precision, test_recall = model.evaluate(test_data)
     
     # Generate confusion matrix
-    plot_confusion_matrix(y_true, y_pred)
+    plot_confusion_matrix(y_true, y_pred, confusion_matrix_path)
     
     # Generate classification report
     report = classification_report(y_true, y_pred, target_names=['Cat', 'Dog'])
@@ -126,36 +403,107 @@ def train_model(train_dir, val_dir, config):
     print("Starting Training Run")
     print("=" * 50)
     
+    # Threads and the strategy must be set up before any other TensorFlow op
+    configure_threads(config['intra_op_threads'], config['inter_op_threads'])
+    strategy = create_strategy(config['strategy'])
+    topology = describe_topology(strategy)
+    global_batch_size, learning_rate = scale_for_replicas(
+        config['batch_size'], config['learning_rate'],
+        strategy.num_replicas_in_sync, config['lr_scaling']
+    )
+    print(f"Topology: {topology}")
+    print(f"Global batch size: {global_batch_size}, learning rate: {learning_rate}")
+    
+    # Only the chief writes the shared model and MLflow run; other workers
+    # still run every step (collectives need them) but write to a scratch dir
+    chief = is_chief()
+    output_dir = '.' if chief else tempfile.mkdtemp(prefix='train_worker_')
+    if not chief:
+        mlflow.set_tracking_uri(f"file:{os.path.join(output_dir, 'mlruns')}")
+    
+    # Resume from the latest checkpoint, or clear stale ones only when asked
+    # to; transfer runs train in two short phases and are not checkpointed
+    transfer = config['model_architecture'] == 'transfer'
+    checkpoint_dir = '' if transfer else config['checkpoint_dir']
+    resume_state = read_checkpoint_state(checkpoint_dir) if config['resume'] else None
+    if config['resume'] and resume_state is None:
+        print(f"No checkpoint in {checkpoint_dir}, starting a new run")
+    if (not config['resume'] and config['overwrite_checkpoints'] and chief
+            and clear_checkpoints(checkpoint_dir)):
+        print(f"Removed checkpoints of a previous run from {checkpoint_dir}")
+    
+    # Checkpointed runs need a fixed shuffle seed, and a resumed run reuses
+    # it, so it can replay the order of the interrupted epoch (augmentation
+    # draws stay independent per parameter and per batch, see random_augment)
+    run_state = resume_state['run_state'] if resume_state else {}
+    config = dict(config, seed=run_state.get('seed', config['seed']))
+    if config['seed'] is None and checkpoint_dir:
+        config['seed'] = int(np.random.default_rng().integers(2 ** 31))
+    initial_epoch = resume_state['epoch'] if resume_state else 0
+    if initial_epoch >= config['epochs']:
+        print(f"Checkpoint already completed {initial_epoch} epochs, nothing to resume")
+        return
+    
     # Set MLflow experiment
     mlflow.set_experiment("cats_vs_dogs_classification")
     
-    with mlflow.start_run():
-        # Log parameters
-        mlflow.log_params(config)
+    run_id = run_state.get('mlflow_run_id') if chief else None
+    with mlflow.start_run(run_id=run_id) as run:
+        # Log parameters (a resumed run continues the same run and metric series)
+        if run_id is None:
+            mlflow.log_params(config)
+            mlflow.log_params({
+                'global_batch_size': global_batch_size,
+                'scaled_learning_rate': learning_rate,
+                **topology
+            })
+        else:
+            mlflow.set_tag('resumed_from', os.path.basename(resume_state['path']))
+            print(f"Resuming MLflow run {run_id} at epoch {initial_epoch + 1}")
         
-        # Create data generators
-        print("\nPreparing data generators...")
-        train_generator, val_generator = create_data_generators(
-            train_dir, 
-            val_dir,
-            batch_size=config['batch_size'],
-            target_size=(config['image_size'], config['image_size'])
+        # Create input pipelines. Epoch k reads iteration k - start of training
+        # data shuffled with seed + start, where start is the first epoch of
+        # its model.fit call, so a resume can replay any interrupted epoch
+        def start_training_data(start_epoch, resume_offset=None):
+            seed = None if config['seed'] is None else config['seed'] + start_epoch
+            data = create_training_data(
+                train_dir, val_dir, dict(config, batch_size=global_batch_size, seed=seed),
+                resume_offset
+            )
+            if strategy.num_replicas_in_sync > 1:
+                return (shard_by_data(data[0]), shard_by_data(data[1])) + data[2:]
+            return data
+        
+        print(f"\nPreparing data ({config['data_backend']} backend)...")
+        train_data, val_data, val_labels, train_samples, val_samples = start_training_data(
+            initial_epoch
         )
         
-        print(f"Training samples: {train_generator.samples}")
-        print(f"Validation samples: {val_generator.samples}")
+        print(f"Training samples: {train_samples}")
+        print(f"Validation samples: {val_samples}")
         
         # Build model
-        print("\nBuilding model...")
-        model = build_baseline_cnn(
-            input_shape=(config['image_size'], config['image_size'], 3),
-            learning_rate=config['learning_rate']
-        )
+        policy = set_precision_policy(config['mixed_precision'])
+        print(f"\nBuilding {config['model_architecture']} model "
+              f"(policy={policy}, jit_compile={config['jit_compile']})...")
+        with strategy.scope():
+            model = build_model(
+                config['model_architecture'],
+                input_shape=(config['image_size'], config['image_size'], 3),
+                learning_rate=learning_rate,
+                include_preprocessing=config['include_preprocessing'],
+                jit_compile=config['jit_compile'],
+                backbone=config['backbone'],
+                backbone_weights=config['backbone_weights']
+            )
         
         print(model.summary())
         
         # Callbacks
+        throughput = ThroughputCallback(global_batch_size)
         callbacks = [
+            throughput,
+            EpochMetricsCallback(),
             tf.keras.callbacks.EarlyStopping(
                 monitor='val_loss',
                 patience=5,
@@ -170,47 +518,183 @@ def train_model(train_dir, val_dir, config):
             )
         ]
         
+        # Checkpoint model, optimizer, counters and callback state
+        if checkpoint_dir:
+            checkpoint = TrainingCheckpoint(
+                model,
+                checkpoint_dir,
+                save_every_n_steps=config['checkpoint_every_n_steps'],
+                run_state={
+                    'mlflow_run_id': run.info.run_id,
+                    'seed': config['seed'],
+                    'shuffle_start_epoch': initial_epoch
+                },
+                stateful_callbacks=callbacks,
+                write_dir=checkpoint_dir if chief else os.path.join(output_dir, 'checkpoints')
+            )
+            if resume_state:
+                checkpoint.restore()
+            callbacks.append(checkpoint)
+        
         # Train model
         print("\nStarting training...")
-        history = model.fit(
-            train_generator,
-            epochs=config['epochs'],
-            validation_data=val_generator,
-            callbacks=callbacks,
-            verbose=1
-        )
+        if transfer:
+            history = fit_transfer_model(
+                model, train_data, val_data, train_dir, val_dir, config, callbacks
+            )
+        else:
+            # A mid-epoch resume first finishes the interrupted epoch: its data
+            # replays that epoch's shuffle order and skips the examples already
+            # trained on, so every epoch trains on each example once
+            history = None
+            steps_done = epoch_steps = 0
+            if resume_state:
+                epoch_steps = int(np.ceil(train_samples / global_batch_size))
+                steps_done = resume_state['step'] - initial_epoch * epoch_steps
+            if 0 < steps_done < epoch_steps:
+                print(f"Finishing epoch {initial_epoch + 1}: {epoch_steps - steps_done} of "
+                      f"{epoch_steps} steps left")
+                shuffle_start = run_state.get('shuffle_start_epoch', 0)
+                resume_offset = ((initial_epoch - shuffle_start) * train_samples
+                                 + steps_done * global_batch_size)
+                epoch_data = start_training_data(shuffle_start, resume_offset)[0]
+                history = model.fit(
+                    epoch_data,
+                    epochs=initial_epoch + 1,
+                    initial_epoch=initial_epoch,
+                    validation_data=val_data,
+                    callbacks=callbacks,
+                    verbose=1
+                )
+                initial_epoch += 1
+                checkpoint.carry_over_callback_state()
+                train_data = start_training_data(initial_epoch)[0]
+            
+            if initial_epoch < config['epochs'] and not model.stop_training:
+                if checkpoint_dir:
+                    checkpoint.run_state['shuffle_start_epoch'] = initial_epoch
+                remaining = model.fit(
+                    train_data,
+                    epochs=config['epochs'],
+                    initial_epoch=initial_epoch,
+                    validation_data=val_data,
+                    callbacks=callbacks,
+                    verbose=1
+                )
+                if history is None:
+                    history = remaining
+                else:
+                    for metric_name, values in remaining.history.items():
+                        history.history.setdefault(metric_name, []).extend(values)
+                    history.epoch.extend(remaining.epoch)
         
         # Log metrics
-        for epoch in range(len(history.history['loss'])):
-            mlflow.log_metric('train_loss', history.history['loss'][epoch], step=epoch)
-            mlflow.log_metric('train_accuracy', history.history['accuracy'][epoch], step=epoch)
-            mlflow.log_metric('val_loss', history.history['val_loss'][epoch], step=epoch)
-            mlflow.log_metric('val_accuracy', history.history['val_accuracy'][epoch], step=epoch)
+        for metric_name, metric_value in throughput.summary().items():
+            mlflow.log_metric(metric_name, metric_value)
         
         # Plot and log training history
-        plot_training_history(history)
-        mlflow.log_artifact('training_history.png')
+        history_path = os.path.join(output_dir, 'training_history.png')
+        plot_training_history(history, history_path)
+        mlflow.log_artifact(history_path)
         
-        # Save model
-        model_dir = 'models'
+        # Save model as a plain float32 single-device model, so serving never
+        # inherits the training policy or distribution strategy
+        serving_model = model
+        if policy != 'float32' or config['strategy'] != 'none':
+            set_precision_policy('none')
+            serving_model = build_model(
+                config['model_architecture'],
+                input_shape=(config['image_size'], config['image_size'], 3),
+                learning_rate=learning_rate,
+                include_preprocessing=config['include_preprocessing'],
+                backbone=config['backbone']
+            )
+            # Weight order follows trainability, so match the fine-tuned layers
+            if transfer and config['fine_tune_epochs']:
+                unfreeze_backbone(serving_model, config['fine_tune_layers'])
+            serving_model.set_weights(model.get_weights())
+        
+        model_dir = os.path.join(output_dir, 'models')
         os.makedirs(model_dir, exist_ok=True)
         model_path = os.path.join(model_dir, 'cats_dogs_model.h5')
-        model.save(model_path)
+        serving_model.save(model_path)
         print(f"\nModel saved to {model_path}")
         
         # Log model
-        mlflow.tensorflow.log_model(model, "model")
+        mlflow.tensorflow.log_model(serving_model, "model")
+        
+        # Log size and CPU serving latency, to compare architectures across runs
+        model_metrics = describe_model(serving_model, model_path, batch_sizes=(1, 32), iterations=10)
+        print(f"Model size and latency: {model_metrics}")
+        mlflow.log_metrics(model_metrics)
         
-        # Evaluate on validation set and generate confusion matrix
+        # Evaluate the saved model on validation set and generate confusion matrix
         print("\nEvaluating model on validation set...")
-        val_metrics = evaluate_model(model, val_generator)
+        confusion_matrix_path = os.path.join(output_dir, 'confusion_matrix.png')
+        val_metrics = evaluate_model(serving_model, val_data, val_labels, confusion_matrix_path)
         
         # Log evaluation metrics
         for metric_name, metric_value in val_metrics.items():
             mlflow.log_metric(metric_name, metric_value)
         
         # Log confusion matrix (now it exists)
-        mlflow.log_artifact('confusion_matrix.png')
+        mlflow.log_artifact(confusion_matrix_path)
+        
+        # Export quantized TFLite models and check them against the float model
+        if config['export_tflite']:
+            print("\nExporting quantized TFLite models...")
+            if config['manifest']:
+                sample_paths, sample_labels = load_manifest_split(config['manifest'], 'validation')
+            else:
+                sample_paths, sample_labels, _ = list_image_files(val_dir)
+            sample_paths, sample_labels = sample_images(
+                sample_paths, sample_labels, config['tflite_samples'], seed=config['seed'] or 42
+            )
+            # Calibrate on training images, so the report scores only unseen ones
+            calibration_paths, _ = sample_images(
+                *list_split_files(train_dir, val_dir, config)[:2], config['tflite_samples'],
+                seed=config['seed'] or 42
+            )
+            report = export_tflite_models(
+                model_path, model_dir, sample_paths, sample_labels,
+                calibration_paths=calibration_paths
+            )
+            mlflow.log_metric('tflite_float_accuracy', report['float']['accuracy'])
+            for quantization in TFLITE_QUANTIZATIONS:
+                for key in ('size_mb', 'accuracy', 'accuracy_drop', 'agreement', 'ms_per_image'):
+                    mlflow.log_metric(f"tflite_{quantization}_{key}", report[quantization][key])
+                mlflow.log_artifact(report[quantization]['path'], 'tflite')
+            mlflow.log_artifact(os.path.join(model_dir, 'quantization_report.json'), 'tflite')
+            failed = [name for name in TFLITE_QUANTIZATIONS if not report[name]['passed']]
+            if failed:
+                print(f"WARNING: accuracy regression above tolerance for {', '.join(failed)}")
+        
+        # Prune, fine-tune and cluster a copy of the model and log it next to the dense one
+        if config['optimize']:
+            print("\nOptimizing model (channel pruning, magnitude pruning, clustering)...")
+            optimized_model, report = optimize_model(
+                serving_model,
+                model_path,
+                os.path.join(model_dir, 'cats_dogs_model_optimized.h5'),
+                train_data,
+                val_data,
+                steps_per_epoch=int(np.ceil(train_samples / global_batch_size)),
+                channel_fraction=config['prune_channels'],
+                sparsity=config['prune_sparsity'],
+                epochs=config['prune_epochs'],
+                learning_rate=config['prune_learning_rate'],
+                num_clusters=config['num_clusters']
+            )
+            mlflow.tensorflow.log_model(optimized_model, "optimized_model")
+            for key, value in report['optimized'].items():
+                if key != 'path':
+                    mlflow.log_metric(f"optimized_{key}", value)
+            for key, value in report['ratio'].items():
+                mlflow.log_metric(f"optimized_{key}_ratio", value)
+            mlflow.log_metric('optimized_accuracy_drop', report['accuracy_drop'])
+            mlflow.log_metric('sparsity', report['dense']['sparsity'])
+            mlflow.log_metric('gzip_size_mb', report['dense']['gzip_size_mb'])
+            mlflow.log_artifact(report['report_path'], 'optimized')
         
         # Final metrics
         final_train_accuracy = history.history['accuracy'][-1]
@@ -221,6 +705,9 @@ def train_model(train_dir, val_dir, config):
         print(f"Final Training Accuracy: {final_train_accuracy:.4f}")
         print(f"Final Validation Accuracy: {final_val_accuracy:.4f}")
         print("=" * 50)
+    
+    if not chief:
+        shutil.rmtree(output_dir, ignore_errors=True)
 
 
 def main():
@@ -235,13 +722,121 @@ def main():
     parser.add_argument('--epochs', type=int, default=20,
                         help='Number of training epochs')
     parser.add_argument('--batch_size', type=int, default=32,
-                        help='Batch size for training')
+                        help='Batch size per replica (the global batch grows with --strategy)')
     parser.add_argument('--learning_rate', type=float, default=0.001,
                         help='Learning rate')
     parser.add_argument('--image_size', type=int, default=224,
                         help='Image size (height/width)')
+    parser.add_argument('--model_architecture', type=str, default='baseline_cnn',
+                        choices=MODEL_ARCHITECTURES,
+                        help='baseline_cnn (Flatten + Dense head), gap_cnn (global average '
+                             'pooling head), separable_cnn (depthwise-separable convolutions) '
+                             'or transfer (pretrained --backbone with a trained head)')
+    parser.add_argument('--backbone', type=str, default='mobilenet_v2', choices=BACKBONES,
+                        help='Backbone of the transfer architecture')
+    parser.add_argument('--backbone_weights', type=str, default=None,
+                        help='Local no_top ImageNet weights file for --backbone (required '
+                             'by the transfer architecture)')
+    parser.add_argument('--feature_cache_dir', type=str, default='feature_cache',
+                        help='Directory caching backbone features between transfer runs')
+    parser.add_argument('--fine_tune_epochs', type=int, default=0,
+                        help='Epochs fine-tuning the top backbone layers after the head (transfer)')
+    parser.add_argument('--fine_tune_layers', type=int, default=30,
+                        help='Backbone layers, counted from the top, trained while fine-tuning')
+    parser.add_argument('--fine_tune_learning_rate', type=float, default=1e-5,
+                        help='Learning rate while fine-tuning')
+    parser.add_argument('--optimize', action='store_true',
+                        help='Also save a pruned and clustered model, fine-tuned from the trained one')
+    parser.add_argument('--prune_channels', type=float, default=0.25,
+                        help='Fraction of filters and dense units removed from each layer (--optimize)')
+    parser.add_argument('--prune_sparsity', type=float, default=0.5,
+                        help='Target fraction of zero weights in each kernel (--optimize)')
+    parser.add_argument('--prune_epochs', type=int, default=2,
+                        help='Fine-tuning epochs while pruning (--optimize)')
+    parser.add_argument('--prune_learning_rate', type=float, default=1e-4,
+                        help='Fine-tuning learning rate while pruning (--optimize)')
+    parser.add_argument('--num_clusters', type=int, default=16,
+                        help='Shared weight values per kernel after pruning (0 = no clustering)')
+    parser.add_argument('--include_preprocessing', action='store_true',
+                        help='Resize and rescale inside the model (raw pixel input)')
+    parser.add_argument('--data_backend', type=str, default='generator',
+                        choices=['generator', 'tfdata', 'tfrecord'],
+                        help='Input pipeline: Keras ImageDataGenerator, parallel tf.data, '
+                             'or TFRecord shards from prepare_dataset.py --format tfrecord')
+    parser.add_argument('--cache_dir', type=str, default=None,
+                        help='Decode images once into an on-disk cache reused across '
+                             'epochs and runs (tfdata backend only)')
+    parser.add_argument('--mixed_precision', type=str, default='none',
+                        choices=['none', 'float16', 'bfloat16'],
+                        help='Train with a Keras mixed precision policy (float32 variables and output)')
+    parser.add_argument('--jit_compile', action='store_true',
+                        help='Compile the training step with XLA')
+    parser.add_argument('--checkpoint_dir', type=str, default='',
+                        help='Directory for resumable training checkpoints (tf.data backends; '
+                             'empty disables checkpointing)')
+    parser.add_argument('--checkpoint_every_n_steps', type=int, default=500,
+                        help='Also checkpoint every N training steps (0 = only at epoch ends)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue the run saved in --checkpoint_dir, including its MLflow run')
+    parser.add_argument('--overwrite_checkpoints', action='store_true',
+                        help='Delete the checkpoints of a previous run in --checkpoint_dir and start over')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='Shuffle seed (random if unset; a resumed run reuses its seed)')
+    parser.add_argument('--strategy', type=str, default='none', choices=STRATEGIES,
+                        help='tf.distribute strategy; multi_worker reads the cluster from TF_CONFIG')
+    parser.add_argument('--lr_scaling', type=str, default='linear', choices=['linear', 'none'],
+                        help='Scale the learning rate with the number of replicas')
+    parser.add_argument('--intra_op_threads', type=int, default=0,
+                        help='Threads per op, e.g. cores per worker (0 = TensorFlow default)')
+    parser.add_argument('--inter_op_threads', type=int, default=0,
+                        help='Ops run in parallel (0 = TensorFlow default)')
+    parser.add_argument('--manifest', type=str, default=None,
+                        help='Read train/validation splits from a prepare_dataset.py manifest '
+                             'instead of --train_dir/--val_dir (tfdata backend only)')
+    parser.add_argument('--sample_fraction', type=float, default=1.0,
+                        help='Train and validate on this stratified fraction of the manifest')
+    parser.add_argument('--export_tflite', action='store_true',
+                        help='Also export dynamic-range and int8 TFLite models with an '
+                             'accuracy report on validation images')
+    parser.add_argument('--tflite_samples', type=int, default=500,
+                        help='Images sampled for the TFLite report (validation) and for int8 '
+                             'calibration (training)')
     
     args = parser.parse_args()
+    if args.cache_dir and args.data_backend != 'tfdata':
+        parser.error('--cache_dir requires --data_backend tfdata')
+    if args.manifest and args.data_backend != 'tfdata':
+        parser.error('--manifest requires --data_backend tfdata')
+    if args.sample_fraction < 1.0 and not args.manifest:
+        parser.error('--sample_fraction requires --manifest')
+    if args.strategy != 'none' and args.data_backend == 'generator':
+        parser.error('--strategy requires a tf.data backend (tfdata or tfrecord)')
+    if (args.checkpoint_dir or args.resume) and args.data_backend == 'generator':
+        parser.error('--checkpoint_dir and --resume require a tf.data backend (tfdata or '
+                     'tfrecord), whose data position a resume can restore')
+    if args.resume and not args.checkpoint_dir:
+        parser.error('--resume requires --checkpoint_dir')
+    if (args.checkpoint_dir and not (args.resume or args.overwrite_checkpoints)
+            and read_checkpoint_state(args.checkpoint_dir) is not None):
+        parser.error(f'{args.checkpoint_dir} holds checkpoints of a previous run; pass --resume '
+                     'to continue it or --overwrite_checkpoints to start over')
+    if args.export_tflite and args.data_backend == 'tfrecord':
+        parser.error('--export_tflite calibrates on image files; use the generator or tfdata backend')
+    if args.model_architecture == 'transfer':
+        if not args.backbone_weights or not os.path.isfile(args.backbone_weights):
+            parser.error('--model_architecture transfer requires --backbone_weights, the '
+                         "backbone's no_top weights file; a frozen random backbone learns nothing")
+        if args.data_backend == 'tfrecord':
+            parser.error('--model_architecture transfer caches features of image files; '
+                         'use the generator or tfdata backend')
+        if args.strategy != 'none' or args.checkpoint_dir or args.resume:
+            parser.error('--model_architecture transfer does not support --strategy, '
+                         '--checkpoint_dir or --resume')
+    if args.optimize:
+        if args.model_architecture == 'transfer':
+            parser.error('--optimize prunes the baseline_cnn, gap_cnn and separable_cnn architectures')
+        if args.strategy != 'none':
+            parser.error('--optimize fine-tunes on a single device; it does not support --strategy')
     
     # Training configuration
     config = {
@@ -249,9 +844,39 @@ def main():
         'batch_size': args.batch_size,
         'learning_rate': args.learning_rate,
         'image_size': args.image_size,
+        'include_preprocessing': args.include_preprocessing,
+        'data_backend': args.data_backend,
+        'cache_dir': args.cache_dir,
+        'manifest': args.manifest,
+        'sample_fraction': args.sample_fraction,
+        'mixed_precision': args.mixed_precision,
+        'jit_compile': args.jit_compile,
+        'checkpoint_dir': args.checkpoint_dir,
+        'checkpoint_every_n_steps': args.checkpoint_every_n_steps,
+        'resume': args.resume,
+        'overwrite_checkpoints': args.overwrite_checkpoints,
+        'seed': args.seed,
+        'strategy': args.strategy,
+        'lr_scaling': args.lr_scaling,
+        'intra_op_threads': args.intra_op_threads,
+        'inter_op_threads': args.inter_op_threads,
+        'export_tflite': args.export_tflite,
+        'tflite_samples': args.tflite_samples,
         'optimizer': 'Adam',
         'loss_function': 'binary_crossentropy',
-        'model_architecture': 'baseline_cnn'
+        'model_architecture': args.model_architecture,
+        'backbone': args.backbone,
+        'backbone_weights': args.backbone_weights,
+        'feature_cache_dir': args.feature_cache_dir,
+        'fine_tune_epochs': args.fine_tune_epochs,
+        'fine_tune_layers': args.fine_tune_layers,
+        'fine_tune_learning_rate': args.fine_tune_learning_rate,
+        'optimize': args.optimize,
+        'prune_channels': args.prune_channels,
+        'prune_sparsity': args.prune_sparsity,
+        'prune_epochs': args.prune_epochs,
+        'prune_learning_rate': args.prune_learning_rate,
+        'num_clusters': args.num_clusters
     }
     
     # Train model
@@ -104,6 +104,46 @@ def test_prediction_endpoint(api_url):
         return False
 
 
+def test_batch_prediction_endpoint(api_url):
+    """
+    Test the batch prediction endpoint with several images and one bad file.
+    
+    Args:
+        api_url: Base URL of the API
+    
+    Returns:
+        Boolean indicating success
+    """
+    try:
+        print("\nTesting batch prediction endpoint...")
+        
+        files = [
+            ('files', ('image_1.jpg', create_test_image(), 'image/jpeg')),
+            ('files', ('image_2.jpg', create_test_image(), 'image/jpeg')),
+            ('files', ('broken.jpg', BytesIO(b'not an image'), 'image/jpeg'))
+        ]
+        response = requests.post(f"{api_url}/predict/batch", files=files, timeout=60)
+        
+        if response.status_code != 200:
+            print(f"✗ Batch prediction failed with status code: {response.status_code}")
+            print(f"  Response: {response.text}")
+            return False
+        
+        data = response.json()
+        print(f"✓ Batch prediction returned {data.get('total')} results")
+        print(f"  Succeeded: {data.get('succeeded')}, Failed: {data.get('failed')}")
+        
+        if data.get('total') != 3 or data.get('succeeded') != 2:
+            print("✗ Expected 2 successful predictions and 1 per-item error")
+            return False
+        
+        return True
+    
+    except Exception as e:
+        print(f"✗ Batch prediction test failed with error: {e}")
+        return False
+
+
 def test_invalid_input(api_url):
     """
     Test that the API properly handles invalid input.
@@ -143,12 +183,12 @@ def main():
     print(f"API URL: {api_url}")
     print("=" * 60)
     
-    # Wait for service to be ready
+    # Wait for service to be ready (model loaded and warmed up)
     print("\nWaiting for service to be ready...")
     max_retries = 10
     for i in range(max_retries):
         try:
-            response = requests.get(f"{api_url}/health", timeout=5)
+            response = requests.get(f"{api_url}/ready", timeout=5)
             if response.status_code == 200:
                 print("Service is ready!")
                 break
@@ -166,6 +206,7 @@ def main():
     results = []
     results.append(("Health Check", test_health_endpoint(api_url)))
     results.append(("Prediction", test_prediction_endpoint(api_url)))
+    results.append(("Batch Prediction", test_batch_prediction_endpoint(api_url)))
     results.append(("Invalid Input", test_invalid_input(api_url)))
     
     # Print summary
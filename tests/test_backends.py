@@ -0,0 +1,118 @@
+"""
+Unit tests for the pluggable inference backends.
+"""
+
+import os
+import sys
+import pytest
+import numpy as np
+import tensorflow as tf
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from model import build_baseline_cnn, make_inference_fn
+from backends import BACKENDS, backend_for_path, create_backend, measure_backend
+from export_model import export_savedmodel, export_onnx, convert_to_tflite
+
+
+INPUT_SHAPE = (64, 64, 3)
+
+
+def random_images(count=5, seed=0):
+    """Create random uint8 images."""
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 256, size=(count,) + INPUT_SHAPE, dtype=np.uint8)
+
+
+@pytest.fixture(scope='module')
+def trained_model(tmp_path_factory):
+    """Save a small model expecting [0, 1] input, as older .h5 models do."""
+    tf.keras.utils.set_random_seed(0)
+    model = build_baseline_cnn(input_shape=INPUT_SHAPE)
+    model_path = str(tmp_path_factory.mktemp('models') / 'model.h5')
+    model.save(model_path)
+    return model, model_path
+
+
+@pytest.fixture(scope='module')
+def expected(trained_model):
+    """Reference probabilities from the traced Keras serving function."""
+    model, _ = trained_model
+    return make_inference_fn(model, input_dtype=tf.uint8)(random_images()).numpy()
+
+
+class TestBackendSelection:
+    """Test cases for choosing a backend."""
+
+    def test_backend_for_path(self, tmp_path):
+        """Test that the backend follows the model file type."""
+        assert backend_for_path('models/cats_dogs_model.h5') == 'keras'
+        assert backend_for_path('models/cats_dogs_model.keras') == 'keras'
+        assert backend_for_path('models/cats_dogs_model_int8.tflite') == 'tflite'
+        assert backend_for_path('models/cats_dogs_model.onnx') == 'onnx'
+        assert backend_for_path(str(tmp_path)) == 'savedmodel'
+
+    def test_unknown_backend(self, trained_model):
+        """Test that an unknown backend name is rejected."""
+        with pytest.raises(ValueError):
+            create_backend(trained_model[1], 'torch')
+
+    def test_registry(self):
+        """Test that every backend reports its registry name."""
+        assert {name: backend.name for name, backend in BACKENDS.items()} == \
+            {name: name for name in BACKENDS}
+
+
+class TestBackendParity:
+    """Test cases for numeric parity of each backend with the Keras model."""
+
+    def test_keras(self, trained_model, expected):
+        """Test that the Keras backend serves raw pixels like the traced function."""
+        backend = create_backend(trained_model[1])
+
+        assert backend.image_shape == INPUT_SHAPE
+        np.testing.assert_allclose(backend(random_images()), expected, atol=1e-6)
+
+    def test_savedmodel(self, tmp_path, trained_model, expected):
+        """Test that the exported SavedModel matches the Keras model."""
+        export_dir = export_savedmodel(trained_model[0], str(tmp_path / 'savedmodel'))
+        backend = create_backend(export_dir)
+
+        predictions = backend(random_images())
+
+        assert backend.name == 'savedmodel'
+        assert backend.image_shape == INPUT_SHAPE
+        assert predictions.shape == (5, 1)
+        np.testing.assert_allclose(predictions, expected, atol=1e-5)
+
+    def test_tflite(self, tmp_path, trained_model, expected):
+        """Test that the dynamic-range TFLite model stays close to the Keras model."""
+        model_path = tmp_path / 'model.tflite'
+        model_path.write_bytes(convert_to_tflite(trained_model[0], 'dynamic'))
+        backend = create_backend(str(model_path), num_threads=1)
+
+        np.testing.assert_allclose(backend(random_images()), expected, atol=0.05)
+
+    def test_onnx(self, tmp_path, trained_model, expected):
+        """Test that the ONNX model run by ONNX Runtime matches the Keras model."""
+        pytest.importorskip('tf2onnx')
+        pytest.importorskip('onnxruntime')
+        model_path = export_onnx(trained_model[0], str(tmp_path / 'model.onnx'))
+        backend = create_backend(model_path, num_threads=1)
+
+        assert backend.image_shape == INPUT_SHAPE
+        np.testing.assert_allclose(backend(random_images()), expected, atol=1e-5)
+
+
+class TestMeasureBackend:
+    """Test cases for the backend benchmark measurement."""
+
+    def test_measure_backend(self, trained_model):
+        """Test that load time, RSS and per-batch latency are reported."""
+        result = measure_backend(trained_model[1], batch_sizes=(1, 2), iterations=2)
+
+        assert result['backend'] == 'keras'
+        assert result['peak_rss_mb'] > 0
+        assert set(result['latency']) == {'1', '2'}
+        assert result['latency']['2']['mean_ms'] > 0
@@ -0,0 +1,182 @@
+"""
+Unit tests for the inference micro-batcher.
+"""
+
+import os
+import sys
+import asyncio
+import pytest
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from batching import MicroBatcher
+from executor import BoundedExecutor
+
+
+def make_image(value):
+    """Create a dummy preprocessed image filled with a constant value."""
+    return np.full((1, 4, 4, 3), value, dtype=np.float32)
+
+
+class RecordingPredictor:
+    """Fake model that records batch sizes and returns each image's mean."""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def __call__(self, images):
+        self.batch_sizes.append(images.shape[0])
+        return images.mean(axis=(1, 2, 3)).reshape(-1, 1)
+
+
+async def submit_all(batcher, values):
+    """Submit concurrent requests and return their results."""
+    await batcher.start()
+    try:
+        return await asyncio.gather(*[batcher.submit(make_image(v)) for v in values])
+    finally:
+        await batcher.stop()
+
+
+class TestMicroBatcher:
+    """Test cases for request batching."""
+
+    def test_concurrent_requests_share_batch(self):
+        """Test that concurrent requests are grouped into one forward pass."""
+        predictor = RecordingPredictor()
+        batcher = MicroBatcher(predictor, max_batch_size=32, max_wait_ms=50)
+
+        results = asyncio.run(submit_all(batcher, [0.1 * i for i in range(8)]))
+
+        assert predictor.batch_sizes == [8]
+        np.testing.assert_allclose(results, [0.1 * i for i in range(8)], rtol=1e-5)
+
+    def test_max_batch_size_respected(self):
+        """Test that batches never exceed the configured size."""
+        predictor = RecordingPredictor()
+        batcher = MicroBatcher(predictor, max_batch_size=4, max_wait_ms=50)
+
+        results = asyncio.run(submit_all(batcher, [float(i) for i in range(10)]))
+
+        assert max(predictor.batch_sizes) <= 4
+        assert sum(predictor.batch_sizes) == 10
+        np.testing.assert_allclose(results, [float(i) for i in range(10)])
+
+    def test_results_routed_to_correct_caller(self):
+        """Test that each caller receives the probability for its own image."""
+        batcher = MicroBatcher(RecordingPredictor(), max_batch_size=3, max_wait_ms=10)
+        values = [0.9, 0.1, 0.5, 0.7, 0.3]
+
+        results = asyncio.run(submit_all(batcher, values))
+
+        np.testing.assert_allclose(results, values, rtol=1e-5)
+
+    def test_prediction_error_propagates(self):
+        """Test that a failing forward pass fails every waiting request."""
+        def failing_predictor(images):
+            raise RuntimeError("model exploded")
+
+        batcher = MicroBatcher(failing_predictor, max_batch_size=4, max_wait_ms=10)
+
+        with pytest.raises(RuntimeError, match="model exploded"):
+            asyncio.run(submit_all(batcher, [0.1, 0.2]))
+        assert batcher.metrics['failed_batches'] == 1
+
+    def test_submit_requires_start(self):
+        """Test that submitting to a stopped batcher raises an error."""
+        batcher = MicroBatcher(RecordingPredictor())
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(batcher.submit(make_image(0.5)))
+
+
+    def test_batch_buffer_reused(self):
+        """Test that consecutive batches are assembled into the same buffer."""
+        buffers = []
+
+        def predictor(images):
+            buffers.append(images.base if images.base is not None else images)
+            return images.mean(axis=(1, 2, 3)).reshape(-1, 1)
+
+        batcher = MicroBatcher(predictor, max_batch_size=2, max_wait_ms=5)
+        results = asyncio.run(submit_all(batcher, [0.1, 0.2, 0.3, 0.4]))
+
+        np.testing.assert_allclose(results, [0.1, 0.2, 0.3, 0.4], rtol=1e-5)
+        assert len(buffers) >= 2
+        assert all(buffer is buffers[0] for buffer in buffers)
+
+
+class TestBatchingStats:
+    """Test cases for batching metrics."""
+
+    def test_stats_histogram(self):
+        """Test that batch-size histogram and item counts are tracked."""
+        batcher = MicroBatcher(RecordingPredictor(), max_batch_size=4, max_wait_ms=50)
+        asyncio.run(submit_all(batcher, [0.0] * 6))
+
+        stats = batcher.get_stats()
+
+        assert stats['items_processed'] == 6
+        assert sum(size * count for size, count in stats['batch_size_histogram'].items()) == 6
+        assert stats['average_batch_size'] > 1
+
+    def test_stats_queue_wait(self):
+        """Test that queue-wait percentiles are reported and ordered."""
+        batcher = MicroBatcher(RecordingPredictor(), max_batch_size=2, max_wait_ms=5)
+        asyncio.run(submit_all(batcher, [0.0] * 5))
+
+        wait = batcher.get_stats()['queue_wait_ms']
+
+        assert 0.0 <= wait['p50'] <= wait['p99'] <= wait['max']
+
+    def test_stats_empty(self):
+        """Test that stats are well-formed before any request."""
+        stats = MicroBatcher(RecordingPredictor()).get_stats()
+
+        assert stats['batches_run'] == 0
+        assert stats['average_batch_size'] == 0.0
+        assert stats['queue_wait_ms']['p99'] == 0.0
+
+
+class TestBatcherBackpressure:
+    """Test cases for offloaded inference and bounded queueing."""
+
+    def test_forward_pass_in_executor(self):
+        """Test that the forward pass runs on a worker thread through the bounded executor."""
+        import threading
+
+        threads = []
+
+        def predictor(images):
+            threads.append(threading.get_ident())
+            return images.mean(axis=(1, 2, 3)).reshape(-1, 1)
+
+        executor = BoundedExecutor(max_workers=1, max_pending=1)
+        try:
+            batcher = MicroBatcher(predictor, max_batch_size=8, max_wait_ms=10, executor=executor)
+            results = asyncio.run(submit_all(batcher, [0.2, 0.4]))
+        finally:
+            executor.shutdown()
+
+        np.testing.assert_allclose(results, [0.2, 0.4], rtol=1e-5)
+        assert threads and threading.get_ident() not in threads
+        assert executor.completed == len(threads)
+
+    def test_queue_full_rejects(self):
+        """Test that submissions beyond max_queue_size are rejected."""
+        batcher = MicroBatcher(RecordingPredictor(), max_batch_size=1, max_queue_size=1)
+
+        async def scenario():
+            await batcher.start()
+            try:
+                accepted = asyncio.ensure_future(batcher.submit(make_image(0.1)))
+                rejected = asyncio.ensure_future(batcher.submit(make_image(0.2)))
+                with pytest.raises(asyncio.QueueFull):
+                    await rejected
+                return await accepted
+            finally:
+                await batcher.stop()
+
+        assert asyncio.run(scenario()) == pytest.approx(0.1)
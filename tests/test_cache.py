@@ -0,0 +1,87 @@
+"""
+Unit tests for the prediction cache.
+"""
+
+import os
+import sys
+import time
+import pytest
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from cache import PredictionCache
+
+
+class TestPredictionCache:
+    """Test cases for cache lookups, eviction and expiry."""
+
+    def test_hit_after_put(self):
+        """Test that a stored prediction is returned for identical bytes."""
+        cache = PredictionCache(max_entries=10)
+        key = cache.make_key(b'image-bytes')
+        cache.put(key, ('dog', 0.91))
+
+        assert cache.get(cache.make_key(b'image-bytes')) == ('dog', 0.91)
+        assert cache.get_stats()['hits'] == 1
+
+    def test_miss_for_different_bytes(self):
+        """Test that different uploads do not collide."""
+        cache = PredictionCache(max_entries=10)
+        cache.put(cache.make_key(b'image-a'), ('dog', 0.9))
+
+        assert cache.get(cache.make_key(b'image-b')) is None
+        assert cache.get_stats()['misses'] == 1
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted when full."""
+        cache = PredictionCache(max_entries=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+        assert cache.get('c') == 3
+        assert len(cache) == 2
+        assert cache.get_stats()['evictions'] == 1
+
+    def test_ttl_expiry(self):
+        """Test that entries older than the TTL are dropped."""
+        cache = PredictionCache(max_entries=10, ttl_seconds=0.05)
+        cache.put('a', 1)
+        time.sleep(0.1)
+
+        assert cache.get('a') is None
+        assert cache.get_stats()['expirations'] == 1
+
+    def test_namespace_invalidation(self):
+        """Test that switching model namespace drops and no longer matches old keys."""
+        cache = PredictionCache(max_entries=10)
+        cache.invalidate(namespace='model-v1')
+        old_key = cache.make_key(b'image')
+        cache.put(old_key, ('cat', 0.8))
+
+        cache.invalidate(namespace='model-v2')
+
+        assert len(cache) == 0
+        assert cache.make_key(b'image') != old_key
+        assert cache.get(cache.make_key(b'image')) is None
+
+    def test_disabled_cache(self):
+        """Test that a zero-size cache stores nothing."""
+        cache = PredictionCache(max_entries=0)
+        cache.put('a', 1)
+
+        assert cache.get('a') is None
+        assert cache.get_stats()['enabled'] is False
+
+    def test_hit_rate(self):
+        """Test hit-rate calculation."""
+        cache = PredictionCache(max_entries=10)
+        cache.put('a', 1)
+        cache.get('a')
+        cache.get('missing')
+
+        assert cache.get_stats()['hit_rate'] == pytest.approx(0.5)
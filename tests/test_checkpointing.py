@@ -0,0 +1,158 @@
+"""
+Unit tests for resumable training checkpoints.
+"""
+
+import os
+import sys
+import pytest
+import numpy as np
+import tensorflow as tf
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from model import build_baseline_cnn
+from checkpointing import TrainingCheckpoint, read_checkpoint_state, clear_checkpoints
+
+
+INPUT_SHAPE = (64, 64, 3)
+
+
+def random_data(count=8, seed=0):
+    """Create a small random binary classification dataset."""
+    rng = np.random.default_rng(seed)
+    return rng.random((count,) + INPUT_SHAPE, dtype=np.float32), np.tile([0.0, 1.0], count // 2)
+
+
+def train_with_checkpoint(checkpoint_dir, epochs=1, initial_epoch=0, model=None, **kwargs):
+    """Fit a small model with a TrainingCheckpoint callback."""
+    model = model or build_baseline_cnn(input_shape=INPUT_SHAPE)
+    early_stopping = tf.keras.callbacks.EarlyStopping(monitor='loss', patience=10)
+    checkpoint = TrainingCheckpoint(
+        model, checkpoint_dir, stateful_callbacks=[early_stopping], **kwargs
+    )
+    images, labels = random_data()
+    model.fit(images, labels, batch_size=4, epochs=epochs, initial_epoch=initial_epoch,
+              callbacks=[early_stopping, checkpoint], verbose=0)
+    return model, checkpoint, early_stopping
+
+
+class TestTrainingCheckpoint:
+    """Test cases for saving and restoring the training state."""
+
+    def test_restore_model_and_optimizer(self, tmp_path):
+        """Test that weights, optimizer state and counters survive a restart."""
+        checkpoint_dir = str(tmp_path / 'checkpoints')
+        model, _, _ = train_with_checkpoint(
+            checkpoint_dir, epochs=2, run_state={'mlflow_run_id': 'abc', 'seed': 7}
+        )
+
+        restored_model = build_baseline_cnn(input_shape=INPUT_SHAPE)
+        checkpoint = TrainingCheckpoint(restored_model, checkpoint_dir)
+        epoch, step = checkpoint.restore()
+
+        assert (epoch, step) == (2, 4)
+        assert int(restored_model.optimizer.iterations.numpy()) == 4
+        assert checkpoint.run_state == {'mlflow_run_id': 'abc', 'seed': 7}
+        for restored, original in zip(restored_model.get_weights(), model.get_weights()):
+            np.testing.assert_array_equal(restored, original)
+
+        # Adam moments are restored once the optimizer builds its slots
+        restored_model.optimizer.build(restored_model.trainable_variables)
+        for restored, original in zip(restored_model.optimizer.variables, model.optimizer.variables):
+            np.testing.assert_array_equal(restored.numpy(), original.numpy())
+
+    def test_periodic_step_checkpoints(self, tmp_path):
+        """Test that checkpoints are written every N steps, numbered by step."""
+        checkpoint_dir = str(tmp_path / 'checkpoints')
+        train_with_checkpoint(checkpoint_dir, epochs=1, save_every_n_steps=1, max_to_keep=5)
+
+        state = read_checkpoint_state(checkpoint_dir)
+        saved = sorted(name for name in os.listdir(checkpoint_dir) if name.endswith('.index'))
+
+        assert saved == ['ckpt-1.index', 'ckpt-2.index']
+        assert state['step'] == 2
+        assert state['epoch'] == 1
+        assert state['path'].endswith('ckpt-2')
+
+    def test_callback_state_restored(self, tmp_path):
+        """Test that EarlyStopping keeps its best value and patience count across a resume."""
+        checkpoint_dir = str(tmp_path / 'checkpoints')
+        _, _, early_stopping = train_with_checkpoint(checkpoint_dir, epochs=2)
+        saved = read_checkpoint_state(checkpoint_dir)['run_state']['callbacks']['EarlyStopping']
+
+        model = build_baseline_cnn(input_shape=INPUT_SHAPE)
+        resumed_stopping = tf.keras.callbacks.EarlyStopping(monitor='loss', patience=10)
+        checkpoint = TrainingCheckpoint(model, checkpoint_dir, stateful_callbacks=[resumed_stopping])
+        checkpoint.restore()
+        resumed_stopping.set_model(model)
+        resumed_stopping.on_train_begin()
+        checkpoint.on_train_begin()
+
+        assert saved['best'] == pytest.approx(early_stopping.best)
+        assert resumed_stopping.best == pytest.approx(early_stopping.best)
+        assert resumed_stopping.wait == early_stopping.wait
+
+    def test_best_weights_restored(self, tmp_path):
+        """Test that EarlyStopping's best weights survive a resume."""
+        checkpoint_dir = str(tmp_path / 'checkpoints')
+        model = build_baseline_cnn(input_shape=INPUT_SHAPE)
+        early_stopping = tf.keras.callbacks.EarlyStopping(
+            monitor='loss', patience=10, restore_best_weights=True
+        )
+        checkpoint = TrainingCheckpoint(model, checkpoint_dir, stateful_callbacks=[early_stopping])
+        images, labels = random_data()
+        model.fit(images, labels, batch_size=4, epochs=2,
+                  callbacks=[early_stopping, checkpoint], verbose=0)
+
+        resumed_model = build_baseline_cnn(input_shape=INPUT_SHAPE)
+        resumed_stopping = tf.keras.callbacks.EarlyStopping(
+            monitor='loss', patience=10, restore_best_weights=True
+        )
+        resumed = TrainingCheckpoint(resumed_model, checkpoint_dir, stateful_callbacks=[resumed_stopping])
+        resumed.restore()
+        resumed_stopping.set_model(resumed_model)
+        resumed_stopping.on_train_begin()
+        resumed.on_train_begin()
+
+        assert len(resumed_stopping.best_weights) == len(early_stopping.best_weights)
+        for restored, expected in zip(resumed_stopping.best_weights, early_stopping.best_weights):
+            np.testing.assert_array_equal(restored, expected)
+
+    def test_carry_over_callback_state(self, tmp_path):
+        """Test that a second fit call keeps the live callback state, not the restored one."""
+        model, checkpoint, early_stopping = train_with_checkpoint(str(tmp_path), epochs=1)
+        checkpoint.restored_callback_state = {'EarlyStopping': {'wait': 7}}
+        early_stopping.wait = 3
+
+        checkpoint.carry_over_callback_state()
+        early_stopping.on_train_begin()
+        checkpoint.on_train_begin()
+
+        assert early_stopping.wait == 3
+
+    def test_no_checkpoint(self, tmp_path):
+        """Test that an empty directory has nothing to resume or clear."""
+        model = build_baseline_cnn(input_shape=INPUT_SHAPE)
+
+        assert read_checkpoint_state(str(tmp_path)) is None
+        assert read_checkpoint_state(None) is None
+        assert TrainingCheckpoint(model, str(tmp_path)).restore() is None
+        assert not clear_checkpoints(str(tmp_path))
+
+    def test_clear_checkpoints(self, tmp_path):
+        """Test that a fresh run removes checkpoints of the previous run."""
+        checkpoint_dir = str(tmp_path / 'checkpoints')
+        train_with_checkpoint(checkpoint_dir)
+
+        assert clear_checkpoints(checkpoint_dir)
+        assert read_checkpoint_state(checkpoint_dir) is None
+
+    def test_write_dir_for_non_chief(self, tmp_path):
+        """Test that a non-chief worker writes elsewhere but reads the shared directory."""
+        checkpoint_dir = str(tmp_path / 'checkpoints')
+        write_dir = str(tmp_path / 'worker_1')
+        train_with_checkpoint(checkpoint_dir, write_dir=write_dir)
+
+        assert read_checkpoint_state(checkpoint_dir) is None
+        assert read_checkpoint_state(write_dir)['step'] == 2
@@ -0,0 +1,100 @@
+"""
+Unit tests for near-duplicate detection.
+"""
+
+import os
+import sys
+import pytest
+import numpy as np
+from PIL import Image
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from dedup import (
+    load_hash_thumbnails,
+    dhash_batch,
+    hamming_distance,
+    find_near_duplicates,
+    cluster_pairs
+)
+
+
+def textured_image(seed, size=(160, 120)):
+    """Create a smooth random image with structure a perceptual hash can see."""
+    rng = np.random.default_rng(seed)
+    coarse = rng.integers(0, 256, size=(6, 8, 3), dtype=np.uint8)
+    return Image.fromarray(coarse).resize(size, Image.BICUBIC)
+
+
+def brute_force_pairs(hashes, max_distance):
+    """Reference all-pairs search."""
+    distances = hamming_distance(hashes[:, None], hashes[None, :])
+    return np.argwhere(np.triu(distances <= max_distance, k=1))
+
+
+class TestPerceptualHash:
+    """Test cases for difference hashing."""
+
+    def test_near_duplicates_hash_close(self, tmp_path):
+        """Test that resized, recompressed copies hash within a few bits."""
+        original = textured_image(0)
+        original.save(tmp_path / 'original.jpg', quality=95)
+        original.resize((80, 60)).save(tmp_path / 'small.jpg', quality=60)
+        textured_image(1).save(tmp_path / 'other.jpg')
+
+        thumbnails = load_hash_thumbnails(
+            [str(tmp_path / name) for name in ('original.jpg', 'small.jpg', 'other.jpg')]
+        )
+        hashes = dhash_batch(thumbnails)
+
+        assert thumbnails.shape == (3, 8, 9)
+        assert hashes.dtype == np.uint64
+        assert hamming_distance(hashes[0], hashes[1]) <= 4
+        assert hamming_distance(hashes[0], hashes[2]) > 10
+
+    def test_dhash_bits(self):
+        """Test that each bit records a left-to-right brightness increase."""
+        thumbnails = np.zeros((2, 8, 9), dtype=np.uint8)
+        thumbnails[1] = np.arange(9, dtype=np.uint8)
+
+        hashes = dhash_batch(thumbnails)
+
+        assert hashes[0] == 0
+        assert hashes[1] == np.uint64(2 ** 64 - 1)
+
+
+class TestDuplicateIndex:
+    """Test cases for the multi-index hash search."""
+
+    @pytest.mark.parametrize('max_distance', [0, 3, 6])
+    def test_matches_brute_force(self, max_distance):
+        """Test that the index finds exactly the all-pairs result."""
+        rng = np.random.default_rng(0)
+        base = rng.integers(0, 2 ** 63, size=300, dtype=np.int64).astype(np.uint64)
+        flips = rng.integers(0, 64, size=(100, 4)).astype(np.uint64)
+        noise = np.bitwise_or.reduce(np.uint64(1) << flips, axis=1)
+        hashes = np.concatenate([base, base[:100] ^ noise, base[:20]])
+
+        pairs = find_near_duplicates(hashes, max_distance)
+
+        np.testing.assert_array_equal(pairs, brute_force_pairs(hashes, max_distance))
+
+    @pytest.mark.parametrize('max_distance', [-1, 16, 64])
+    def test_distance_out_of_range(self, max_distance):
+        """Test that distances whose index chunks would be tiny or empty are rejected."""
+        hashes = np.arange(10, dtype=np.uint64)
+
+        with pytest.raises(ValueError):
+            find_near_duplicates(hashes, max_distance)
+
+    def test_no_pairs(self):
+        """Test empty and singleton inputs."""
+        assert find_near_duplicates(np.array([], dtype=np.uint64)).shape == (0, 2)
+        assert find_near_duplicates(np.array([5], dtype=np.uint64)).shape == (0, 2)
+
+    def test_cluster_pairs(self):
+        """Test that chained pairs form one cluster rooted at the smallest index."""
+        roots = cluster_pairs(6, np.array([[4, 1], [1, 3], [2, 5]]))
+
+        np.testing.assert_array_equal(roots, [0, 1, 2, 1, 1, 2])
@@ -0,0 +1,91 @@
+"""
+Unit tests for distributed training helpers.
+"""
+
+import os
+import sys
+import json
+import pytest
+import tensorflow as tf
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from distributed import (
+    read_tf_config,
+    is_chief,
+    local_tf_config,
+    create_strategy,
+    scale_for_replicas,
+    shard_by_data,
+    describe_topology,
+    find_free_ports
+)
+
+
+class TestClusterConfig:
+    """Test cases for TF_CONFIG handling."""
+
+    def test_no_tf_config(self, monkeypatch):
+        """Test that a plain single process is the chief."""
+        monkeypatch.delenv('TF_CONFIG', raising=False)
+
+        assert read_tf_config() == {'cluster': {}, 'task': {}}
+        assert is_chief()
+
+    def test_worker_zero_is_chief(self, monkeypatch):
+        """Test that worker 0 is the chief when the cluster has no chief task."""
+        ports = find_free_ports(3)
+        monkeypatch.setenv('TF_CONFIG', json.dumps(local_tf_config(3, 0, ports)))
+
+        assert is_chief()
+        assert read_tf_config()['cluster']['worker'] == [f"localhost:{port}" for port in ports]
+        assert not is_chief(local_tf_config(3, 2, ports))
+
+    def test_explicit_chief(self):
+        """Test that workers are not chief when a chief task exists."""
+        cluster = {'chief': ['host0:2222'], 'worker': ['host1:2222']}
+
+        assert is_chief({'cluster': cluster, 'task': {'type': 'chief', 'index': 0}})
+        assert not is_chief({'cluster': cluster, 'task': {'type': 'worker', 'index': 0}})
+
+    def test_free_ports_distinct(self):
+        """Test that reserved ports do not collide."""
+        ports = find_free_ports(4)
+
+        assert len(set(ports)) == 4
+
+
+class TestStrategy:
+    """Test cases for strategy setup and scaling."""
+
+    def test_default_strategy(self, monkeypatch):
+        """Test that 'none' is the single-replica default strategy."""
+        monkeypatch.delenv('TF_CONFIG', raising=False)
+        strategy = create_strategy('none')
+        topology = describe_topology(strategy)
+
+        assert strategy.num_replicas_in_sync == 1
+        assert topology['num_workers'] == 1
+        assert topology['task_type'] == 'local'
+
+    def test_unknown_strategy(self):
+        """Test that an unknown strategy name raises an error."""
+        with pytest.raises(ValueError):
+            create_strategy('parameter_server')
+
+    @pytest.mark.parametrize('lr_scaling, expected_lr', [('linear', 0.004), ('none', 0.001)])
+    def test_scale_for_replicas(self, lr_scaling, expected_lr):
+        """Test that the global batch grows with replicas and the LR follows when linear."""
+        global_batch_size, learning_rate = scale_for_replicas(32, 0.001, 4, lr_scaling)
+
+        assert global_batch_size == 128
+        assert learning_rate == pytest.approx(expected_lr)
+
+    def test_shard_by_data(self):
+        """Test that datasets get the DATA auto-shard policy and other inputs pass through."""
+        dataset = shard_by_data(tf.data.Dataset.range(4))
+        policy = dataset.options().experimental_distribute.auto_shard_policy
+
+        assert policy == tf.data.experimental.AutoShardPolicy.DATA
+        assert shard_by_data([1, 2]) == [1, 2]
@@ -0,0 +1,87 @@
+"""
+Unit tests for the bounded inference executor.
+"""
+
+import os
+import sys
+import time
+import asyncio
+import threading
+import pytest
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from executor import BoundedExecutor, ExecutorSaturatedError
+
+
+class TestBoundedExecutor:
+    """Test cases for offloading work with backpressure."""
+
+    def test_run_returns_result(self):
+        """Test that work runs and its result is returned."""
+        executor = BoundedExecutor(max_workers=2, max_pending=4)
+
+        result = asyncio.run(executor.run(lambda x, y=0: x + y, 2, y=3))
+        executor.shutdown()
+
+        assert result == 5
+        assert executor.completed == 1
+        assert executor.pending == 0
+
+    def test_runs_off_event_loop_thread(self):
+        """Test that work executes in a worker thread, not the loop thread."""
+        executor = BoundedExecutor(max_workers=1)
+
+        worker_thread = asyncio.run(executor.run(threading.get_ident))
+        executor.shutdown()
+
+        assert worker_thread != threading.get_ident()
+
+    def test_event_loop_stays_responsive(self):
+        """Test that the loop keeps serving while slow work runs."""
+        executor = BoundedExecutor(max_workers=1)
+
+        async def scenario():
+            slow = asyncio.ensure_future(executor.run(time.sleep, 0.3))
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            elapsed = time.perf_counter() - started
+            await slow
+            return elapsed
+
+        elapsed = asyncio.run(scenario())
+        executor.shutdown()
+
+        assert elapsed < 0.2
+
+    def test_rejects_when_saturated(self):
+        """Test that work beyond max_pending is rejected, not queued."""
+        executor = BoundedExecutor(max_workers=1, max_pending=2)
+
+        async def scenario():
+            tasks = [asyncio.ensure_future(executor.run(time.sleep, 0.1)) for _ in range(2)]
+            await asyncio.sleep(0)
+            with pytest.raises(ExecutorSaturatedError):
+                await executor.run(time.sleep, 0.1)
+            await asyncio.gather(*tasks)
+
+        asyncio.run(scenario())
+        executor.shutdown()
+
+        assert executor.rejected == 1
+        assert executor.get_stats()['completed'] == 2
+
+    def test_exception_releases_slot(self):
+        """Test that a failing task does not leak a pending slot."""
+        executor = BoundedExecutor(max_workers=1, max_pending=1)
+
+        def fail():
+            raise ValueError("bad image")
+
+        with pytest.raises(ValueError):
+            asyncio.run(executor.run(fail))
+        executor.shutdown()
+
+        assert executor.pending == 0
+        assert not executor.saturated
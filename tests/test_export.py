@@ -0,0 +1,158 @@
+"""
+Unit tests for quantized TFLite export and the TFLite inference backend.
+"""
+
+import os
+import sys
+import json
+import pytest
+import numpy as np
+import tensorflow as tf
+from PIL import Image
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from model import build_baseline_cnn, make_inference_fn
+from export_model import sample_images, convert_to_tflite, export_tflite_models
+from backends import TFLiteBackend
+
+
+INPUT_SHAPE = (64, 64, 3)
+
+
+def random_images(count=8, seed=0):
+    """Create random uint8 images."""
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 256, size=(count,) + INPUT_SHAPE, dtype=np.uint8)
+
+
+@pytest.fixture(scope='module')
+def small_model():
+    """Build a small untrained model with in-graph preprocessing."""
+    tf.keras.utils.set_random_seed(0)
+    return build_baseline_cnn(input_shape=INPUT_SHAPE, include_preprocessing=True)
+
+
+def write_tflite(tmp_path, model, quantization):
+    """Convert a model and write it to a .tflite file."""
+    path = str(tmp_path / f"model_{quantization}.tflite")
+    with open(path, 'wb') as f:
+        f.write(convert_to_tflite(model, quantization, random_images(16, seed=1)))
+    return path
+
+
+class TestSampleImages:
+    """Test cases for calibration and report sampling."""
+
+    def test_balanced_sample(self):
+        """Test that each class contributes equally and the order is mixed."""
+        paths = [f"img_{i}.jpg" for i in range(100)]
+        labels = [0] * 80 + [1] * 20
+
+        sampled_paths, sampled_labels = sample_images(paths, labels, max_images=20)
+
+        assert len(sampled_paths) == 20
+        assert np.sum(sampled_labels == 0) == np.sum(sampled_labels == 1) == 10
+        assert len(set(sampled_labels[:6])) == 2
+        for path, label in zip(sampled_paths, sampled_labels):
+            assert labels[paths.index(path)] == label
+
+
+class TestTFLiteBackend:
+    """Test cases for serving TFLite models."""
+
+    @pytest.mark.parametrize('quantization', ['dynamic', 'int8'])
+    def test_matches_float_model(self, tmp_path, small_model, quantization):
+        """Test that quantized models predict close to the float model."""
+        backend = TFLiteBackend(write_tflite(tmp_path, small_model, quantization), num_threads=1)
+        images = random_images(4)
+
+        expected = make_inference_fn(small_model, input_dtype=tf.uint8)(images).numpy()
+        predictions = backend(images)
+
+        assert backend.image_shape == INPUT_SHAPE
+        assert predictions.shape == (4, 1)
+        assert predictions.dtype == np.float32
+        np.testing.assert_allclose(predictions, expected, atol=0.05)
+
+    def test_int8_takes_uint8_input(self, tmp_path, small_model):
+        """Test that full-int8 models take decoded pixels without conversion."""
+        backend = TFLiteBackend(write_tflite(tmp_path, small_model, 'int8'))
+
+        assert backend.input_dtype == np.uint8
+
+    def test_batch_size_changes(self, tmp_path, small_model):
+        """Test that the interpreter is resized for each batch size."""
+        backend = TFLiteBackend(write_tflite(tmp_path, small_model, 'dynamic'))
+        images = random_images(5)
+
+        batched = backend(images)
+        single = np.concatenate([backend(images[i:i + 1]) for i in range(5)])
+
+        assert backend(images[:3]).shape == (3, 1)
+        np.testing.assert_allclose(batched, single, atol=1e-5)
+
+    def test_int8_needs_calibration(self, small_model):
+        """Test that int8 conversion without calibration images is rejected."""
+        with pytest.raises(ValueError):
+            convert_to_tflite(small_model, 'int8')
+
+
+class TestExportReport:
+    """Test cases for the quantization accuracy report."""
+
+    def test_report(self, tmp_path, small_model):
+        """Test that both models are exported and compared with the float model."""
+        model_path = str(tmp_path / 'model.h5')
+        small_model.save(model_path)
+        paths, labels = [], []
+        for i in range(6):
+            path = str(tmp_path / f"img_{i}.jpg")
+            Image.fromarray(random_images(1, seed=i)[0]).save(path)
+            paths.append(path)
+            labels.append(i % 2)
+
+        report = export_tflite_models(
+            model_path, str(tmp_path / 'out'), paths, labels, num_calibration=4,
+            max_accuracy_drop=1.0
+        )
+
+        assert report['num_images'] == 2
+        assert report['num_calibration'] == 4
+        for quantization in ('dynamic', 'int8'):
+            entry = report[quantization]
+            assert os.path.exists(entry['path'])
+            assert entry['size_mb'] < report['float']['size_mb']
+            assert 0.0 <= entry['agreement'] <= 1.0
+            assert entry['passed']
+        with open(tmp_path / 'out' / 'quantization_report.json') as f:
+            assert json.load(f)['int8']['accuracy'] == report['int8']['accuracy']
+
+    def test_separate_calibration_images(self, tmp_path, small_model):
+        """Test that separate calibration images leave the whole sample for the report."""
+        model_path = str(tmp_path / 'model.h5')
+        small_model.save(model_path)
+        paths = []
+        for i in range(6):
+            path = str(tmp_path / f"img_{i}.jpg")
+            Image.fromarray(random_images(1, seed=i)[0]).save(path)
+            paths.append(path)
+
+        report = export_tflite_models(
+            model_path, str(tmp_path / 'out'), paths[:3], [0, 1, 0], num_calibration=2,
+            max_accuracy_drop=1.0, calibration_paths=paths[3:]
+        )
+
+        assert report['num_images'] == 3
+        assert report['num_calibration'] == 2
+
+    def test_calibration_uses_whole_sample(self, tmp_path, small_model):
+        """Test that a sample with nothing left to score after calibration is rejected."""
+        model_path = str(tmp_path / 'model.h5')
+        small_model.save(model_path)
+        path = str(tmp_path / "img.jpg")
+        Image.fromarray(random_images(1)[0]).save(path)
+
+        with pytest.raises(ValueError):
+            export_tflite_models(model_path, str(tmp_path / 'out'), [path], [0], num_calibration=4)
@@ -0,0 +1,285 @@
+"""
+Unit tests for inference service helpers.
+"""
+
+import os
+import sys
+import io
+import asyncio
+import threading
+import tarfile
+import zipfile
+import pytest
+import numpy as np
+from PIL import Image
+from fastapi import UploadFile
+from starlette.datastructures import Headers
+
+# Add project root to path (inference uses package-relative imports)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src import inference
+from src.inference import interpret_probability, read_archive_members, predict_chunk, decode_image
+from src.cache import PredictionCache
+from src.executor import BoundedExecutor
+
+
+def jpeg_bytes(color='red', size=(64, 48)):
+    """Create JPEG-encoded bytes for a solid-colour image."""
+    img_bytes = io.BytesIO()
+    Image.new('RGB', size, color=color).save(img_bytes, format='JPEG')
+    return img_bytes.getvalue()
+
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    """Replace the forward pass with one returning a fixed probability per row."""
+    calls = []
+
+    def fake_predict_batch(images):
+        calls.append((images.shape, images.dtype))
+        return np.full((images.shape[0], 1), 0.8, dtype=np.float32)
+
+    monkeypatch.setattr(inference, 'predict_batch', fake_predict_batch)
+    return calls
+
+
+class TestPredictionHelpers:
+    """Test cases for prediction post-processing."""
+
+    def test_interpret_probability_dog(self):
+        """Test that high probabilities map to dog."""
+        assert interpret_probability(0.9) == ("dog", 0.9)
+
+    def test_interpret_probability_cat(self):
+        """Test that low probabilities map to cat with inverted confidence."""
+        class_label, confidence = interpret_probability(0.2)
+
+        assert class_label == "cat"
+        assert confidence == pytest.approx(0.8)
+
+
+class TestBatchPrediction:
+    """Test cases for bulk prediction helpers."""
+
+    def test_read_zip_members(self):
+        """Test that regular files are extracted from a zip archive."""
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as zf:
+            zf.writestr('photos/', '')
+            zf.writestr('photos/a.jpg', jpeg_bytes())
+            zf.writestr('photos/.DS_Store', b'junk')
+            zf.writestr('photos/b.jpg', jpeg_bytes('blue'))
+
+        members = read_archive_members(archive.getvalue(), max_members=10)
+
+        assert [name for name, _ in members] == ['photos/a.jpg', 'photos/b.jpg']
+
+    def test_read_tar_members(self):
+        """Test that regular files are extracted from a gzipped tar archive."""
+        archive = io.BytesIO()
+        with tarfile.open(fileobj=archive, mode='w:gz') as tf_archive:
+            for name in ['a.jpg', 'b.jpg', 'c.jpg']:
+                data = jpeg_bytes()
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                tf_archive.addfile(info, io.BytesIO(data))
+
+        members = read_archive_members(archive.getvalue(), max_members=2)
+
+        assert len(members) == 2
+
+    def test_read_invalid_archive(self):
+        """Test that unreadable archives raise ValueError."""
+        with pytest.raises(ValueError):
+            read_archive_members(b'definitely not an archive', max_members=10)
+
+    def test_read_archive_member_size_limit(self):
+        """Test that an oversized zip member is rejected from its header before it is read."""
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr('a.jpg', jpeg_bytes())
+            zf.writestr('bomb.jpg', b'\0' * 100000)
+
+        assert len(archive.getvalue()) < 10000
+        with pytest.raises(ValueError, match='bomb.jpg'):
+            read_archive_members(archive.getvalue(), max_members=10, max_member_bytes=50000)
+
+    def test_read_archive_total_size_limit(self):
+        """Test that members within the per-file limit still count towards the total limit."""
+        archive = io.BytesIO()
+        with tarfile.open(fileobj=archive, mode='w:gz') as tf_archive:
+            for name in ['a.jpg', 'b.jpg', 'c.jpg']:
+                info = tarfile.TarInfo(name)
+                info.size = 40000
+                tf_archive.addfile(info, io.BytesIO(b'\0' * info.size))
+
+        members = read_archive_members(
+            archive.getvalue(), max_members=2, max_member_bytes=50000, max_total_bytes=100000
+        )
+        assert len(members) == 2
+        with pytest.raises(ValueError, match='exceed'):
+            read_archive_members(
+                archive.getvalue(), max_members=10, max_member_bytes=50000, max_total_bytes=100000
+            )
+
+    def test_predict_chunk_per_item_errors(self, fake_model):
+        """Test that bad images get errors while good ones are predicted together."""
+        items = [
+            ('a.jpg', jpeg_bytes()),
+            ('broken.jpg', b'not an image'),
+            ('b.jpg', jpeg_bytes('blue'))
+        ]
+
+        results = predict_chunk(items)
+
+        assert fake_model == [((2, 224, 224, 3), np.uint8)]
+        assert [result.filename for result in results] == ['a.jpg', 'broken.jpg', 'b.jpg']
+        assert results[0].class_label == 'dog'
+        assert results[1].error is not None and results[1].class_label is None
+        assert results[2].probability == pytest.approx(0.8)
+
+    def test_decode_to_model_image_shape(self, fake_model, monkeypatch):
+        """Test that uploads are decoded to the loaded model's (height, width), not 224x224."""
+        monkeypatch.setattr(inference, 'image_shape', (48, 32, 3))
+
+        predict_chunk([('a.jpg', jpeg_bytes())])
+
+        assert decode_image(jpeg_bytes()).shape == (1, 48, 32, 3)
+        assert fake_model == [((1, 48, 32, 3), np.uint8)]
+
+    def test_predict_chunk_all_invalid(self, fake_model):
+        """Test that a chunk with no decodable images skips the forward pass."""
+        results = predict_chunk([('x.jpg', b'bad')])
+
+        assert fake_model == []
+        assert results[0].error is not None
+
+    def test_batch_caches_raw_confidence(self, fake_model, monkeypatch):
+        """Test that /predict/batch caches the unrounded confidence, like /predict."""
+        monkeypatch.setattr(inference, 'model_ready', True)
+        monkeypatch.setattr(inference, 'executor', BoundedExecutor(max_workers=1))
+        monkeypatch.setattr(inference, 'prediction_cache', PredictionCache())
+        image = jpeg_bytes()
+        upload = UploadFile(
+            io.BytesIO(image), filename='a.jpg', headers=Headers({'content-type': 'image/jpeg'})
+        )
+
+        response = asyncio.run(inference.predict_batch_endpoint([upload]))
+
+        cache = inference.prediction_cache
+        _, confidence = cache.get(cache.make_key(image))
+        assert confidence == float(np.float32(0.8)) != 0.8
+        assert response.results[0].probability == 0.8
+        inference.executor.shutdown()
+
+    def test_batch_hashes_off_event_loop(self, fake_model, monkeypatch):
+        """Test that cache keys are computed on the worker pool and hits skip inference."""
+        monkeypatch.setattr(inference, 'model_ready', True)
+        monkeypatch.setattr(inference, 'executor', BoundedExecutor(max_workers=1))
+        monkeypatch.setattr(inference, 'prediction_cache', PredictionCache())
+        threads = []
+        make_key = inference.prediction_cache.make_key
+
+        def recording_make_key(data):
+            threads.append(threading.current_thread())
+            return make_key(data)
+
+        monkeypatch.setattr(inference.prediction_cache, 'make_key', recording_make_key)
+
+        def upload(data, filename):
+            return UploadFile(
+                io.BytesIO(data), filename=filename, headers=Headers({'content-type': 'image/jpeg'})
+            )
+
+        asyncio.run(inference.predict_batch_endpoint([upload(jpeg_bytes(), 'a.jpg')]))
+        response = asyncio.run(inference.predict_batch_endpoint(
+            [upload(jpeg_bytes(), 'a.jpg'), upload(jpeg_bytes('blue'), 'b.jpg')]
+        ))
+
+        assert threads and threading.main_thread() not in threads
+        assert [shape[0] for shape, _ in fake_model] == [1, 1]
+        assert [result.class_label for result in response.results] == ['dog', 'dog']
+        inference.executor.shutdown()
+
+
+class TestReadiness:
+    """Test cases for warm-up configuration and readiness gating."""
+
+    def test_default_warmup_batch_sizes(self, monkeypatch):
+        """Test that default warm-up covers powers of two up to the max batch."""
+        monkeypatch.setattr(inference, 'WARMUP_BATCH_SIZES', None)
+        monkeypatch.setattr(inference, 'BATCH_MAX_SIZE', 24)
+
+        assert inference.get_warmup_batch_sizes() == [1, 2, 4, 8, 16, 24]
+
+    def test_configured_warmup_batch_sizes(self, monkeypatch):
+        """Test that WARMUP_BATCH_SIZES overrides the defaults."""
+        monkeypatch.setattr(inference, 'WARMUP_BATCH_SIZES', '32, 1,8')
+
+        assert inference.get_warmup_batch_sizes() == [1, 8, 32]
+
+    def test_warmup_disabled(self, monkeypatch):
+        """Test that an empty WARMUP_BATCH_SIZES disables warm-up batches."""
+        monkeypatch.setattr(inference, 'WARMUP_BATCH_SIZES', '')
+
+        assert inference.get_warmup_batch_sizes() == []
+
+    def test_not_ready_returns_503(self, monkeypatch):
+        """Test that the readiness probe fails until warm-up completes."""
+        monkeypatch.setattr(inference, 'model_ready', False)
+
+        response = asyncio.run(inference.readiness_check())
+
+        assert response.status_code == 503
+
+    def test_ready_after_warmup(self, monkeypatch):
+        """Test that the readiness probe passes once the model is ready."""
+        monkeypatch.setattr(inference, 'model_ready', True)
+
+        response = asyncio.run(inference.readiness_check())
+
+        assert response.ready is True
+        assert response.status == "healthy"
+
+
+class TestModelFingerprint:
+    """Test cases for cache invalidation on model changes."""
+
+    def test_fingerprint_changes_with_model_file(self, tmp_path):
+        """Test that rewriting the model file changes its fingerprint."""
+        model_path = tmp_path / "model.h5"
+        model_path.write_bytes(b'weights-v1')
+        first = inference.get_model_fingerprint(str(model_path))
+
+        model_path.write_bytes(b'weights-v2-longer')
+
+        assert inference.get_model_fingerprint(str(model_path)) != first
+        assert inference.get_model_fingerprint(str(model_path)) == \
+            inference.get_model_fingerprint(str(model_path))
+
+
+class TestTFLiteServing:
+    """Test cases for serving an exported TFLite model."""
+
+    def test_load_tflite_model(self, tmp_path, monkeypatch):
+        """Test that a .tflite MODEL_PATH is served with the TFLite interpreter."""
+        import tensorflow as tf
+        from src.model import build_baseline_cnn
+        from src.backends import TFLiteBackend
+
+        model_path = tmp_path / "model.tflite"
+        keras_model = build_baseline_cnn(input_shape=(64, 64, 3))
+        model_path.write_bytes(tf.lite.TFLiteConverter.from_keras_model(keras_model).convert())
+        monkeypatch.setattr(inference, 'MODEL_PATH', str(model_path))
+        monkeypatch.setattr(inference, 'INFERENCE_BACKEND', None)
+        monkeypatch.setattr(inference, 'INFERENCE_NUM_THREADS', 1)
+        monkeypatch.setattr(inference, 'model', None)
+        monkeypatch.setattr(inference, 'infer_fn', None)
+        monkeypatch.setattr(inference, 'image_shape', (224, 224, 3))
+
+        assert isinstance(inference.load_model(), TFLiteBackend)
+        assert inference.image_shape == (64, 64, 3)
+        probabilities = inference.predict_batch(np.zeros((3, 64, 64, 3), dtype=np.uint8))
+        assert probabilities.shape == (3, 1)
+        assert inference.predict_batch(decode_image(jpeg_bytes())).shape == (1, 1)
@@ -6,13 +6,26 @@ import os
 import sys
 import pytest
 import numpy as np
+import tensorflow as tf
 from PIL import Image
 import io
 
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
-from model import build_baseline_cnn, get_model_summary
+from model import (
+    MODEL_ARCHITECTURES,
+    build_model,
+    build_transfer_model,
+    split_transfer_model,
+    unfreeze_backbone,
+    build_baseline_cnn,
+    get_model_summary,
+    make_inference_fn,
+    add_preprocessing_layers,
+    model_includes_preprocessing,
+    get_image_shape
+)
 
 
 class TestModelArchitecture:
@@ -164,3 +177,249 @@ class TestModelInference:
         
         # Should be identical (deterministic)
         np.testing.assert_array_almost_equal(pred1, pred2)
+
+    def test_inference_fn_matches_predict(self):
+        """Test that the traced inference function matches model.predict."""
+        model = build_baseline_cnn()
+        infer = make_inference_fn(model)
+        
+        for batch_size in [1, 8]:
+            test_input = np.random.rand(batch_size, 224, 224, 3).astype(np.float32)
+            
+            expected = model.predict(test_input, verbose=0)
+            actual = infer(test_input).numpy()
+            
+            assert actual.shape == (batch_size, 1)
+            np.testing.assert_allclose(actual, expected, rtol=1e-5, atol=1e-6)
+
+    def test_inference_fn_uint8_rescales_in_graph(self):
+        """Test that raw uint8 input is rescaled inside the traced function."""
+        model = build_baseline_cnn()
+        infer_float = make_inference_fn(model)
+        infer_uint8 = make_inference_fn(model, input_dtype=tf.uint8)
+        
+        raw = np.random.randint(0, 256, size=(4, 224, 224, 3), dtype=np.uint8)
+        
+        expected = infer_float(raw.astype(np.float32) / 255.0).numpy()
+        actual = infer_uint8(raw).numpy()
+        
+        np.testing.assert_allclose(actual, expected, rtol=1e-5, atol=1e-6)
+
+
+class TestInGraphPreprocessing:
+    """Test cases for models that resize and normalize their own input."""
+    
+    def test_preprocessing_model_accepts_any_size(self):
+        """Test that the preprocessing model takes raw images of any size."""
+        model = build_baseline_cnn(include_preprocessing=True)
+        
+        assert model.input_shape == (None, None, None, 3)
+        assert get_image_shape(model) == (224, 224, 3)
+        assert model_includes_preprocessing(model)
+        
+        raw = np.random.randint(0, 256, size=(2, 300, 260, 3)).astype(np.float32)
+        assert model.predict(raw, verbose=0).shape == (2, 1)
+    
+    def test_preprocessing_matches_external_normalization(self):
+        """Test that raw input to the preprocessing model equals normalized input to the plain one."""
+        plain = build_baseline_cnn()
+        with_preprocessing = build_baseline_cnn(include_preprocessing=True)
+        with_preprocessing.set_weights(plain.get_weights())
+        
+        raw = np.random.randint(0, 256, size=(3, 224, 224, 3)).astype(np.float32)
+        
+        expected = plain.predict(raw / 255.0, verbose=0)
+        actual = with_preprocessing.predict(raw, verbose=0)
+        
+        np.testing.assert_allclose(actual, expected, rtol=1e-4, atol=1e-5)
+    
+    def test_add_preprocessing_layers_to_existing_model(self, tmp_path):
+        """Test exporting an old-style model so it accepts raw pixels, including an h5 round trip."""
+        plain = build_baseline_cnn()
+        assert not model_includes_preprocessing(plain)
+        
+        exported = add_preprocessing_layers(plain)
+        path = str(tmp_path / "exported.h5")
+        exported.save(path)
+        reloaded = tf.keras.models.load_model(path)
+        
+        raw = np.random.randint(0, 256, size=(2, 224, 224, 3)).astype(np.float32)
+        expected = plain.predict(raw / 255.0, verbose=0)
+        
+        assert model_includes_preprocessing(reloaded)
+        np.testing.assert_allclose(reloaded.predict(raw, verbose=0), expected, rtol=1e-4, atol=1e-5)
+    
+    def test_inference_fn_skips_rescale_for_preprocessing_model(self):
+        """Test that uint8 input is not rescaled twice for preprocessing models."""
+        plain = build_baseline_cnn()
+        with_preprocessing = build_baseline_cnn(include_preprocessing=True)
+        with_preprocessing.set_weights(plain.get_weights())
+        
+        raw = np.random.randint(0, 256, size=(2, 224, 224, 3), dtype=np.uint8)
+        
+        expected = make_inference_fn(plain, input_dtype=tf.uint8)(raw).numpy()
+        actual = make_inference_fn(with_preprocessing, input_dtype=tf.uint8)(raw).numpy()
+        
+        np.testing.assert_allclose(actual, expected, rtol=1e-4, atol=1e-5)
+
+
+@pytest.fixture
+def mixed_policy():
+    """Run a test under the mixed_bfloat16 policy and restore float32 afterwards."""
+    tf.keras.mixed_precision.set_global_policy('mixed_bfloat16')
+    yield
+    tf.keras.mixed_precision.set_global_policy('float32')
+
+
+class TestTrainingModes:
+    """Test cases for mixed precision and XLA compilation."""
+    
+    def test_output_layer_float32_under_mixed_precision(self, mixed_policy):
+        """Test that hidden layers compute in bfloat16 but probabilities are float32."""
+        model = build_baseline_cnn(input_shape=(64, 64, 3))
+        
+        assert model.layers[0].compute_dtype == 'bfloat16'
+        assert model.layers[0].variable_dtype == 'float32'
+        assert model.layers[-1].compute_dtype == 'float32'
+        assert model.output.dtype == tf.float32
+        
+        prediction = model.predict(np.random.rand(2, 64, 64, 3), verbose=0)
+        assert prediction.dtype == np.float32
+    
+    def test_mixed_weights_load_into_float32_model(self, mixed_policy):
+        """Test that weights trained under mixed precision transfer to a float32 model."""
+        mixed = build_baseline_cnn(input_shape=(64, 64, 3))
+        tf.keras.mixed_precision.set_global_policy('float32')
+        plain = build_baseline_cnn(input_shape=(64, 64, 3))
+        
+        plain.set_weights(mixed.get_weights())
+        
+        images = np.random.rand(2, 64, 64, 3).astype(np.float32)
+        np.testing.assert_allclose(
+            plain.predict(images, verbose=0), mixed.predict(images, verbose=0), atol=0.02
+        )
+    
+    def test_jit_compile_flag(self):
+        """Test that XLA compilation is opt-in and trains."""
+        assert not build_baseline_cnn(input_shape=(64, 64, 3)).jit_compile
+        
+        model = build_baseline_cnn(input_shape=(64, 64, 3), jit_compile=True)
+        history = model.fit(
+            np.random.rand(4, 64, 64, 3), np.array([0, 1, 0, 1]), epochs=1, verbose=0
+        )
+        
+        assert model.jit_compile
+        assert np.isfinite(history.history['loss'][0])
+
+
+class TestArchitectureOptions:
+    """Test cases for the selectable model architectures."""
+    
+    @pytest.mark.parametrize('architecture', MODEL_ARCHITECTURES)
+    def test_architecture_predicts(self, architecture):
+        """Test that every architecture maps images to one probability each."""
+        model = build_model(architecture, input_shape=(64, 64, 3))
+        
+        prediction = model.predict(np.random.rand(3, 64, 64, 3), verbose=0)
+        
+        assert prediction.shape == (3, 1)
+        assert np.all((prediction >= 0) & (prediction <= 1))
+        assert model.output.dtype == tf.float32
+    
+    def test_pooled_heads_are_smaller(self):
+        """Test that global pooling and separable convolutions shrink the model."""
+        counts = {
+            architecture: build_model(architecture).count_params()
+            for architecture in MODEL_ARCHITECTURES
+        }
+        
+        assert counts['gap_cnn'] * 20 < counts['baseline_cnn']
+        assert counts['separable_cnn'] < counts['gap_cnn']
+    
+    def test_gap_cnn_with_preprocessing(self):
+        """Test that pooled architectures support in-graph preprocessing."""
+        model = build_model('gap_cnn', input_shape=(64, 64, 3), include_preprocessing=True)
+        
+        assert model_includes_preprocessing(model)
+        assert get_image_shape(model) == (64, 64, 3)
+        assert model.predict(np.random.rand(1, 100, 80, 3) * 255, verbose=0).shape == (1, 1)
+    
+    def test_unknown_architecture(self):
+        """Test that an unknown architecture name is rejected."""
+        with pytest.raises(ValueError):
+            build_model('resnet')
+
+
+class TestTransferModel:
+    """Test cases for the pretrained-backbone architecture."""
+    
+    @pytest.mark.parametrize('backbone', ['mobilenet_v2', 'efficientnet_v2_b0'])
+    def test_frozen_backbone(self, backbone):
+        """Test that only the head is trainable and raw pixels are scaled in-graph."""
+        model = build_model('transfer', input_shape=(64, 64, 3), backbone=backbone)
+        
+        prediction = model.predict(np.random.rand(2, 64, 64, 3) * 255, verbose=0)
+        
+        assert prediction.shape == (2, 1)
+        assert model_includes_preprocessing(model)
+        assert len(model.trainable_weights) == 2
+    
+    def test_split_matches_full_model(self):
+        """Test that the extractor and head together compute the full model."""
+        model = build_transfer_model(input_shape=(64, 64, 3))
+        extractor, head = split_transfer_model(model)
+        images = np.random.rand(3, 64, 64, 3).astype(np.float32) * 255
+        
+        features = extractor.predict(images, verbose=0)
+        
+        assert features.shape == (3, 1280)
+        np.testing.assert_allclose(
+            head.predict(features, verbose=0), model.predict(images, verbose=0), atol=1e-5
+        )
+        assert head.layers[-1] is model.layers[-1]
+    
+    def test_unfreeze_keeps_batch_norm_frozen(self):
+        """Test that fine-tuning trains the top backbone layers except BatchNormalization."""
+        model = build_transfer_model(input_shape=(64, 64, 3))
+        base = next(layer for layer in model.layers if isinstance(layer, tf.keras.Model))
+        
+        unfreeze_backbone(model, num_layers=20)
+        
+        trainable = [layer for layer in base.layers if layer.trainable]
+        assert trainable and all(layer in base.layers[-20:] for layer in trainable)
+        assert not any(isinstance(layer, tf.keras.layers.BatchNormalization) for layer in trainable)
+        assert len(model.trainable_weights) > 2
+    
+    def test_local_backbone_weights(self, tmp_path):
+        """Test that backbone weights are loaded from a local file."""
+        source = tf.keras.applications.MobileNetV2(
+            input_shape=(64, 64, 3), include_top=False, weights=None, pooling='avg'
+        )
+        weights_path = str(tmp_path / 'mobilenet_v2_no_top.h5')
+        source.save_weights(weights_path)
+        
+        model = build_model('transfer', input_shape=(64, 64, 3), backbone_weights=weights_path)
+        base = next(layer for layer in model.layers if isinstance(layer, tf.keras.Model))
+        
+        for loaded, expected in zip(base.get_weights(), source.get_weights()):
+            np.testing.assert_array_equal(loaded, expected)
+    
+    def test_save_and_load(self, tmp_path):
+        """Test that a saved transfer model reloads as a raw-pixel model."""
+        model = build_model('transfer', input_shape=(64, 64, 3), backbone='mobilenet_v3_small')
+        model_path = str(tmp_path / 'model.h5')
+        model.save(model_path)
+        
+        loaded = tf.keras.models.load_model(model_path)
+        images = np.random.rand(2, 64, 64, 3) * 255
+        
+        assert model_includes_preprocessing(loaded)
+        assert get_image_shape(loaded) == (64, 64, 3)
+        np.testing.assert_allclose(
+            loaded.predict(images, verbose=0), model.predict(images, verbose=0), atol=1e-5
+        )
+    
+    def test_unknown_backbone(self):
+        """Test that an unknown backbone name is rejected."""
+        with pytest.raises(ValueError):
+            build_model('transfer', backbone='resnet50')
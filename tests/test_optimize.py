@@ -0,0 +1,171 @@
+"""
+Unit tests for channel pruning, magnitude pruning and weight clustering.
+"""
+
+import os
+import sys
+import json
+import pytest
+import numpy as np
+import tensorflow as tf
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from model import build_model
+from optimize_model import (
+    prunable_weights,
+    model_sparsity,
+    prune_channels,
+    polynomial_sparsity,
+    magnitude_mask,
+    MagnitudePruning,
+    cluster_weights,
+    optimize_model
+)
+
+
+INPUT_SHAPE = (64, 64, 3)
+
+
+def small_dataset(count=16, batch_size=8, seed=0):
+    """Random [0, 1] images with alternating labels."""
+    rng = np.random.default_rng(seed)
+    images = rng.random((count,) + INPUT_SHAPE, dtype=np.float32)
+    labels = np.arange(count) % 2
+    return tf.data.Dataset.from_tensor_slices((images, labels)).batch(batch_size)
+
+
+def zero_weakest_half(model):
+    """Zero half of the outputs of every hidden layer, so pruning them changes nothing."""
+    for layer in model.layers[:-1]:
+        weights = layer.get_weights()
+        if not weights:
+            continue
+        outputs = weights[-1].shape[0]
+        for weight in weights if len(weights) == 2 else weights[1:]:
+            weight[..., :outputs // 2] = 0
+        layer.set_weights(weights)
+
+
+class TestChannelPruning:
+    """Test cases for structured channel pruning."""
+
+    @pytest.mark.parametrize('architecture', ['baseline_cnn', 'gap_cnn', 'separable_cnn'])
+    def test_removes_zero_channels_exactly(self, architecture):
+        """Test that removing all-zero channels keeps the predictions."""
+        model = build_model(architecture, input_shape=INPUT_SHAPE)
+        zero_weakest_half(model)
+        images = np.random.rand(4, *INPUT_SHAPE).astype(np.float32)
+
+        pruned = prune_channels(model, fraction=0.5)
+
+        assert pruned.count_params() < model.count_params() / 2
+        np.testing.assert_allclose(
+            pruned.predict(images, verbose=0), model.predict(images, verbose=0), atol=1e-5
+        )
+
+    def test_no_pruning_copies_model(self):
+        """Test that fraction 0 returns an independent copy with the same outputs."""
+        model = build_model('gap_cnn', input_shape=INPUT_SHAPE, include_preprocessing=True)
+        images = np.random.rand(2, *INPUT_SHAPE) * 255
+
+        copy = prune_channels(model, fraction=0.0)
+
+        assert copy is not model
+        assert copy.count_params() == model.count_params()
+        np.testing.assert_allclose(
+            copy.predict(images, verbose=0), model.predict(images, verbose=0), atol=1e-6
+        )
+
+    def test_output_layer_kept(self):
+        """Test that the sigmoid output keeps its single unit."""
+        pruned = prune_channels(build_model('baseline_cnn', input_shape=INPUT_SHAPE), 0.75)
+
+        assert pruned.output_shape == (None, 1)
+        assert [layer.filters for layer in pruned.layers if hasattr(layer, 'filters')] == [8, 16, 32, 32]
+
+    def test_transfer_model_rejected(self):
+        """Test that models with unsupported weighted layers are rejected."""
+        model = build_model('transfer', input_shape=INPUT_SHAPE, backbone='mobilenet_v3_small')
+
+        with pytest.raises(ValueError):
+            prune_channels(model)
+
+
+class TestMagnitudePruning:
+    """Test cases for unstructured magnitude pruning."""
+
+    def test_schedule(self):
+        """Test that sparsity rises from 0 to the target and then stays there."""
+        schedule = [polynomial_sparsity(step, 0.8, end_step=10) for step in range(15)]
+
+        assert schedule[0] == 0.0
+        assert schedule[10] == schedule[14] == pytest.approx(0.8)
+        assert all(a <= b for a, b in zip(schedule, schedule[1:]))
+
+    def test_mask_keeps_largest_weights(self):
+        """Test that the mask zeroes exactly the smallest-magnitude weights."""
+        kernel = np.array([[0.1, -0.5], [0.05, 2.0]])
+
+        mask = magnitude_mask(kernel, 0.5)
+
+        np.testing.assert_array_equal(mask, [[0, 1], [0, 1]])
+
+    def test_callback_reaches_target(self):
+        """Test that fine-tuning with the callback ends at the target sparsity."""
+        model = build_model('gap_cnn', input_shape=INPUT_SHAPE)
+
+        model.fit(
+            small_dataset(), epochs=2, verbose=0,
+            callbacks=[MagnitudePruning(0.6, end_step=2, update_every=1)]
+        )
+
+        assert model_sparsity(model) == pytest.approx(0.6, abs=0.01)
+        for weight in prunable_weights(model):
+            assert np.mean(weight.numpy() == 0) == pytest.approx(0.6, abs=0.02)
+
+
+class TestWeightClustering:
+    """Test cases for weight clustering."""
+
+    def test_clusters_keep_sparsity(self):
+        """Test that each kernel has at most num_clusters nonzero values and keeps its zeros."""
+        model = build_model('separable_cnn', input_shape=INPUT_SHAPE)
+        for weight in prunable_weights(model):
+            weight.assign(weight * magnitude_mask(weight.numpy(), 0.5))
+        sparsity = model_sparsity(model)
+
+        cluster_weights(model, num_clusters=8)
+
+        assert model_sparsity(model) == pytest.approx(sparsity)
+        for weight in prunable_weights(model):
+            values = weight.numpy()
+            assert len(np.unique(values[values != 0])) <= 8
+
+
+class TestOptimizeModel:
+    """Test cases for the full optimization stage."""
+
+    def test_report(self, tmp_path):
+        """Test that the optimized model is saved, smaller and compared with the dense one."""
+        model = build_model('baseline_cnn', input_shape=INPUT_SHAPE)
+        model_path = str(tmp_path / 'model.h5')
+        model.save(model_path)
+        dense_params = model.count_params()
+
+        optimized, report = optimize_model(
+            model, model_path, str(tmp_path / 'model_optimized.h5'), small_dataset(),
+            small_dataset(seed=1), steps_per_epoch=2, channel_fraction=0.5, sparsity=0.5,
+            epochs=1, num_clusters=8
+        )
+
+        assert model.count_params() == dense_params
+        assert os.path.exists(report['optimized']['path'])
+        assert report['optimized']['sparsity'] == pytest.approx(0.5, abs=0.01)
+        assert report['ratio']['param_count'] < 0.5
+        assert report['ratio']['gzip_size_mb'] < report['ratio']['model_size_mb']
+        assert 0.0 <= report['optimized']['accuracy'] <= 1.0
+        assert optimized.count_params() == report['optimized']['param_count']
+        with open(report['report_path']) as f:
+            assert json.load(f)['dense']['path'] == model_path
@@ -0,0 +1,451 @@
+"""
+Unit tests for dataset preparation and sharded export.
+"""
+
+import os
+import sys
+import json
+import pytest
+import numpy as np
+from PIL import Image
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from prepare_dataset import (
+    compute_splits,
+    balance_shards,
+    split_dataset,
+    hash_split,
+    link_file,
+    read_manifest,
+    checksum_file,
+    inspect_image,
+    validate_images,
+    deduplicate_splits,
+    is_inside,
+    ratios_changed
+)
+from data_preprocessing import (
+    read_shard_index,
+    read_tfrecord_labels,
+    create_tfrecord_dataset,
+    create_tfrecord_datasets,
+    load_manifest_split,
+    create_manifest_datasets
+)
+
+
+@pytest.fixture
+def raw_dataset(tmp_path):
+    """Create a Kaggle-style flat directory of cat.N.jpg and dog.N.jpg files."""
+    source = tmp_path / 'raw'
+    source.mkdir()
+    for i in range(20):
+        Image.new('RGB', (64 + i, 48), color='red').save(source / f'cat.{i}.jpg')
+        Image.new('RGB', (64 + i, 48), color='blue').save(source / f'dog.{i}.jpg')
+    return source
+
+
+class TestSplitting:
+    """Test cases for split computation."""
+
+    def test_compute_splits_sizes(self):
+        """Test that each class is split 80/10/10."""
+        cats = [f'cat.{i}.jpg' for i in range(100)]
+        dogs = [f'dog.{i}.jpg' for i in range(100)]
+
+        splits = compute_splits(cats, dogs)
+
+        for class_name in ('cats', 'dogs'):
+            assert len(splits['train'][class_name]) == 80
+            assert len(splits['validation'][class_name]) == 10
+            assert len(splits['test'][class_name]) == 10
+
+    def test_compute_splits_disjoint_and_reproducible(self):
+        """Test that splits cover every file once and are deterministic."""
+        cats = [f'cat.{i}.jpg' for i in range(50)]
+        dogs = [f'dog.{i}.jpg' for i in range(50)]
+
+        first = compute_splits(cats, dogs)
+        second = compute_splits(cats, dogs)
+
+        assert first == second
+        all_files = sum((first[split]['cats'] for split in first), [])
+        assert sorted(all_files) == sorted(cats)
+
+    def test_directory_output(self, tmp_path, raw_dataset):
+        """Test that the default format copies into split/class folders."""
+        output = tmp_path / 'data'
+
+        split_dataset(str(raw_dataset), str(output))
+
+        assert len(os.listdir(output / 'train' / 'cats')) == 16
+        assert len(os.listdir(output / 'test' / 'dogs')) == 2
+
+
+class TestIncrementalSplit:
+    """Test cases for link-based, manifest-tracked splitting."""
+
+    def test_link_modes(self, tmp_path):
+        """Test that each link mode produces a readable file."""
+        src = tmp_path / 'src.jpg'
+        src.write_bytes(b'image data')
+
+        assert link_file(src, tmp_path / 'copy.jpg', 'copy') == 'copy'
+        assert link_file(src, tmp_path / 'hard.jpg', 'hardlink') == 'hardlink'
+        assert os.stat(tmp_path / 'hard.jpg').st_ino == os.stat(src).st_ino
+        assert link_file(src, tmp_path / 'sym.jpg', 'symlink') == 'symlink'
+        assert os.path.islink(tmp_path / 'sym.jpg')
+        assert link_file(src, tmp_path / 'auto.jpg', 'auto') in ('hardlink', 'reflink', 'copy')
+        for name in ('copy.jpg', 'hard.jpg', 'sym.jpg', 'auto.jpg'):
+            assert (tmp_path / name).read_bytes() == b'image data'
+
+    def test_manifest_written(self, tmp_path, raw_dataset):
+        """Test that the manifest lists every image with its output path."""
+        output = tmp_path / 'data'
+
+        split_dataset(str(raw_dataset), str(output), link_mode='hardlink')
+
+        entries = read_manifest(output / 'manifest.jsonl')
+        assert len(entries) == 40
+        assert {entry['method'] for entry in entries} == {'hardlink'}
+        assert all(os.path.exists(output / entry['path']) for entry in entries)
+        assert {entry['label'] for entry in entries if entry['class'] == 'dogs'} == {1}
+
+    def test_rerun_only_processes_delta(self, tmp_path, raw_dataset):
+        """Test that a re-run keeps assignments and only adds new images."""
+        output = tmp_path / 'data'
+        split_dataset(str(raw_dataset), str(output))
+        before = {entry['source']: entry for entry in read_manifest(output / 'manifest.jsonl')}
+        untouched = output / before['cat.0.jpg']['path']
+        mtime = os.stat(untouched).st_mtime_ns
+
+        for i in range(20, 25):
+            Image.new('RGB', (64, 48), color='red').save(raw_dataset / f'cat.{i}.jpg')
+        os.remove(raw_dataset / 'dog.3.jpg')
+        split_dataset(str(raw_dataset), str(output))
+
+        after = {entry['source']: entry for entry in read_manifest(output / 'manifest.jsonl')}
+        assert len(after) == 44
+        assert 'dog.3.jpg' not in after
+        assert not os.path.exists(output / before['dog.3.jpg']['path'])
+        assert all(after[name]['split'] == before[name]['split'] for name in before if name in after)
+        assert after['cat.22.jpg']['split'] == hash_split('cat.22.jpg')
+        assert os.stat(untouched).st_mtime_ns == mtime
+
+    def test_changed_ratios_resplit(self, tmp_path, raw_dataset):
+        """Test that a re-run with new ratios re-splits instead of keeping old assignments."""
+        output = tmp_path / 'data'
+        split_dataset(str(raw_dataset), str(output), output_format='manifest')
+        assert {tuple(entry['split_ratios']) for entry in read_manifest(output / 'manifest.jsonl')} == {
+            (0.8, 0.1, 0.1)
+        }
+
+        split_dataset(str(raw_dataset), str(output), 0.5, 0.25, 0.25, output_format='manifest')
+
+        entries = read_manifest(output / 'manifest.jsonl')
+        assert sum(entry['split'] == 'train' for entry in entries) == 20
+        assert {tuple(entry['split_ratios']) for entry in entries} == {(0.5, 0.25, 0.25)}
+
+    def test_ratios_changed(self):
+        """Test that manifests without recorded ratios are taken to match."""
+        previous = {'cat.0.jpg': {'split_ratios': [0.8, 0.1, 0.1]}, 'cat.1.jpg': {}}
+        assert not ratios_changed(previous, (0.8, 0.1, 0.1))
+        assert ratios_changed(previous, (0.7, 0.2, 0.1))
+        assert not ratios_changed({'cat.1.jpg': {}}, (0.7, 0.2, 0.1))
+
+
+class TestManifestSplit:
+    """Test cases for manifest-only splits and manifest loaders."""
+
+    def test_manifest_only_output(self, tmp_path, raw_dataset):
+        """Test that manifest mode writes only the manifest, with checksums."""
+        output = tmp_path / 'splits'
+
+        split_dataset(str(raw_dataset), str(output), output_format='manifest')
+
+        assert os.listdir(output) == ['manifest.jsonl']
+        entries = read_manifest(output / 'manifest.jsonl')
+        assert len(entries) == 40
+        for entry in entries[:3]:
+            assert set(entry) >= {'path', 'label', 'split', 'checksum'}
+            assert entry['checksum'] == checksum_file(output / entry['path'])
+
+    def test_directory_manifest_has_checksums(self, tmp_path, raw_dataset):
+        """Test that materialized splits record checksums too."""
+        output = tmp_path / 'data'
+
+        split_dataset(str(raw_dataset), str(output))
+
+        entries = read_manifest(output / 'manifest.jsonl')
+        assert all(entry['checksum'] == checksum_file(output / entry['path']) for entry in entries)
+
+    def test_switching_format_keeps_sources(self, tmp_path, raw_dataset):
+        """Test that a directories run never deletes sources listed by a manifest run."""
+        output = tmp_path / 'data'
+
+        split_dataset(str(raw_dataset), str(output), output_format='manifest')
+        split_dataset(str(raw_dataset), str(output))
+
+        assert len(os.listdir(raw_dataset)) == 40
+        assert len(read_manifest(output / 'manifest.jsonl')) == 40
+
+    def test_directories_manifest_directories_keeps_sources(self, tmp_path, raw_dataset):
+        """Test that switching formats back and forth never deletes source images."""
+        output = tmp_path / 'data'
+        
+        split_dataset(str(raw_dataset), str(output))
+        split_dataset(str(raw_dataset), str(output), output_format='manifest')
+        assert all('method' not in entry for entry in read_manifest(output / 'manifest.jsonl'))
+        split_dataset(str(raw_dataset), str(output))
+        
+        assert len(os.listdir(raw_dataset)) == 40
+        entries = read_manifest(output / 'manifest.jsonl')
+        assert len(entries) == 40
+        assert all(os.path.exists(output / entry['path']) for entry in entries)
+
+    def test_is_inside(self, tmp_path):
+        """Test that only paths below the output directory count as inside."""
+        assert is_inside(tmp_path, 'train/cats/cat.0.jpg')
+        assert not is_inside(tmp_path, '../src/cat.0.jpg')
+        assert not is_inside(tmp_path, 'train/../../cat.0.jpg')
+
+    def test_load_manifest_split(self, tmp_path, raw_dataset):
+        """Test that manifest paths resolve to the source images."""
+        output = tmp_path / 'splits'
+        split_dataset(str(raw_dataset), str(output), output_format='manifest')
+
+        paths, labels = load_manifest_split(str(output / 'manifest.jsonl'), 'train')
+
+        assert len(paths) == 32
+        assert all(os.path.dirname(path) == str(raw_dataset) for path in paths)
+        assert labels.count(0) == labels.count(1) == 16
+
+    def test_sample_fraction_stratified(self, tmp_path, raw_dataset):
+        """Test that subsets keep both classes and are reproducible."""
+        manifest = tmp_path / 'splits' / 'manifest.jsonl'
+        split_dataset(str(raw_dataset), str(manifest.parent), output_format='manifest')
+
+        paths, labels = load_manifest_split(str(manifest), 'train', fraction=0.25)
+
+        assert labels.count(0) == labels.count(1) == 4
+        assert load_manifest_split(str(manifest), 'train', fraction=0.25)[0] == paths
+
+    def test_manifest_datasets(self, tmp_path, raw_dataset):
+        """Test training pipelines built straight from a manifest."""
+        manifest = tmp_path / 'splits' / 'manifest.jsonl'
+        split_dataset(str(raw_dataset), str(manifest.parent), output_format='manifest')
+
+        train_ds, _, val_labels, train_samples, val_samples = create_manifest_datasets(
+            str(manifest), batch_size=8, target_size=(32, 32)
+        )
+
+        images, _ = next(iter(train_ds))
+        assert images.shape == (8, 32, 32, 3)
+        assert train_samples == 32
+        assert val_samples == len(val_labels) == 4
+
+
+def corrupt_dataset(source):
+    """Add a zero-byte and a truncated JPEG to a raw dataset directory."""
+    (source / 'cat.100.jpg').write_bytes(b'')
+    data = (source / 'dog.0.jpg').read_bytes()
+    (source / 'dog.100.jpg').write_bytes(data[:len(data) // 2])
+
+
+class TestValidation:
+    """Test cases for the image validation and quarantine pass."""
+
+    def test_inspect_image(self, raw_dataset):
+        """Test that valid images report dimensions and format."""
+        metadata = inspect_image(raw_dataset / 'cat.3.jpg')
+
+        assert metadata == {'width': 67, 'height': 48, 'format': 'JPEG'}
+
+    def test_inspect_rejects_corrupt(self, raw_dataset):
+        """Test that zero-byte and truncated files are rejected."""
+        corrupt_dataset(raw_dataset)
+
+        for name in ('cat.100.jpg', 'dog.100.jpg'):
+            with pytest.raises(ValueError):
+                inspect_image(raw_dataset / name)
+
+    def test_corrupt_files_quarantined(self, tmp_path, raw_dataset):
+        """Test that bad files are copied aside, left out of the split and kept in the source."""
+        corrupt_dataset(raw_dataset)
+        output = tmp_path / 'data'
+
+        split_dataset(str(raw_dataset), str(output), output_format='manifest')
+        split_dataset(str(raw_dataset), str(output), output_format='manifest')
+
+        entries = read_manifest(output / 'manifest.jsonl')
+        assert len(entries) == 40
+        assert all(entry['format'] == 'JPEG' and entry['height'] == 48 for entry in entries)
+        assert sorted(os.listdir(output / 'quarantine')) == [
+            'cat.100.jpg', 'dog.100.jpg', 'quarantine.jsonl'
+        ]
+        assert os.path.exists(raw_dataset / 'dog.100.jpg')
+        report = read_manifest(output / 'quarantine' / 'quarantine.jsonl')
+        assert sorted(entry['source'] for entry in report) == ['cat.100.jpg', 'dog.100.jpg']
+
+    def test_move_corrupt_files(self, tmp_path, raw_dataset):
+        """Test that move_corrupt moves bad files out of the source directory."""
+        corrupt_dataset(raw_dataset)
+        output = tmp_path / 'data'
+
+        split_dataset(str(raw_dataset), str(output), output_format='manifest', move_corrupt=True)
+
+        assert not os.path.exists(raw_dataset / 'dog.100.jpg')
+        assert os.path.exists(output / 'quarantine' / 'dog.100.jpg')
+
+    def test_validation_cached_by_mtime_and_size(self, tmp_path, raw_dataset):
+        """Test that only new or changed files are checked on a re-run."""
+        output = tmp_path / 'data'
+        split_dataset(str(raw_dataset), str(output), output_format='manifest')
+        previous = {entry['source']: entry for entry in read_manifest(output / 'manifest.jsonl')}
+
+        Image.new('RGB', (10, 10)).save(raw_dataset / 'cat.5.jpg')
+        (raw_dataset / 'dog.7.jpg').write_bytes(b'')
+        valid, bad = validate_images(raw_dataset, sorted(previous), previous, workers=1)
+
+        assert valid['cat.5.jpg']['width'] == 10
+        assert valid['cat.6.jpg'] == {key: previous['cat.6.jpg'][key]
+                                      for key in ('width', 'height', 'format')}
+        assert list(bad) == ['dog.7.jpg']
+
+
+@pytest.fixture
+def duplicated_dataset(tmp_path):
+    """Create textured images where each of the first 10 cats has 3 near copies."""
+    source = tmp_path / 'raw_dups'
+    source.mkdir()
+    rng = np.random.default_rng(0)
+    for i in range(40):
+        coarse = rng.integers(0, 256, size=(6, 8, 3), dtype=np.uint8)
+        Image.fromarray(coarse).resize((160, 120), Image.BICUBIC).save(
+            source / f'{"cat" if i < 20 else "dog"}.{i}.jpg', quality=95
+        )
+    for i in range(10):
+        original = Image.open(source / f'cat.{i}.jpg')
+        for copy in range(3):
+            original.resize((150 - 10 * copy, 110 - 8 * copy)).save(
+                source / f'cat.{100 + 10 * i + copy}.jpg', quality=70
+            )
+    return source
+
+
+class TestDeduplication:
+    """Test cases for duplicate-aware splitting."""
+
+    def test_group_mode_keeps_clusters_together(self, tmp_path, duplicated_dataset):
+        """Test that every duplicate cluster lands in a single split."""
+        output = tmp_path / 'splits'
+
+        split_dataset(str(duplicated_dataset), str(output), output_format='manifest', dedup='group')
+
+        entries = read_manifest(output / 'manifest.jsonl')
+        assert len(entries) == 70
+        clusters = {}
+        for entry in entries:
+            assert len(entry['dhash']) == 16
+            if 'duplicate_of' in entry:
+                clusters.setdefault(entry['duplicate_of'], set()).add(entry['split'])
+        assert len(clusters) == 10
+        assert all(len(cluster_splits) == 1 for cluster_splits in clusters.values())
+
+    def test_drop_mode_keeps_one_per_cluster(self, tmp_path, duplicated_dataset):
+        """Test that drop mode leaves one image per cluster."""
+        output = tmp_path / 'splits'
+
+        split_dataset(str(duplicated_dataset), str(output), output_format='manifest', dedup='drop')
+
+        entries = read_manifest(output / 'manifest.jsonl')
+        assert len(entries) == 40
+        assert sum('duplicate_of' in entry for entry in entries) == 10
+
+    def test_hashes_cached(self, tmp_path, duplicated_dataset, capsys):
+        """Test that a re-run reuses hashes from the manifest."""
+        output = tmp_path / 'splits'
+        split_dataset(str(duplicated_dataset), str(output), output_format='manifest', dedup='group')
+        capsys.readouterr()
+
+        split_dataset(str(duplicated_dataset), str(output), output_format='manifest', dedup='group')
+
+        assert 'Hashing 0 images (70 cached)' in capsys.readouterr().out
+
+    def test_majority_split_wins(self):
+        """Test that a cluster moves to the split holding most of its members."""
+        splits = {
+            'train': {'cats': ['a', 'b'], 'dogs': []},
+            'validation': {'cats': ['c'], 'dogs': ['d']},
+            'test': {'cats': [], 'dogs': []}
+        }
+        hashes = {'a': np.uint64(0), 'b': np.uint64(1), 'c': np.uint64(3), 'd': np.uint64(2 ** 40 - 1)}
+
+        new_splits, duplicate_of = deduplicate_splits(splits, hashes, max_distance=2)
+
+        assert new_splits['train']['cats'] == ['a', 'b', 'c']
+        assert new_splits['validation']['dogs'] == ['d']
+        assert duplicate_of == {'a': 'a', 'b': 'a', 'c': 'a'}
+
+
+class TestSharding:
+    """Test cases for TFRecord shard export and reading."""
+
+    def test_balance_shards(self):
+        """Test that shard byte totals are balanced and every item is assigned once."""
+        sizes = [100, 90, 80, 70, 60, 50, 40, 30, 20, 10]
+
+        shards = balance_shards(sizes, 3)
+
+        totals = [sum(sizes[i] for i in shard) for shard in shards]
+        assert max(totals) - min(totals) <= 10
+        assert sorted(sum(shards, [])) == list(range(len(sizes)))
+
+    def test_tfrecord_export_index(self, tmp_path, raw_dataset):
+        """Test that each split gets shards and a consistent index."""
+        output = tmp_path / 'shards'
+
+        split_dataset(str(raw_dataset), str(output), output_format='tfrecord',
+                      shard_size_mb=0.002)
+
+        index = read_shard_index(str(output / 'train'))
+        assert index['num_records'] == 32
+        assert len(index['shards']) > 1
+        assert sum(shard['num_records'] for shard in index['shards']) == 32
+        assert all(os.path.exists(shard['path']) for shard in index['shards'])
+        with open(output / 'validation' / 'index.json') as f:
+            assert json.load(f)['class_names'] == ['cats', 'dogs']
+
+    def test_tfrecord_round_trip(self, tmp_path, raw_dataset):
+        """Test that decoded records match labels in order."""
+        output = tmp_path / 'shards'
+        split_dataset(str(raw_dataset), str(output), output_format='tfrecord',
+                      shard_size_mb=0.002)
+
+        labels = read_tfrecord_labels(str(output / 'validation'))
+        dataset = create_tfrecord_dataset(str(output / 'validation'), batch_size=3,
+                                          target_size=(32, 32))
+        images = np.concatenate([batch for batch, _ in dataset])
+        batch_labels = np.concatenate([batch for _, batch in dataset])
+
+        assert sorted(labels) == [0, 0, 1, 1]
+        np.testing.assert_array_equal(batch_labels, labels)
+        # Cats are red, dogs are blue
+        for image, label in zip(images, labels):
+            assert image[..., 2 if label else 0].mean() > 0.9
+
+    def test_tfrecord_datasets(self, tmp_path, raw_dataset):
+        """Test training and validation pipelines built from shards."""
+        output = tmp_path / 'shards'
+        split_dataset(str(raw_dataset), str(output), output_format='tfrecord')
+
+        train_ds, _, val_labels, train_samples, val_samples = create_tfrecord_datasets(
+            str(output / 'train'), str(output / 'validation'), batch_size=8, target_size=(32, 32)
+        )
+
+        images, labels = next(iter(train_ds))
+        assert images.shape == (8, 32, 32, 3)
+        assert train_samples == 32
+        assert val_samples == len(val_labels) == 4
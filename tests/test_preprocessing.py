@@ -15,7 +15,21 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 from data_preprocessing import (
     load_and_preprocess_image,
     preprocess_image_bytes,
-    validate_image
+    validate_image,
+    open_image,
+    allocate_batch_buffer,
+    preprocess_image_into,
+    load_image_batch,
+    list_image_files,
+    decode_and_resize,
+    random_augment,
+    independent_uniforms,
+    augment_and_prefetch,
+    create_tf_datasets,
+    build_decoded_cache,
+    build_feature_cache,
+    create_cached_dataset,
+    shuffle_for_training
 )
 
 
@@ -104,6 +118,16 @@ class TestImagePreprocessing:
         
         assert validate_image(str(invalid_path)) is False
     
+    def test_validate_image_truncated(self, tmp_path):
+        """Test that a truncated JPEG is rejected."""
+        img = Image.fromarray(np.random.randint(0, 256, (128, 128, 3), dtype=np.uint8))
+        img_bytes = io.BytesIO()
+        img.save(img_bytes, format='JPEG')
+        truncated_path = tmp_path / "truncated.jpg"
+        truncated_path.write_bytes(img_bytes.getvalue()[:img_bytes.tell() // 2])
+        
+        assert validate_image(str(truncated_path)) is False
+    
     def test_load_and_preprocess_different_sizes(self, tmp_path, sample_image):
         """Test preprocessing with different target sizes."""
         img_path = tmp_path / "test_image.jpg"
@@ -114,6 +138,439 @@ class TestImagePreprocessing:
         for size in sizes:
             result = load_and_preprocess_image(str(img_path), target_size=size)
             assert result.shape == (size[0], size[1], 3)
+    
+    def test_non_square_target_is_height_width(self, tmp_path):
+        """Test that target_size is (height, width) and the image is not transposed."""
+        img = Image.new('RGB', (40, 80), color='red')
+        img.paste((0, 0, 255), (0, 40, 40, 80))
+        img_path = tmp_path / "tall.png"
+        img.save(img_path)
+        
+        result = load_and_preprocess_image(str(img_path), target_size=(48, 24))
+        batch, failed = load_image_batch([str(img_path)], target_size=(48, 24), dtype=np.uint8)
+        
+        assert result.shape == (48, 24, 3)
+        assert batch.shape == (1, 48, 24, 3) and failed == []
+        assert batch[0, 5, :, 0].min() > 200 and batch[0, -5, :, 2].min() > 200
+
+
+@pytest.fixture
+def large_photo_bytes():
+    """Create a large, smoothly varying JPEG resembling a phone photo."""
+    height, width = 1536, 2048
+    y, x = np.mgrid[0:height, 0:width]
+    pixels = np.stack([
+        x / width * 255,
+        y / height * 255,
+        (np.sin(x / 40.0) + np.cos(y / 60.0)) * 60 + 128
+    ], axis=-1).astype(np.uint8)
+    
+    img_bytes = io.BytesIO()
+    Image.fromarray(pixels).save(img_bytes, format='JPEG', quality=90)
+    return img_bytes.getvalue()
+
+
+class TestFastDecode:
+    """Guard tests comparing reduced-resolution JPEG decoding to full decoding."""
+    
+    def test_draft_decodes_near_target_size(self, large_photo_bytes):
+        """Test that fast decoding yields a reduced image no smaller than the target."""
+        img = open_image(io.BytesIO(large_photo_bytes), target_size=(224, 224))
+        
+        assert img.mode == 'RGB'
+        assert img.size[0] >= 224 and img.size[1] >= 224
+        assert img.size[0] < 2048 and img.size[1] < 1536
+    
+    def test_full_decode_when_disabled(self, large_photo_bytes):
+        """Test that fast_decode=False decodes at native resolution."""
+        img = open_image(io.BytesIO(large_photo_bytes), target_size=(224, 224), fast_decode=False)
+        
+        assert img.size == (2048, 1536)
+    
+    def test_fast_decode_matches_full_decode(self, large_photo_bytes):
+        """Test that preprocessed pixels stay close to the full-decode path."""
+        fast = preprocess_image_bytes(io.BytesIO(large_photo_bytes))
+        full = preprocess_image_bytes(io.BytesIO(large_photo_bytes), fast_decode=False)
+        
+        assert fast.shape == full.shape == (1, 224, 224, 3)
+        assert np.mean(np.abs(fast - full)) < 0.01
+        assert np.max(np.abs(fast - full)) < 0.1
+    
+    def test_fast_decode_model_outputs_match(self, large_photo_bytes):
+        """Test that model outputs agree between fast and full decoding."""
+        from model import build_baseline_cnn
+        
+        model = build_baseline_cnn()
+        fast = preprocess_image_bytes(io.BytesIO(large_photo_bytes))
+        full = preprocess_image_bytes(io.BytesIO(large_photo_bytes), fast_decode=False)
+        
+        predictions = model.predict(np.concatenate([fast, full]), verbose=0)
+        
+        assert abs(predictions[0][0] - predictions[1][0]) < 0.01
+    
+    def test_fast_decode_ignored_for_png(self, tmp_path):
+        """Test that non-JPEG formats are decoded normally."""
+        img_path = tmp_path / "image.png"
+        Image.new('RGB', (640, 480), color='green').save(img_path)
+        
+        img = open_image(str(img_path), target_size=(224, 224))
+        
+        assert img.size == (640, 480)
+
+
+class TestBufferPreprocessing:
+    """Test cases for preprocessing into preallocated batch buffers."""
+    
+    def test_allocate_batch_buffer(self):
+        """Test buffer shape and dtype."""
+        buffer = allocate_batch_buffer(4, target_size=(224, 224), dtype=np.uint8)
+        
+        assert buffer.shape == (4, 224, 224, 3)
+        assert buffer.dtype == np.uint8
+    
+    def test_preprocess_into_float32_slot(self, sample_image_bytes):
+        """Test that float32 slots receive pixels normalized to [0, 1]."""
+        buffer = allocate_batch_buffer(2)
+        result = preprocess_image_into(sample_image_bytes, buffer[1])
+        
+        assert result.base is buffer or np.shares_memory(result, buffer)
+        assert buffer.dtype == np.float32
+        assert 0.0 <= buffer[1].min() and buffer[1].max() <= 1.0
+        assert buffer[1, :, :, 0].mean() > 0.9  # red image
+    
+    def test_preprocess_into_uint8_slot(self, sample_image_bytes):
+        """Test that uint8 slots receive raw pixels matching the float path."""
+        raw = allocate_batch_buffer(1, dtype=np.uint8)
+        preprocess_image_into(sample_image_bytes, raw[0])
+        sample_image_bytes.seek(0)
+        normalized = preprocess_image_bytes(sample_image_bytes)
+        
+        np.testing.assert_allclose(raw / 255.0, normalized, atol=1e-6)
+    
+    def test_preprocess_matches_previous_float64_path(self, sample_image_bytes):
+        """Test that float32 output equals the old np.array(img) / 255.0 computation."""
+        expected = np.array(Image.open(sample_image_bytes).convert('RGB').resize((224, 224))) / 255.0
+        sample_image_bytes.seek(0)
+        
+        result = preprocess_image_bytes(sample_image_bytes, fast_decode=False)
+        
+        assert result.dtype == np.float32
+        np.testing.assert_allclose(result[0], expected, atol=1e-6)
+    
+    def test_preprocess_into_invalid(self):
+        """Test that undecodable data raises ValueError."""
+        buffer = allocate_batch_buffer(1, dtype=np.uint8)
+        
+        with pytest.raises(ValueError):
+            preprocess_image_into(io.BytesIO(b"not an image"), buffer[0])
+    
+    def test_load_image_batch(self, tmp_path, sample_image):
+        """Test loading paths into one batch with failed entries reported."""
+        good_path = tmp_path / "good.jpg"
+        sample_image.save(good_path)
+        bad_path = tmp_path / "bad.jpg"
+        bad_path.write_text("not an image")
+        
+        batch, failed = load_image_batch([str(good_path), str(bad_path), str(good_path)],
+                                         dtype=np.uint8)
+        
+        assert batch.shape == (3, 224, 224, 3)
+        assert failed == [1]
+        assert batch[1].max() == 0
+        np.testing.assert_array_equal(batch[0], batch[2])
+
+
+@pytest.fixture
+def image_directory(tmp_path):
+    """Create a small class-per-subdirectory dataset."""
+    colors = {'cats': 'red', 'dogs': 'blue'}
+    for class_name, color in colors.items():
+        class_dir = tmp_path / class_name
+        class_dir.mkdir()
+        for i in range(3):
+            Image.new('RGB', (120, 90), color=color).save(class_dir / f'{i}.jpg')
+    (tmp_path / 'cats' / 'notes.txt').write_text('not an image')
+    return tmp_path
+
+
+class TestTfDataPipeline:
+    """Test cases for the tf.data training pipeline."""
+    
+    def test_list_image_files(self, image_directory):
+        """Test that classes follow flow_from_directory ordering."""
+        paths, labels, class_names = list_image_files(str(image_directory))
+        
+        assert class_names == ['cats', 'dogs']
+        assert len(paths) == 6
+        assert labels == [0, 0, 0, 1, 1, 1]
+    
+    @pytest.mark.parametrize('image_format', ['JPEG', 'PNG'])
+    def test_decode_matches_serving(self, tmp_path, image_format):
+        """Test that in-graph decoding gives the pixels preprocess_image_into serves."""
+        rng = np.random.default_rng(0)
+        y, x = np.mgrid[0:600, 0:800]
+        pixels = np.stack([np.sin(x / 5.0), np.cos(y / 3.0), np.sin((x + y) / 9.0)], -1) * 120 + 128
+        pixels = np.clip(pixels + rng.normal(0, 15, pixels.shape), 0, 255).astype(np.uint8)
+        path = tmp_path / f'photo.{image_format.lower()}'
+        Image.fromarray(pixels).save(path, format=image_format)
+        
+        trained = decode_and_resize(str(path), (64, 48)).numpy()
+        served = preprocess_image_into(str(path), np.zeros((64, 48, 3), np.uint8), (64, 48))
+        
+        assert trained.shape == served.shape
+        assert np.abs(trained - served).mean() < 1.0
+    
+    def test_identity_augment(self):
+        """Test that zero ranges leave images unchanged."""
+        images = np.random.rand(2, 16, 16, 3).astype(np.float32)
+        
+        augmented = random_augment(images, 0, 0, 0, horizontal_flip=False).numpy()
+        
+        np.testing.assert_allclose(augmented, images, atol=1e-5)
+    
+    def test_augment_preserves_shape(self):
+        """Test that augmentation keeps batch shape and pixel range."""
+        images = np.random.rand(4, 32, 24, 3).astype(np.float32) * 255
+        
+        augmented = random_augment(images, seed=0).numpy()
+        
+        assert augmented.shape == images.shape
+        assert augmented.min() >= 0.0 and augmented.max() <= 255.0
+    
+    def test_augment_parameters_independent(self):
+        """Test that each augmentation parameter gets its own draws for a fixed seed."""
+        draws = independent_uniforms(6, 8, seed=0).numpy()
+        
+        assert draws.shape == (6, 8)
+        assert len({tuple(row) for row in draws}) == 6
+        assert abs(np.corrcoef(independent_uniforms(6, 1000, seed=0).numpy())[0, 1]) < 0.1
+        np.testing.assert_array_equal(independent_uniforms(6, 8, seed=0).numpy(), draws)
+    
+    def test_seeded_pipeline_varies_per_batch(self):
+        """Test that a seeded pipeline augments identical batches differently, reproducibly."""
+        import tensorflow as tf
+        
+        images = np.random.rand(2, 16, 16, 3).astype(np.float32) * 255
+        dataset = tf.data.Dataset.from_tensors((images, np.zeros(2))).repeat(2)
+        
+        def augmented(seed):
+            pipeline = augment_and_prefetch(dataset, training=True, rescale=False, seed=seed)
+            return [batch.numpy() for batch, _ in pipeline]
+        
+        first, second = augmented(3)
+        
+        assert not np.allclose(first, second)
+        np.testing.assert_allclose(augmented(3)[0], first)
+    
+    def test_datasets(self, image_directory):
+        """Test batch shapes, normalization and validation label order."""
+        train_ds, val_ds, val_labels, train_samples, val_samples = create_tf_datasets(
+            str(image_directory), str(image_directory), batch_size=4, target_size=(32, 32)
+        )
+        
+        images, labels = next(iter(train_ds))
+        assert images.shape == (4, 32, 32, 3)
+        assert 0.0 <= float(images.numpy().min()) and float(images.numpy().max()) <= 1.0
+        assert train_samples == val_samples == 6
+        
+        # Validation is unshuffled and unaugmented: red cats first, then blue dogs
+        val_images = np.concatenate([batch for batch, _ in val_ds])
+        val_batch_labels = np.concatenate([batch for _, batch in val_ds])
+        np.testing.assert_array_equal(val_batch_labels, val_labels)
+        assert val_images[0, ..., 0].mean() > 0.9
+        assert val_images[-1, ..., 2].mean() > 0.9
+    
+    def test_datasets_without_rescale(self, image_directory):
+        """Test raw [0, 255] output for in-graph preprocessing models."""
+        _, val_ds, _, _, _ = create_tf_datasets(
+            str(image_directory), str(image_directory), batch_size=6,
+            target_size=(32, 32), rescale=False
+        )
+        
+        images, _ = next(iter(val_ds))
+        assert images.numpy().max() > 200
+
+
+class TestDecodedCache:
+    """Test cases for the on-disk decoded image cache."""
+    
+    def test_cache_built_and_reused(self, tmp_path, image_directory):
+        """Test that a second build loads the existing cache."""
+        paths, labels, _ = list_image_files(str(image_directory))
+        cache_dir = str(tmp_path / 'cache')
+        
+        images, cached_labels = build_decoded_cache(paths, labels, cache_dir, (16, 24))
+        assert images.shape == (6, 16, 24, 3)
+        assert images.dtype == np.uint8
+        np.testing.assert_array_equal(cached_labels, labels)
+        assert images[0, ..., 0].mean() > 240
+        
+        cache_files = sorted(os.listdir(cache_dir))
+        reloaded, _ = build_decoded_cache(paths, labels, cache_dir, (16, 24))
+        assert isinstance(reloaded, np.memmap)
+        assert sorted(os.listdir(cache_dir)) == cache_files
+    
+    def test_cache_keyed_by_content_and_size(self, tmp_path, image_directory):
+        """Test that changed images or sizes produce a new cache."""
+        paths, labels, _ = list_image_files(str(image_directory))
+        cache_dir = str(tmp_path / 'cache')
+        
+        build_decoded_cache(paths, labels, cache_dir, (16, 16))
+        build_decoded_cache(paths, labels, cache_dir, (32, 32))
+        Image.new('RGB', (120, 90), color='green').save(paths[0])
+        images, _ = build_decoded_cache(paths, labels, cache_dir, (16, 16))
+        
+        assert len([f for f in os.listdir(cache_dir) if f.endswith('.labels.npy')]) == 3
+        assert images[0, ..., 1].mean() > 100
+    
+    def test_unreadable_images_skipped(self, tmp_path, image_directory):
+        """Test that undecodable files are marked and left out of datasets."""
+        broken = image_directory / 'dogs' / 'broken.jpg'
+        broken.write_bytes(b'not a jpeg')
+        paths, labels, _ = list_image_files(str(image_directory))
+        
+        images, cached_labels = build_decoded_cache(paths, labels, str(tmp_path / 'cache'), (16, 16))
+        dataset = create_cached_dataset(images, cached_labels, batch_size=8)
+        
+        assert cached_labels[paths.index(str(broken))] == -1
+        assert sum(len(batch_labels) for _, batch_labels in dataset) == 6
+    
+    def test_cached_datasets(self, tmp_path, image_directory):
+        """Test that cached pipelines match the uncached batch layout."""
+        train_ds, val_ds, val_labels, train_samples, val_samples = create_tf_datasets(
+            str(image_directory), str(image_directory), batch_size=4, target_size=(32, 32),
+            cache_dir=str(tmp_path / 'cache')
+        )
+        
+        images, _ = next(iter(train_ds))
+        assert images.shape == (4, 32, 32, 3)
+        assert images.dtype == np.float32
+        assert float(images.numpy().max()) <= 1.0
+        assert train_samples == val_samples == 6
+        
+        val_batch_labels = np.concatenate([batch for _, batch in val_ds])
+        np.testing.assert_array_equal(val_batch_labels, val_labels)
+
+
+class TestFeatureCache:
+    """Test cases for the cached backbone features."""
+    
+    @staticmethod
+    def mean_color(calls):
+        """Feature extractor returning each image's mean color and counting its calls."""
+        def extract(images):
+            calls.append(len(images))
+            return images.reshape(len(images), -1, 3).mean(axis=1)
+        return extract
+    
+    def test_features_reused(self, tmp_path, image_directory):
+        """Test that features are extracted once and reloaded from disk."""
+        paths, labels, _ = list_image_files(str(image_directory))
+        cache_dir = str(tmp_path / 'features')
+        calls = []
+        
+        features, cached_labels = build_feature_cache(
+            paths, labels, cache_dir, self.mean_color(calls), 'mean', (16, 16), batch_size=4
+        )
+        assert features.shape == (6, 3)
+        assert features.dtype == np.float32
+        assert calls == [4, 2]
+        np.testing.assert_array_equal(cached_labels, labels)
+        
+        reloaded, _ = build_feature_cache(
+            paths, labels, cache_dir, self.mean_color(calls), 'mean', (16, 16), batch_size=4
+        )
+        assert isinstance(reloaded, np.memmap)
+        assert calls == [4, 2]
+        np.testing.assert_array_equal(reloaded, features)
+        
+        build_feature_cache(paths, labels, cache_dir, self.mean_color(calls), 'other', (16, 16))
+        assert len(calls) == 3
+    
+    def test_non_square_size(self, tmp_path, image_directory):
+        """Test that images are embedded at (height, width)."""
+        paths, labels, _ = list_image_files(str(image_directory))
+        shapes = []
+        
+        def extract(images):
+            shapes.append(images.shape)
+            return images.reshape(len(images), -1, 3).mean(axis=1)
+        
+        build_feature_cache(paths, labels, str(tmp_path / 'features'), extract, 'mean', (16, 24),
+                            batch_size=4)
+        
+        assert shapes == [(4, 16, 24, 3), (2, 16, 24, 3)]
+    
+    def test_unreadable_images_marked(self, tmp_path, image_directory):
+        """Test that undecodable files get label -1."""
+        broken = image_directory / 'cats' / 'broken.jpg'
+        broken.write_bytes(b'not a jpeg')
+        paths, labels, _ = list_image_files(str(image_directory))
+        
+        _, cached_labels = build_feature_cache(
+            paths, labels, str(tmp_path / 'features'), self.mean_color([]), 'mean', (16, 16)
+        )
+        
+        assert cached_labels[paths.index(str(broken))] == -1
+        assert np.sum(cached_labels >= 0) == 6
+    
+    def test_empty_paths(self, tmp_path):
+        """Test that an empty image list is rejected."""
+        with pytest.raises(ValueError):
+            build_feature_cache([], [], str(tmp_path), self.mean_color([]), 'mean')
+
+
+class TestResumableStream:
+    """Test cases for resuming the training order mid-stream."""
+    
+    def test_offset_replays_interrupted_epoch(self):
+        """Test that a resumed offset yields the rest of that epoch in its original order."""
+        import tensorflow as tf
+        items = tf.data.Dataset.range(10)
+        
+        epochs = shuffle_for_training(items, 10, seed=3)
+        full = [list(epochs.as_numpy_iterator()) for _ in range(3)]
+        resumed = list(shuffle_for_training(items, 10, seed=3, resume_offset=23).as_numpy_iterator())
+        
+        assert resumed == full[2][3:]
+        assert full[1] != full[2] and sorted(full[1]) == list(range(10))
+    
+    def test_epoch_size_larger_than_buffer(self):
+        """Test that epochs are counted in examples, not shuffle buffer sizes."""
+        import tensorflow as tf
+        items = tf.data.Dataset.range(10)
+        
+        epochs = shuffle_for_training(items, 4, seed=3)
+        full = [list(epochs.as_numpy_iterator()) for _ in range(2)]
+        resumed = list(
+            shuffle_for_training(items, 4, seed=3, resume_offset=13, epoch_size=10).as_numpy_iterator()
+        )
+        
+        assert resumed == full[1][3:]
+    
+    def test_no_offset_is_one_epoch(self):
+        """Test that without an offset the dataset stays a single shuffled epoch."""
+        import tensorflow as tf
+        
+        epoch = list(shuffle_for_training(tf.data.Dataset.range(10), 10, seed=3).as_numpy_iterator())
+        
+        assert sorted(epoch) == list(range(10))
+    
+    def test_cached_dataset_resumes_by_batch(self, tmp_path, image_directory):
+        """Test that the cached pipeline resumes an epoch after whole batches."""
+        paths, labels, _ = list_image_files(str(image_directory))
+        images, cached_labels = build_decoded_cache(paths, labels, str(tmp_path / 'cache'), (8, 8))
+        
+        def label_batches(dataset):
+            return [batch.numpy().tolist() for _, batch in dataset]
+        
+        epochs = create_cached_dataset(images, cached_labels, batch_size=2, training=True, seed=5)
+        full = [label_batches(epochs) for _ in range(2)]
+        resumed = create_cached_dataset(
+            images, cached_labels, batch_size=2, training=True, seed=5, resume_offset=8
+        )
+        
+        assert label_batches(resumed) == full[1][1:]
 
 
 class TestDataValidation:
@@ -0,0 +1,62 @@
+"""
+Startup tests for the inference service: serving import graph and cold start budget.
+"""
+
+import os
+import sys
+import pytest
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from model import build_baseline_cnn
+from benchmark import profile_imports, measure_time_to_healthy, print_import_profile
+
+
+# Budgets are generous for slow CI runners; override them to tighten locally
+IMPORT_TIME_BUDGET_MS = float(os.environ.get('IMPORT_TIME_BUDGET_MS', '2500'))
+TIME_TO_HEALTHY_BUDGET_S = float(os.environ.get('TIME_TO_HEALTHY_BUDGET_S', '3'))
+TIME_TO_READY_BUDGET_S = float(os.environ.get('TIME_TO_READY_BUDGET_S', '60'))
+
+# Packages only training needs; serving loads TensorFlow lazily with the model
+TRAINING_ONLY_PACKAGES = ('tensorflow', 'keras', 'sklearn', 'mlflow', 'matplotlib', 'seaborn')
+
+
+@pytest.fixture(scope='module')
+def import_profile():
+    """Profile importing the API module in a fresh interpreter."""
+    profile = profile_imports('src.inference')
+    print_import_profile(profile, "Import time: src.inference")
+    return profile
+
+
+class TestServingImports:
+    """Test cases for the serving import graph."""
+
+    def test_no_training_dependencies(self, import_profile):
+        """Test that importing the API does not import training-only packages."""
+        imported = {name.split('.')[0] for name, _, _ in import_profile['modules']}
+
+        assert imported.isdisjoint(TRAINING_ONLY_PACKAGES), \
+            imported.intersection(TRAINING_ONLY_PACKAGES)
+
+    def test_import_time_budget(self, import_profile):
+        """Test that importing the API stays within its time budget."""
+        assert import_profile['total_ms'] < IMPORT_TIME_BUDGET_MS
+
+
+class TestColdStart:
+    """Test cases for time until the service's probes pass."""
+
+    def test_time_to_healthy(self, tmp_path):
+        """Test that liveness passes quickly and readiness follows once the model is loaded."""
+        model_path = str(tmp_path / 'model.h5')
+        build_baseline_cnn(input_shape=(64, 64, 3)).save(model_path)
+
+        timing = measure_time_to_healthy(
+            model_path, timeout=TIME_TO_READY_BUDGET_S, env={'WARMUP_BATCH_SIZES': '1'}
+        )
+
+        assert timing['healthy_s'] is not None
+        assert timing['healthy_s'] < TIME_TO_HEALTHY_BUDGET_S
+        assert timing['ready_s'] is not None